@@ -4,27 +4,40 @@ Router principal pour toutes les routes API v1
 Routes disponibles :
 - GET    /api/health                    - Vérification de santé de l'API
 - GET    /api/health/db                  - Vérification de santé de la base de données
-- GET    /api/metrics                   - Liste des métriques de monitoring
-- GET    /api/metrics/system            - Métriques système simulées (CPU, RAM, Stockage, Réseau)
-- GET    /api/metrics/simulate          - Générer des métriques simulées
-- GET    /api/instances                 - Liste de toutes les instances cloud
+- GET    /api/metrics                   - Liste des métriques de monitoring (?stream=ndjson|json : export en flux)
+- GET    /api/metrics/aggregate         - Agrégats par intervalle (min/max/avg/p95/count)
+- GET    /api/metrics/system            - Métriques de l'hôte (CPU, RAM, Stockage, Réseau), dernier échantillon
+- GET    /api/metrics/system/history    - Échantillons récents de l'hôte (en mémoire)
+- GET    /api/metrics/simulate          - Mettre en file d'écriture un échantillon de l'hôte (monitoring_metrics)
+- POST   /api/metrics/batch             - Ingestion en lot de métriques (JSON ou NDJSON)
+- GET    /api/metrics/export            - Export d'une plage en Parquet, Arrow IPC ou CSV gzip (en flux)
+- GET    /api/metrics/stream            - Flux en direct des métriques ingérées (SSE, sous-échantillonné)
+- GET    /api/instances                 - Liste de toutes les instances cloud (?stream=ndjson|json)
+- GET    /api/instances/summary         - Synthèse de la flotte (totaux par fournisseur/région/statut)
+- GET    /api/instances/costs           - Coûts accumulés et projetés par instance/fournisseur/région
 - POST   /api/instances                 - Créer une nouvelle instance cloud
+- POST   /api/instances/batch           - Créer plusieurs instances (résultat par élément)
+- POST   /api/instances/batch/{action}  - Démarrer/arrêter/supprimer plusieurs instances (start, stop, delete)
 - GET    /api/instances/{id}            - Détails d'une instance spécifique
 - PATCH  /api/instances/{id}            - Mettre à jour une instance
 - POST   /api/instances/{id}/stop       - Arrêter une instance
 - POST   /api/instances/{id}/start      - Démarrer une instance
 - DELETE /api/instances/{id}            - Supprimer une instance
-- GET    /api/deployments               - Liste de tous les déploiements
+- GET    /api/deployments               - Liste de tous les déploiements (?stream=ndjson|json)
 - POST   /api/deployments               - Créer un nouveau déploiement
 - GET    /api/deployments/{id}          - Détails d'un déploiement spécifique
 - DELETE /api/deployments/{id}          - Supprimer un déploiement
+- GET    /api/events/stream             - Flux d'événements temps réel (SSE)
+- GET    /api/admin/slow-queries        - Requêtes SQL lentes récentes (route d'origine, plan EXPLAIN échantillonné)
+- DELETE /api/admin/slow-queries        - Vider le journal des requêtes lentes
+- WS     /ws/events                     - Flux d'événements temps réel (WebSocket, hors préfixe /api)
 
 Documentation :
 - Swagger UI : http://localhost:8000/api/docs
 - ReDoc : http://localhost:8000/api/redoc
 """
 from fastapi import APIRouter
-from app.api.v1 import health, metrics, deployments, instances
+from app.api.v1 import health, metrics, deployments, instances, events, admin
 
 api_router = APIRouter()
 
@@ -33,3 +46,5 @@ api_router.include_router(health.router, prefix="/health", tags=["Health"])
 api_router.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 api_router.include_router(deployments.router, prefix="/deployments", tags=["Deployments"])
 api_router.include_router(instances.router, prefix="/instances", tags=["Instances"])
+api_router.include_router(events.router, prefix="/events", tags=["Events"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,58 @@
+"""
+Routes d'administration (diagnostic des performances)
+
+Chaque requête doit fournir ADMIN_TOKEN dans l'en-tête X-Admin-Token. Sans
+ADMIN_TOKEN configuré, les routes sont refusées dès que le journal des
+requêtes lentes est activé (les instructions journalisées contiennent les
+paramètres SQL).
+"""
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from app.core.config import settings
+from app.core.database import slow_query_log
+from app.schemas.slow_query import SlowQueryReport
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Vérifier le jeton d'administration"""
+    if not settings.ADMIN_TOKEN:
+        if settings.SLOW_QUERY_LOG_ENABLED:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Routes d'administration désactivées : ADMIN_TOKEN non configuré"
+            )
+        return
+    if not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Jeton d'administration invalide ou manquant (en-tête X-Admin-Token)"
+        )
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries", response_model=SlowQueryReport)
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1_000, description="Nombre maximal d'instructions (les plus récentes)")
+):
+    """
+    Requêtes SQL lentes récentes, les plus récentes d'abord
+
+    Journal activé par SLOW_QUERY_LOG_ENABLED ; chaque entrée porte la route
+    d'origine et, si elle a été échantillonnée, le plan EXPLAIN (ANALYZE, BUFFERS).
+    """
+    return {
+        "enabled": settings.SLOW_QUERY_LOG_ENABLED,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "explain_sample_rate": slow_query_log.explain_sample_rate,
+        "recorded": slow_query_log.recorded,
+        "items": slow_query_log.entries(limit),
+    }
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    """Vider le journal des requêtes lentes"""
+    return {"cleared": slow_query_log.clear()}
@@ -1,42 +1,90 @@
 """
 Routes pour la gestion des déploiements
 """
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List
-from datetime import datetime, timezone
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from app.core.cache import DEPLOYMENTS_NAMESPACE, cache
+from app.core.database import get_async_db
+from app.core.deployment_jobs import enqueue_deployment
+from app.core.etag import etag_matches, make_etag, not_modified, probe_version, row_version, set_etag
+from app.core.events import event_bus
+from app.core.pagination import NEXT_CURSOR_HEADER, keyset_paginate, set_next_cursor
+from app.core.serialization import RowSerializer, json_response, stream_rows
 from app.models.deployment_history import DeploymentHistory, DeploymentStatus
+from app.models.deployment_job import ACTIVE_JOB_STATUSES, DeploymentJob
 from app.schemas.deployment_history import DeploymentCreate, DeploymentResponse
 
 router = APIRouter()
 
 
+# Colonnes et conversion JSON des réponses DeploymentResponse
+deployment_serializer = RowSerializer(DeploymentHistory, DeploymentResponse)
+
+
 @router.get("", response_model=List[DeploymentResponse])
 async def get_deployments(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
+    stream: Optional[Literal["ndjson", "json"]] = Query(None, description="Export en flux de tous les déploiements (sans limite)")
 ):
     """
     Récupérer la liste de tous les déploiements
+
+    Pagination : passer la valeur de l'en-tête X-Next-Cursor dans `cursor`
+    pour obtenir la page suivante (le paramètre `skip` reste supporté).
+    Les pages sont mises en cache jusqu'à la prochaine écriture sur un déploiement.
+    GET conditionnel : If-None-Match avec l'ETag reçu renvoie 304 si rien n'a changé.
+    Avec `stream` (ndjson ou json), tous les déploiements à partir de `cursor`
+    sont envoyés en flux, lus par lots sur un curseur côté serveur.
     """
+    query = keyset_paginate(
+        select(*deployment_serializer.columns),
+        DeploymentHistory.started_at,
+        DeploymentHistory.id,
+        cursor,
+        skip
+    )
+    if stream:
+        # Export : ni limite, ni cache, ni ETag
+        return stream_rows(query, deployment_serializer, stream)
+
+    cache_key = await cache.make_key_async(DEPLOYMENTS_NAMESPACE, "list", skip, limit, cursor)
+    cached = await cache.get_async(cache_key)
+    if cached is not None:
+        if etag_matches(request, cached["etag"]):
+            return not_modified(cached["etag"])
+        set_etag(response, cached["etag"])
+        if cached["next_cursor"]:
+            response.headers[NEXT_CURSOR_HEADER] = cached["next_cursor"]
+        return json_response(cached["items"], response)
+
     try:
-        deployments = db.query(DeploymentHistory)\
-            .order_by(desc(DeploymentHistory.started_at))\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
-        
-        # Convertir les strings en enums pour Pydantic
-        for deployment in deployments:
-            if isinstance(deployment.status, str):
-                deployment.status = DeploymentStatus(deployment.status)
+        # Sonde de version (count, max id, max updated_at, xmin) : 304 sans charger les lignes
+        version = await probe_version(
+            db, DeploymentHistory, [], row_version(DeploymentHistory, db.get_bind().dialect.name)
+        )
+        etag = make_etag(request, *version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
+        rows = (await db.execute(query.limit(limit))).all()
+        cursor_value = set_next_cursor(response, rows, limit, "started_at")
         
-        return deployments
+        items = deployment_serializer.many(rows)
+        await cache.set_async(cache_key, {"items": items, "next_cursor": cursor_value, "etag": etag})
+        return json_response(items, response)
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_msg = str(e)
         if "relation" in error_msg.lower() and "does not exist" in error_msg.lower():
             raise HTTPException(
@@ -58,17 +106,21 @@ async def get_deployments(
 @router.post("", response_model=DeploymentResponse, status_code=status.HTTP_201_CREATED)
 async def create_deployment(
     deployment: DeploymentCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Créer un nouveau déploiement
+
+    Le déploiement et sa tâche (deployment_jobs) sont créés dans la même
+    transaction ; l'exécution est prise en charge par les workers de la file.
     """
     try:
         # Vérifier si un déploiement avec le même nom existe déjà
-        existing_deployment = db.query(DeploymentHistory).filter(
-            DeploymentHistory.deployment_name == deployment.deployment_name
-        ).first()
+        existing_deployment = (await db.execute(
+            select(DeploymentHistory.id).where(
+                DeploymentHistory.deployment_name == deployment.deployment_name
+            ).limit(1)
+        )).scalar()
         
         if existing_deployment:
             raise HTTPException(
@@ -86,35 +138,20 @@ async def create_deployment(
         )
         
         db.add(db_deployment)
-        db.commit()
-        db.refresh(db_deployment)
-        
-        # Note: Dans un vrai projet, le processus de déploiement serait géré
-        # par une tâche en arrière-plan (Celery, RQ, etc.)
-        # Pour la démonstration, on simule un déploiement en arrière-plan
-        # Ne pas bloquer la réponse HTTP
-        print(f"🚀 Démarrage de la simulation du déploiement {db_deployment.id} en arrière-plan...")
-        
-        # Utiliser threading sans daemon pour garantir l'exécution
-        import threading
-        thread = threading.Thread(target=simulate_deployment_sync, args=(db_deployment.id,), daemon=False)
-        thread.start()
-        print(f"✅ Thread démarré pour le déploiement {db_deployment.id} (non-daemon)")
-        
-        # Aussi utiliser BackgroundTasks comme backup
-        background_tasks.add_task(simulate_deployment_sync, db_deployment.id)
-        
-        # Convertir les strings en enums pour la réponse Pydantic
-        if isinstance(db_deployment.status, str):
-            db_deployment.status = DeploymentStatus(db_deployment.status)
+        await db.flush()
+        enqueue_deployment(db, db_deployment.id)
+        await db.commit()
+        await cache.invalidate_async(DEPLOYMENTS_NAMESPACE)
+        event_bus.publish("deployment.created", deployment_id=db_deployment.id, status=DeploymentStatus.PENDING.value)
+        await db.refresh(db_deployment)
         
-        return db_deployment
+        return json_response(deployment_serializer.one(db_deployment), status_code=status.HTTP_201_CREATED)
     except HTTPException:
         # Re-raise les HTTPException (comme les erreurs de validation)
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_msg = str(e)
         import traceback
         print(f"Erreur complète lors de la création du déploiement: {traceback.format_exc()}")
@@ -136,93 +173,67 @@ async def create_deployment(
             )
 
 
-def simulate_deployment_sync(deployment_id: int):
-    """
-    Simuler un processus de déploiement (fonction helper)
-    Note: Dans un vrai projet, utiliser une tâche en arrière-plan (Celery, RQ, etc.)
-    Cette fonction est exécutée en arrière-plan après la création du déploiement
-    """
-    import time
-    from app.core.database import SessionLocal
-    
-    print(f"⏳ [THREAD] Simulation du déploiement {deployment_id} démarrée...")
-    
-    # Créer une nouvelle session pour la tâche en arrière-plan
-    task_db = SessionLocal()
-    try:
-        # Simuler le temps de déploiement (2 secondes)
-        print(f"⏳ [THREAD] Attente de 2 secondes pour le déploiement {deployment_id}...")
-        time.sleep(2)
-        
-        deployment = task_db.query(DeploymentHistory).filter(DeploymentHistory.id == deployment_id).first()
-        if not deployment:
-            print(f"⚠️ [THREAD] Déploiement {deployment_id} non trouvé dans la base de données")
-            return
-        
-        print(f"📝 [THREAD] Mise à jour du statut du déploiement {deployment_id}...")
-        
-        # Toujours simuler un succès pour la démonstration
-        # (Dans un vrai projet, cela dépendrait du résultat réel du déploiement)
-        new_status = DeploymentStatus.SUCCESS.value
-        old_status = deployment.status
-        deployment.status = new_status
-        # Utiliser datetime.now(timezone.utc) pour être compatible avec les datetimes timezone-aware de la DB
-        deployment.completed_at = datetime.now(timezone.utc)
-        deployment.error_message = None  # Pas d'erreur en cas de succès
-        
-        # Calculer la durée (les deux datetimes sont maintenant timezone-aware)
-        duration = (deployment.completed_at - deployment.started_at).total_seconds()
-        deployment.duration_seconds = int(duration)
-        
-        task_db.commit()
-        print(f"✅ [THREAD] Déploiement {deployment_id} mis à jour: {old_status} → {new_status}")
-        
-    except Exception as e:
-        # Logger l'erreur mais ne pas faire échouer la requête principale
-        import traceback
-        print(f"❌ [THREAD] Erreur lors de la simulation du déploiement {deployment_id}: {e}")
-        print(traceback.format_exc())
-        try:
-            task_db.rollback()
-        except:
-            pass
-    finally:
-        task_db.close()
-        print(f"🔒 [THREAD] Session fermée pour le déploiement {deployment_id}")
-
-
 @router.get("/{deployment_id}", response_model=DeploymentResponse)
 async def get_deployment(
     deployment_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer les détails d'un déploiement spécifique
+
+    GET conditionnel : If-None-Match avec l'ETag reçu renvoie 304 si le
+    déploiement n'a pas été modifié.
     """
-    deployment = db.query(DeploymentHistory).filter(DeploymentHistory.id == deployment_id).first()
+    cache_key = await cache.make_key_async(DEPLOYMENTS_NAMESPACE, "item", deployment_id)
+    cached = await cache.get_async(cache_key)
+    if cached is not None:
+        if etag_matches(request, cached["etag"]):
+            return not_modified(cached["etag"])
+        set_etag(response, cached["etag"])
+        return json_response(cached["item"], response)
+
+    if request.headers.get("if-none-match"):
+        # Sonde uniquement si le client a une version en cache
+        version = await probe_version(
+            db, DeploymentHistory, [DeploymentHistory.id == deployment_id], row_version(DeploymentHistory)
+        )
+        etag = make_etag(request, *version)
+        if version[0] and etag_matches(request, etag):
+            return not_modified(etag)
+
+    row = (await db.execute(
+        select(*deployment_serializer.columns, DeploymentHistory.updated_at)
+        .where(DeploymentHistory.id == deployment_id)
+    )).first()
     
-    if not deployment:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Déploiement avec l'ID {deployment_id} non trouvé"
         )
     
-    # Convertir les strings en enums pour la réponse Pydantic
-    if isinstance(deployment.status, str):
-        deployment.status = DeploymentStatus(deployment.status)
-    
-    return deployment
+    # Même ETag que la sonde : (1 ligne, id, updated_at)
+    etag = make_etag(request, 1, row.id, row.updated_at)
+    set_etag(response, etag)
+    payload = deployment_serializer.one(row)
+    await cache.set_async(cache_key, {"item": payload, "etag": etag})
+    return json_response(payload, response)
 
 
 @router.post("/{deployment_id}/simulate", response_model=DeploymentResponse)
 async def simulate_existing_deployment(
     deployment_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Forcer la simulation d'un déploiement existant (utile pour les déploiements restés en pending)
+    Remettre en file un déploiement en attente qui n'a plus de tâche active
+
+    Normalement inutile : les workers reprennent d'eux-mêmes les tâches
+    interrompues et les déploiements sans tâche.
     """
-    deployment = db.query(DeploymentHistory).filter(DeploymentHistory.id == deployment_id).first()
+    deployment = await db.get(DeploymentHistory, deployment_id)
     
     if not deployment:
         raise HTTPException(
@@ -236,27 +247,33 @@ async def simulate_existing_deployment(
             detail=f"Le déploiement {deployment_id} n'est pas en attente (statut actuel: {deployment.status})"
         )
     
-    # Lancer la simulation en arrière-plan
-    import threading
-    thread = threading.Thread(target=simulate_deployment_sync, args=(deployment_id,), daemon=True)
-    thread.start()
-    
-    # Convertir les strings en enums pour la réponse Pydantic
-    if isinstance(deployment.status, str):
-        deployment.status = DeploymentStatus(deployment.status)
+    active_job = (await db.execute(
+        select(DeploymentJob.id).where(
+            DeploymentJob.deployment_id == deployment_id,
+            DeploymentJob.status.in_(ACTIVE_JOB_STATUSES)
+        ).limit(1)
+    )).scalar()
+    if not active_job:
+        enqueue_deployment(db, deployment_id)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Tâche active créée entre-temps (reprise des workers) : rien à faire
+            await db.rollback()
+            await db.refresh(deployment)
     
-    return deployment
+    return json_response(deployment_serializer.one(deployment))
 
 
 @router.delete("/{deployment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_deployment(
     deployment_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Supprimer un déploiement
     """
-    deployment = db.query(DeploymentHistory).filter(DeploymentHistory.id == deployment_id).first()
+    deployment = await db.get(DeploymentHistory, deployment_id)
     
     if not deployment:
         raise HTTPException(
@@ -264,8 +281,10 @@ async def delete_deployment(
             detail=f"Déploiement avec l'ID {deployment_id} non trouvé"
         )
     
-    db.delete(deployment)
-    db.commit()
+    await db.delete(deployment)
+    await db.commit()
+    await cache.invalidate_async(DEPLOYMENTS_NAMESPACE)
+    event_bus.publish("deployment.deleted", deployment_id=deployment_id)
     
     return None
 
@@ -0,0 +1,106 @@
+"""
+Routes de push temps réel des événements (déploiements, instances)
+
+- WebSocket : /ws/events?topics=deployments,instances
+- SSE (repli si WebSocket indisponible) : GET /api/events/stream?topics=...
+
+Sans `topics`, tous les événements sont transmis. Un message {"type": "ping"}
+(WebSocket) ou un commentaire SSE est envoyé après EVENTS_HEARTBEAT_SECONDS
+sans événement pour garder la connexion ouverte derrière les proxies.
+"""
+import asyncio
+import json
+from typing import Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.events import TOPICS, event_bus
+
+router = APIRouter()
+websocket_router = APIRouter()
+
+PING = {"type": "ping"}
+
+
+def _parse_topics(topics: Optional[str]) -> Set[str]:
+    """Sujets demandés ("deployments,instances") ; ValueError si inconnus"""
+    requested = {topic.strip() for topic in (topics or "").split(",") if topic.strip()}
+    unknown = requested - set(TOPICS)
+    if unknown:
+        raise ValueError(f"Sujets inconnus: {', '.join(sorted(unknown))} (disponibles: {', '.join(TOPICS)})")
+    return requested
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    """Consommer les messages du client jusqu'à sa déconnexion"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@websocket_router.websocket("/ws/events")
+async def events_websocket(websocket: WebSocket, topics: Optional[str] = None):
+    """
+    Flux d'événements par WebSocket (un message JSON par événement)
+    """
+    try:
+        requested = _parse_topics(topics)
+    except ValueError as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+        return
+
+    await websocket.accept()
+    subscription = event_bus.subscribe(requested)
+    disconnected = asyncio.ensure_future(_wait_disconnect(websocket))
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscription.get(settings.EVENTS_HEARTBEAT_SECONDS))
+            done, _ = await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                getter.cancel()
+                break
+            await websocket.send_json(getter.result() or PING)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        event_bus.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def events_stream(
+    topics: Optional[str] = Query(None, description="Sujets séparés par des virgules (deployments, instances)")
+):
+    """
+    Flux d'événements Server-Sent Events (repli du WebSocket /ws/events)
+
+    Chaque événement est une ligne `data:` contenant le JSON de l'événement.
+    """
+    try:
+        requested = _parse_topics(topics)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def stream():
+        subscription = event_bus.subscribe(requested)
+        try:
+            # Ouvre le flux immédiatement (les proxies attendent le premier octet)
+            yield ": connected\n\n"
+            while True:
+                event = await subscription.get(settings.EVENTS_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"data: {json.dumps(event, default=str)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,10 +1,10 @@
 """
 Routes pour la vérification de santé de l'API
 """
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from sqlalchemy import text
+from fastapi import APIRouter
+from starlette.concurrency import run_in_threadpool
+from app.core.database import async_engine, db_monitor, engine
+from app.core.db_health import pool_statistics
 
 router = APIRouter()
 
@@ -20,19 +20,24 @@ async def health_check():
 
 
 @router.get("/db")
-async def database_health(db: Session = Depends(get_db)):
-    """Vérification de santé de la base de données"""
-    try:
-        # Test de connexion à la base de données
-        db.execute(text("SELECT 1"))
-        return {
-            "status": "healthy",
-            "database": "connected"
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e)
-        }
+async def database_health():
+    """
+    Vérification de santé de la base de données
+
+    Renvoie l'état suivi par le moniteur de disponibilité et les statistiques
+    des pools (connexions utilisées, overflow, temps d'attente). Une vérification
+    est faite à la demande seulement si le moniteur n'a encore rien mesuré.
+    """
+    if db_monitor.available is None:
+        await run_in_threadpool(db_monitor.check)
 
+    return {
+        "status": "healthy" if db_monitor.available else "unhealthy",
+        "database": "connected" if db_monitor.available else "disconnected",
+        "error": db_monitor.last_error,
+        "liveness": db_monitor.as_dict(),
+        "pools": {
+            "api": pool_statistics(async_engine.sync_engine.pool),
+            "background": pool_statistics(engine.pool),
+        }
+    }
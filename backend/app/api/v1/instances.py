@@ -1,115 +1,264 @@
 """
 Routes pour la gestion des instances cloud
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.models.cloud_instance import CloudInstance, InstanceStatus, InstanceType
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+import random
+from app.core.cache import INSTANCE_SUMMARY_NAMESPACE, INSTANCES_NAMESPACE, cache
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.etag import etag_matches, make_etag, not_modified, probe_version, row_version, set_etag
+from app.core.events import event_bus
+from app.core.instance_costs import compute_costs, record_status_event, status_events_for
+from app.core.instance_summary import summarize_instances
+from app.core.pagination import NEXT_CURSOR_HEADER, keyset_paginate, set_next_cursor
+from app.core.serialization import RowSerializer, json_response, stream_rows
+from app.core.timeutils import as_utc
+from app.models.cloud_instance import ACTIVE_NAME_INDEX, CloudInstance, InstanceStatus, InstanceType
 from app.schemas.cloud_instance import (
     CloudInstanceCreate,
     CloudInstanceUpdate,
-    CloudInstanceResponse
+    CloudInstanceResponse,
+    CloudInstanceBatchCreate,
+    CloudInstanceBatchAction,
+    CloudInstanceBatchItem,
+    CloudInstanceBatchResponse,
+    CloudInstanceSummary
 )
+from app.schemas.instance_cost import InstanceCostReport
 
 router = APIRouter()
 
+# Action groupée -> (statut cible, événement publié, message si déjà dans ce statut)
+BATCH_ACTIONS = {
+    "start": (InstanceStatus.RUNNING, "instance.started", "Cette instance est déjà en cours d'exécution"),
+    "stop": (InstanceStatus.STOPPED, "instance.stopped", "Cette instance est déjà arrêtée"),
+    "delete": (InstanceStatus.TERMINATED, "instance.deleted", None),
+}
+
+
+def _is_name_conflict(error: IntegrityError) -> bool:
+    """Violation de l'index unique des noms d'instances actives"""
+    message = str(error.orig)
+    return ACTIVE_NAME_INDEX in message or "cloud_instances.name" in message
+
+
+def _name_taken_message(name: str) -> str:
+    return f"Une instance avec le nom '{name}' existe déjà. Veuillez choisir un nom unique."
+
+
+def _simulated_ip() -> str:
+    return f"10.0.{random.randint(1, 255)}.{random.randint(1, 255)}"
+
+
+def _batch_response(results: List[CloudInstanceBatchItem]) -> CloudInstanceBatchResponse:
+    succeeded = sum(1 for result in results if result.success)
+    return CloudInstanceBatchResponse(
+        requested=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+# Colonnes et conversion JSON des réponses CloudInstanceResponse
+instance_serializer = RowSerializer(CloudInstance, CloudInstanceResponse)
+
 
 @router.get("", response_model=List[CloudInstanceResponse])
 async def get_instances(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
     provider: str = None,
-    status: InstanceStatus = None
+    status: InstanceStatus = None,
+    stream: Optional[Literal["ndjson", "json"]] = Query(None, description="Export en flux de toutes les instances (sans limite)")
 ):
     """
     Récupérer la liste de toutes les instances cloud actives
+
+    Pagination : passer la valeur de l'en-tête X-Next-Cursor dans `cursor`
+    pour obtenir la page suivante (le paramètre `skip` reste supporté).
+    Les pages sont mises en cache jusqu'à la prochaine écriture sur une instance.
+    GET conditionnel : If-None-Match avec l'ETag reçu renvoie 304 si rien n'a changé.
+    Avec `stream` (ndjson ou json), toutes les instances à partir de `cursor`
+    sont envoyées en flux, lues par lots sur un curseur côté serveur.
     """
-    from sqlalchemy import desc
-    
-    query = db.query(CloudInstance).filter(CloudInstance.is_active == True)
+    cache_key = await cache.make_key_async(
+        INSTANCES_NAMESPACE, "list", skip, limit, cursor, provider, status.value if status else None
+    )
+    cached = await cache.get_async(cache_key) if not stream else None
+    if cached is not None:
+        if etag_matches(request, cached["etag"]):
+            return not_modified(cached["etag"])
+        set_etag(response, cached["etag"])
+        if cached["next_cursor"]:
+            response.headers[NEXT_CURSOR_HEADER] = cached["next_cursor"]
+        return json_response(cached["items"], response)
+
+    filters = [CloudInstance.is_active == True]
     
     if provider:
-        query = query.filter(CloudInstance.provider == provider)
+        filters.append(CloudInstance.provider == provider)
     
     if status:
         # Convertir l'enum en valeur string pour la requête
-        query = query.filter(CloudInstance.status == status.value)
+        filters.append(CloudInstance.status == status.value)
+
+    # Colonnes du schéma de réponse uniquement (tuples, sans objets ORM)
+    query = select(*instance_serializer.columns).where(*filters)
     
     # Trier par date de création décroissante (plus récentes en premier)
-    instances = query.order_by(desc(CloudInstance.created_at)).offset(skip).limit(limit).all()
-    
-    # Convertir les strings en enums pour Pydantic
-    for instance in instances:
-        if isinstance(instance.instance_type, str):
-            instance.instance_type = InstanceType(instance.instance_type)
-        if isinstance(instance.status, str):
-            instance.status = InstanceStatus(instance.status)
+    query = keyset_paginate(query, CloudInstance.created_at, CloudInstance.id, cursor, skip)
+    if stream:
+        # Export : ni limite, ni cache, ni ETag
+        return stream_rows(query, instance_serializer, stream)
+
+    # Sonde de version (count, max id, max updated_at, xmin) : 304 sans charger les lignes
+    version = await probe_version(db, CloudInstance, filters, row_version(CloudInstance, db.get_bind().dialect.name))
+    etag = make_etag(request, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    rows = (await db.execute(query.limit(limit))).all()
+    cursor_value = set_next_cursor(response, rows, limit, "created_at")
     
-    return instances
+    items = instance_serializer.many(rows)
+    await cache.set_async(cache_key, {"items": items, "next_cursor": cursor_value, "etag": etag})
+    return json_response(items, response)
+
+
+@router.get("/summary", response_model=CloudInstanceSummary)
+async def get_instances_summary(
+    include_inactive: bool = Query(False, description="Inclure les instances supprimées"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Synthèse de la flotte : nombre d'instances, cœurs, mémoire, stockage et
+    coût horaire, au total et par fournisseur, région et statut
+
+    Calculée en une seule requête (GROUPING SETS / ROLLUP) et mise en cache
+    INSTANCE_SUMMARY_CACHE_SECONDS secondes : les totaux peuvent avoir ce
+    retard sur les dernières écritures.
+    """
+    cache_key = None
+    if settings.INSTANCE_SUMMARY_CACHE_SECONDS > 0:
+        cache_key = await cache.make_key_async(INSTANCE_SUMMARY_NAMESPACE, include_inactive)
+    cached = await cache.get_async(cache_key)
+    if cached is not None:
+        return cached
+
+    summary = await summarize_instances(db, include_inactive)
+    summary["generated_at"] = datetime.now(timezone.utc).isoformat()
+    await cache.set_async(cache_key, summary, settings.INSTANCE_SUMMARY_CACHE_SECONDS)
+    return summary
+
+
+@router.get("/costs", response_model=InstanceCostReport)
+async def get_instances_costs(
+    start: Optional[datetime] = Query(None, description="Début de la période (défaut : début du mois courant)"),
+    end: Optional[datetime] = Query(None, description="Fin de la période, exclue (défaut : début du mois suivant)"),
+    group_by: Literal["instance", "provider", "region"] = Query("instance"),
+    provider: Optional[str] = Query(None),
+    region: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=10_000, description="Nombre maximal de groupes renvoyés (les plus coûteux)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Coûts des instances sur une période, d'après l'historique de leurs statuts
+
+    Seuls les intervalles "running" sont facturés, au tarif en vigueur. `cost`
+    est le coût accumulé jusqu'à maintenant ; `projected_cost` suppose que les
+    instances en cours d'exécution le restent jusqu'à `end`. Les totaux portent
+    sur tous les groupes, même au-delà de `limit`.
+    """
+    now = datetime.now(timezone.utc)
+    # Bornes sans fuseau considérées comme UTC (comparables entre elles)
+    start = as_utc(start) if start else now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if end is not None:
+        end = as_utc(end)
+    else:
+        month_start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = (month_start + timedelta(days=32)).replace(day=1)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fin de la période doit être postérieure à son début"
+        )
+
+    report = await compute_costs(db, start, end, group_by, provider, region, now, limit)
+    return InstanceCostReport(
+        start=start,
+        end=end,
+        group_by=group_by,
+        **report,
+        generated_at=now
+    )
 
 
 @router.post("", response_model=CloudInstanceResponse, status_code=status.HTTP_201_CREATED)
 async def create_instance(
     instance: CloudInstanceCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Créer une nouvelle instance cloud
+
+    Un seul INSERT ... RETURNING crée l'instance directement dans son état
+    final (running, IP attribuée) ; l'unicité du nom parmi les instances
+    actives est garantie par l'index unique partiel uq_cloud_instances_active_name,
+    y compris sous créations concurrentes (conflit -> 400).
     """
     try:
-        # Vérifier si une instance avec le même nom existe déjà (actives uniquement)
-        existing_instance = db.query(CloudInstance).filter(
-            CloudInstance.name == instance.name,
-            CloudInstance.is_active == True
-        ).first()
-        
-        if existing_instance:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Une instance avec le nom '{instance.name}' existe déjà. Veuillez choisir un nom unique."
-            )
-        
         # Convertir les enums en leurs valeurs string pour la base de données
         instance_type_value = instance.instance_type.value if isinstance(instance.instance_type, InstanceType) else str(instance.instance_type)
         
-        db_instance = CloudInstance(
-            name=instance.name,
-            instance_type=instance_type_value,
-            provider=instance.provider,
-            region=instance.region,
-            cpu_cores=instance.cpu_cores,
-            memory_gb=instance.memory_gb,
-            storage_gb=instance.storage_gb,
-            cost_per_hour=instance.cost_per_hour,
-            status=InstanceStatus.PENDING.value
-        )
-        
-        db.add(db_instance)
-        db.commit()
-        db.refresh(db_instance)
-        
         # Simuler l'attribution d'une IP (dans un vrai projet, ce serait via l'API du provider)
-        import random
-        db_instance.ip_address = f"10.0.{random.randint(1, 255)}.{random.randint(1, 255)}"
-        db_instance.status = InstanceStatus.RUNNING.value
-        db.commit()
-        db.refresh(db_instance)
+        db_instance = (await db.execute(
+            insert(CloudInstance).values(
+                name=instance.name,
+                instance_type=instance_type_value,
+                provider=instance.provider,
+                region=instance.region,
+                cpu_cores=instance.cpu_cores,
+                memory_gb=instance.memory_gb,
+                storage_gb=instance.storage_gb,
+                cost_per_hour=instance.cost_per_hour,
+                status=InstanceStatus.RUNNING.value,
+                ip_address=_simulated_ip()
+            ).returning(CloudInstance)
+        )).scalar_one()
+        record_status_event(db, db_instance)
+        await db.commit()
+        await cache.invalidate_async(INSTANCES_NAMESPACE)
+        event_bus.publish("instance.created", instance_id=db_instance.id, status=InstanceStatus.RUNNING.value)
         
-        # Convertir les strings en enums pour la réponse Pydantic
-        if isinstance(db_instance.instance_type, str):
-            db_instance.instance_type = InstanceType(db_instance.instance_type)
-        if isinstance(db_instance.status, str):
-            db_instance.status = InstanceStatus(db_instance.status)
-        
-        return db_instance
+        return json_response(instance_serializer.one(db_instance), status_code=status.HTTP_201_CREATED)
+    except IntegrityError as e:
+        await db.rollback()
+        if not _is_name_conflict(e):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Données invalides: {e.orig}"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_name_taken_message(instance.name)
+        )
     except HTTPException:
         # Re-raise les HTTPException (comme le nom dupliqué)
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_msg = str(e)
         # Message d'erreur plus clair
         if "relation" in error_msg.lower() and "does not exist" in error_msg.lower():
@@ -129,41 +278,235 @@ async def create_instance(
             )
 
 
+@router.post("/batch", response_model=CloudInstanceBatchResponse)
+async def create_instances_batch(
+    batch: CloudInstanceBatchCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Créer plusieurs instances en une requête
+
+    L'unicité des noms est vérifiée en une seule requête (IN), puis toutes les
+    instances valides sont insérées en un seul INSERT multi-lignes et un seul
+    commit. Les noms déjà utilisés ou en double dans la requête sont rejetés
+    individuellement (résultat par élément, dans l'ordre de la requête).
+    """
+    results: List[Optional[CloudInstanceBatchItem]] = [None] * len(batch.instances)
+    try:
+        names = {item.name for item in batch.instances}
+        existing = set((await db.execute(
+            select(CloudInstance.name).where(
+                CloudInstance.name.in_(names),
+                CloudInstance.is_active == True
+            )
+        )).scalars())
+
+        seen = set()
+        rows = []
+        indexes = []
+        for index, item in enumerate(batch.instances):
+            if item.name in existing:
+                error = _name_taken_message(item.name)
+            elif item.name in seen:
+                error = f"Nom '{item.name}' en double dans la requête"
+            else:
+                seen.add(item.name)
+                indexes.append(index)
+                # Création directe en running avec une IP simulée (un seul commit)
+                rows.append({
+                    **item.model_dump(),
+                    "instance_type": item.instance_type.value,
+                    "status": InstanceStatus.RUNNING.value,
+                    "ip_address": _simulated_ip(),
+                })
+                continue
+            results[index] = CloudInstanceBatchItem(index=index, name=item.name, success=False, error=error)
+
+        if rows:
+            created = (await db.execute(
+                insert(CloudInstance).returning(
+                    CloudInstance.id, CloudInstance.name, sort_by_parameter_order=True
+                ),
+                rows
+            )).all()
+            await db.execute(status_events_for(instance_id for instance_id, _ in created))
+            await db.commit()
+            await cache.invalidate_async(INSTANCES_NAMESPACE)
+            for index, (instance_id, name) in zip(indexes, created):
+                results[index] = CloudInstanceBatchItem(
+                    index=index, id=instance_id, name=name, success=True, status=InstanceStatus.RUNNING
+                )
+                event_bus.publish("instance.created", instance_id=instance_id, status=InstanceStatus.RUNNING.value)
+    except IntegrityError as e:
+        # Nom pris par une création concurrente entre la vérification et l'INSERT
+        await db.rollback()
+        if not _is_name_conflict(e):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Données invalides: {e.orig}"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Un des noms a été pris par une création concurrente. Aucune instance n'a été créée, veuillez réessayer."
+        )
+    except Exception as e:
+        await db.rollback()
+        error_msg = str(e)
+        if "relation" in error_msg.lower() and "does not exist" in error_msg.lower():
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Les tables de la base de données n'existent pas. Veuillez initialiser la base de données avec schema.sql"
+            )
+        elif "could not connect" in error_msg.lower() or "connection refused" in error_msg.lower():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Impossible de se connecter à PostgreSQL. Vérifiez que le serveur est démarré."
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la création des instances: {error_msg}"
+            )
+
+    return _batch_response(results)
+
+
+@router.post("/batch/{action}", response_model=CloudInstanceBatchResponse)
+async def instances_batch_action(
+    action: Literal["start", "stop", "delete"],
+    batch: CloudInstanceBatchAction,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Démarrer, arrêter ou supprimer (désactiver) plusieurs instances
+
+    Un seul UPDATE ensembliste (WHERE id IN (...) RETURNING id) et un seul
+    commit ; les instances non modifiées (introuvables, supprimées, déjà dans
+    le statut demandé) sont expliquées par une requête supplémentaire
+    uniquement s'il y en a.
+    """
+    target, event_type, already_message = BATCH_ACTIONS[action]
+    ids = list(dict.fromkeys(batch.ids))
+
+    criteria = [CloudInstance.id.in_(ids)]
+    values = {"status": target.value, "updated_at": func.now()}
+    if action == "delete":
+        # Soft delete, comme DELETE /api/instances/{id}
+        values["is_active"] = False
+    else:
+        criteria += [CloudInstance.is_active == True, CloudInstance.status != target.value]
+
+    updated = set((await db.execute(
+        update(CloudInstance)
+        .where(*criteria)
+        .values(**values)
+        .returning(CloudInstance.id)
+        .execution_options(synchronize_session=False)
+    )).scalars())
+
+    skipped = {}
+    if len(updated) < len(ids):
+        skipped = {
+            row.id: row for row in (await db.execute(
+                select(CloudInstance.id, CloudInstance.status, CloudInstance.is_active).where(
+                    CloudInstance.id.in_([instance_id for instance_id in ids if instance_id not in updated])
+                )
+            )).all()
+        }
+
+    if updated:
+        await db.execute(status_events_for(updated))
+    await db.commit()
+    if updated:
+        await cache.invalidate_async(INSTANCES_NAMESPACE)
+
+    results = []
+    seen = set()
+    for index, instance_id in enumerate(batch.ids):
+        if instance_id in seen:
+            results.append(CloudInstanceBatchItem(
+                index=index, id=instance_id, success=False, error="ID en double dans la requête"
+            ))
+            continue
+        seen.add(instance_id)
+        if instance_id in updated:
+            results.append(CloudInstanceBatchItem(index=index, id=instance_id, success=True, status=target))
+            event_bus.publish(event_type, instance_id=instance_id, status=target.value)
+            continue
+        row = skipped.get(instance_id)
+        if row is None:
+            error = f"Instance avec l'ID {instance_id} non trouvée"
+        elif not row.is_active:
+            error = "Cette instance a été supprimée"
+        else:
+            error = already_message
+        results.append(CloudInstanceBatchItem(
+            index=index,
+            id=instance_id,
+            success=False,
+            status=InstanceStatus(row.status) if row is not None else None,
+            error=error
+        ))
+
+    return _batch_response(results)
+
+
 @router.get("/{instance_id}", response_model=CloudInstanceResponse)
 async def get_instance(
     instance_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer les détails d'une instance spécifique
+
+    GET conditionnel : If-None-Match avec l'ETag reçu renvoie 304 si
+    l'instance n'a pas été modifiée.
     """
-    instance = db.query(CloudInstance).filter(CloudInstance.id == instance_id).first()
+    cache_key = await cache.make_key_async(INSTANCES_NAMESPACE, "item", instance_id)
+    cached = await cache.get_async(cache_key)
+    if cached is not None:
+        if etag_matches(request, cached["etag"]):
+            return not_modified(cached["etag"])
+        set_etag(response, cached["etag"])
+        return json_response(cached["item"], response)
+
+    if request.headers.get("if-none-match"):
+        # Sonde uniquement si le client a une version en cache
+        version = await probe_version(db, CloudInstance, [CloudInstance.id == instance_id], row_version(CloudInstance))
+        etag = make_etag(request, *version)
+        if version[0] and etag_matches(request, etag):
+            return not_modified(etag)
+
+    row = (await db.execute(
+        select(*instance_serializer.columns).where(CloudInstance.id == instance_id)
+    )).first()
     
-    if not instance:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Instance avec l'ID {instance_id} non trouvée"
         )
     
-    # Convertir les strings en enums pour la réponse Pydantic
-    if isinstance(instance.instance_type, str):
-        instance.instance_type = InstanceType(instance.instance_type)
-    if isinstance(instance.status, str):
-        instance.status = InstanceStatus(instance.status)
-    
-    return instance
+    # Même ETag que la sonde : (1 ligne, id, updated_at)
+    etag = make_etag(request, 1, row.id, row.updated_at)
+    set_etag(response, etag)
+    payload = instance_serializer.one(row)
+    await cache.set_async(cache_key, {"item": payload, "etag": etag})
+    return json_response(payload, response)
 
 
 @router.patch("/{instance_id}", response_model=CloudInstanceResponse)
 async def update_instance(
     instance_id: int,
     instance_update: CloudInstanceUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Mettre à jour une instance
     """
-    instance = db.query(CloudInstance).filter(CloudInstance.id == instance_id).first()
+    instance = await db.get(CloudInstance, instance_id)
     
     if not instance:
         raise HTTPException(
@@ -178,28 +521,36 @@ async def update_instance(
         if field == 'status' and isinstance(value, InstanceStatus):
             value = value.value
         setattr(instance, field, value)
+    if "status" in update_data or "cost_per_hour" in update_data:
+        # Nouveau statut ou nouveau tarif : nouvel intervalle de facturation
+        record_status_event(db, instance)
     
-    db.commit()
-    db.refresh(instance)
-    
-    # Convertir les strings en enums pour la réponse Pydantic
-    if isinstance(instance.instance_type, str):
-        instance.instance_type = InstanceType(instance.instance_type)
-    if isinstance(instance.status, str):
-        instance.status = InstanceStatus(instance.status)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if not _is_name_conflict(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_name_taken_message(update_data.get("name", ""))
+        )
+    await cache.invalidate_async(INSTANCES_NAMESPACE)
+    await db.refresh(instance)
+    event_bus.publish("instance.updated", instance_id=instance.id, status=instance.status)
     
-    return instance
+    return json_response(instance_serializer.one(instance))
 
 
 @router.post("/{instance_id}/stop", response_model=CloudInstanceResponse)
 async def stop_instance(
     instance_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Arrêter une instance
     """
-    instance = db.query(CloudInstance).filter(CloudInstance.id == instance_id).first()
+    instance = await db.get(CloudInstance, instance_id)
     
     if not instance:
         raise HTTPException(
@@ -220,27 +571,24 @@ async def stop_instance(
         )
     
     instance.status = InstanceStatus.STOPPED.value
-    db.commit()
-    db.refresh(instance)
-    
-    # Convertir les strings en enums pour la réponse Pydantic
-    if isinstance(instance.instance_type, str):
-        instance.instance_type = InstanceType(instance.instance_type)
-    if isinstance(instance.status, str):
-        instance.status = InstanceStatus(instance.status)
+    record_status_event(db, instance)
+    await db.commit()
+    await cache.invalidate_async(INSTANCES_NAMESPACE)
+    event_bus.publish("instance.stopped", instance_id=instance_id, status=InstanceStatus.STOPPED.value)
+    await db.refresh(instance)
     
-    return instance
+    return json_response(instance_serializer.one(instance))
 
 
 @router.post("/{instance_id}/start", response_model=CloudInstanceResponse)
 async def start_instance(
     instance_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Démarrer une instance
     """
-    instance = db.query(CloudInstance).filter(CloudInstance.id == instance_id).first()
+    instance = await db.get(CloudInstance, instance_id)
     
     if not instance:
         raise HTTPException(
@@ -261,27 +609,24 @@ async def start_instance(
         )
     
     instance.status = InstanceStatus.RUNNING.value
-    db.commit()
-    db.refresh(instance)
-    
-    # Convertir les strings en enums pour la réponse Pydantic
-    if isinstance(instance.instance_type, str):
-        instance.instance_type = InstanceType(instance.instance_type)
-    if isinstance(instance.status, str):
-        instance.status = InstanceStatus(instance.status)
+    record_status_event(db, instance)
+    await db.commit()
+    await cache.invalidate_async(INSTANCES_NAMESPACE)
+    event_bus.publish("instance.started", instance_id=instance_id, status=InstanceStatus.RUNNING.value)
+    await db.refresh(instance)
     
-    return instance
+    return json_response(instance_serializer.one(instance))
 
 
 @router.delete("/{instance_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_instance(
     instance_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Supprimer (désactiver) une instance
     """
-    instance = db.query(CloudInstance).filter(CloudInstance.id == instance_id).first()
+    instance = await db.get(CloudInstance, instance_id)
     
     if not instance:
         raise HTTPException(
@@ -292,7 +637,10 @@ async def delete_instance(
     # Soft delete
     instance.is_active = False
     instance.status = InstanceStatus.TERMINATED.value
-    db.commit()
+    record_status_event(db, instance)
+    await db.commit()
+    await cache.invalidate_async(INSTANCES_NAMESPACE)
+    event_bus.publish("instance.deleted", instance_id=instance_id, status=InstanceStatus.TERMINATED.value)
     
     return None
 
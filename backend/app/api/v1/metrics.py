@@ -1,103 +1,440 @@
 """
 Routes pour les métriques de monitoring
 """
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
-from datetime import datetime, timedelta
-import random
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import time
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db, with_statement_timeout
+from app.core.etag import commit_checksum, etag_matches, make_etag, not_modified, probe_version, set_etag
+from app.core.metric_aggregation import aggregate_metrics, bucket_count
+from app.core.metric_export import EXPORT_FORMATS, ExportUnavailable, MetricExportWriter, export_query
+from app.core.host_metrics import HostMetricsUnavailable, host_metrics, sample_rows
+from app.core.metric_buffer import metric_buffer
+from app.core.metric_ingest import MetricBatchWriter
+from app.core.metric_stream import metric_stream
+from app.core.pagination import keyset_paginate, set_next_cursor
+from app.core.serialization import RowSerializer, json_response, stream_rows
+from app.core.timeutils import as_utc
 from app.models.monitoring_metric import MonitoringMetric
-from app.schemas.monitoring_metric import MonitoringMetricResponse
+from app.schemas.monitoring_metric import (
+    MetricAggregateBucket,
+    MetricAggregateResponse,
+    MetricBatchRejection,
+    MetricBatchResponse,
+    MonitoringMetricResponse
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Colonnes et conversion JSON des réponses MonitoringMetricResponse
+metric_serializer = RowSerializer(MonitoringMetric, MonitoringMetricResponse)
+
 
 @router.get("", response_model=List[MonitoringMetricResponse])
 async def get_metrics(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     metric_type: Optional[str] = Query(None, description="Type de métrique (cpu, memory, network, storage)"),
     instance_id: Optional[int] = Query(None, description="ID de l'instance"),
-    limit: int = Query(100, ge=1, le=1000)
+    start: Optional[datetime] = Query(None, description="Début de la plage de temps"),
+    end: Optional[datetime] = Query(None, description="Fin de la plage de temps (exclue)"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
+    stream: Optional[Literal["ndjson", "json"]] = Query(None, description="Export en flux de toutes les métriques (sans limite)")
 ):
     """
     Récupérer les métriques de monitoring
+
+    Les filtres start/end portent sur la clé de partitionnement : PostgreSQL
+    ne lit que les partitions de la plage demandée. Pagination : passer la
+    valeur de l'en-tête X-Next-Cursor dans `cursor`. GET conditionnel :
+    If-None-Match avec l'ETag reçu renvoie 304 si aucune métrique n'a été
+    validée ou supprimée depuis. Avec `stream` (ndjson ou json), toutes les
+    métriques filtrées à partir de `cursor` sont envoyées en flux, lues par
+    lots sur un curseur côté serveur (mémoire constante).
     """
-    query = db.query(MonitoringMetric)
+    filters = []
     
     if metric_type:
-        query = query.filter(MonitoringMetric.metric_type == metric_type)
+        filters.append(MonitoringMetric.metric_type == metric_type)
     
     if instance_id:
-        query = query.filter(MonitoringMetric.instance_id == instance_id)
-    
-    metrics = query.order_by(desc(MonitoringMetric.timestamp)).limit(limit).all()
-    return metrics
+        filters.append(MonitoringMetric.instance_id == instance_id)
+
+    if start:
+        filters.append(MonitoringMetric.timestamp >= as_utc(start))
+
+    if end:
+        filters.append(MonitoringMetric.timestamp < as_utc(end))
+
+    query = keyset_paginate(
+        select(*metric_serializer.columns).where(*filters), MonitoringMetric.timestamp, MonitoringMetric.id, cursor
+    )
+    if stream:
+        # Export : ni limite ni ETag
+        return stream_rows(query, metric_serializer, stream)
+
+    # max(id) et min(id) ne suffisent pas : une transaction ayant réservé des
+    # ids plus petits (lot COPY, tampon d'écriture) peut être validée après
+    # une autre ; la somme des xmin change à chaque ligne validée
+    aggregates = [func.max(MonitoringMetric.id), func.min(MonitoringMetric.id)]
+    aggregates += commit_checksum(MonitoringMetric, db.get_bind().dialect.name)
+    version = await probe_version(db, MonitoringMetric, filters, aggregates)
+    etag = make_etag(request, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    rows = (await db.execute(query.limit(limit))).all()
+    set_next_cursor(response, rows, limit, "timestamp")
+    return json_response(metric_serializer.many(rows), response)
+
+
+@router.get("/aggregate", response_model=MetricAggregateResponse)
+async def get_metrics_aggregate(
+    db: AsyncSession = Depends(with_statement_timeout(settings.METRICS_AGGREGATE_STATEMENT_TIMEOUT_MS)),
+    metric_type: str = Query(..., description="Type de métrique (cpu, memory, network, storage)"),
+    instance_id: Optional[int] = Query(None, description="ID de l'instance"),
+    start: Optional[datetime] = Query(None, description="Début de la plage (défaut: end - 24h)"),
+    end: Optional[datetime] = Query(None, description="Fin de la plage, exclue (défaut: maintenant)"),
+    bucket: Literal["1m", "5m", "1h", "1d"] = Query("5m", description="Largeur des intervalles"),
+    source: Literal["auto", "rollup", "raw"] = Query("auto", description="Source: rollups pré-calculés ou métriques brutes")
+):
+    """
+    Récupérer une série agrégée (min/max/avg/p95/count) par intervalle de temps
+
+    L'agrégation est calculée dans PostgreSQL : seuls les points agrégés sont
+    renvoyés, sans limite sur le nombre de métriques brutes couvertes. En mode
+    auto, les intervalles déjà compactés sont lus dans le rollup le plus
+    grossier compatible : seul un majorant du p95 y est connu
+    (p95_upper_bound, p95 vide).
+    """
+    end = as_utc(end) if end else datetime.now(timezone.utc)
+    start = as_utc(start) if start else end - timedelta(hours=24)
+
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le paramètre 'start' doit être antérieur à 'end'"
+        )
+
+    if bucket_count(start, end, bucket) > settings.METRICS_AGGREGATE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trop d'intervalles demandés (maximum {settings.METRICS_AGGREGATE_MAX_BUCKETS}). Réduisez la plage ou augmentez la largeur."
+        )
+
+    rows, used_source = await aggregate_metrics(db, metric_type, start, end, bucket, instance_id, source)
+
+    return MetricAggregateResponse(
+        metric_type=metric_type,
+        instance_id=instance_id,
+        bucket_width=bucket,
+        source=used_source,
+        start=start,
+        end=end,
+        buckets=[
+            MetricAggregateBucket(
+                bucket=row.bucket,
+                count=int(row.count),
+                min=row.min,
+                max=row.max,
+                avg=row.avg,
+                p95=row.p95,
+                p95_upper_bound=row.p95_upper_bound
+            )
+            for row in rows
+        ]
+    )
+
+
+@router.get("/export")
+async def export_metrics(
+    start: datetime = Query(..., description="Début de la plage"),
+    end: Optional[datetime] = Query(None, description="Fin de la plage, exclue (défaut: maintenant)"),
+    format: Literal["parquet", "arrow", "csv"] = Query("parquet", description="Parquet, Arrow IPC (flux) ou CSV gzip"),
+    metric_type: Optional[str] = Query(None, description="Type de métrique (cpu, memory, network, storage)"),
+    instance_id: Optional[int] = Query(None, description="ID de l'instance")
+):
+    """
+    Exporter les métriques brutes d'une plage de temps, sans limite de lignes
+
+    Le fichier est produit en flux : lecture par lots sur un curseur côté
+    serveur, encodage de chaque lot hors de la boucle d'événements, mémoire
+    constante quelle que soit la plage. Même export en ligne de commande :
+    `python -m app.core.metric_export`.
+    """
+    start = as_utc(start)
+    end = as_utc(end) if end else datetime.now(timezone.utc)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le paramètre 'start' doit être antérieur à 'end'"
+        )
+    try:
+        writer = MetricExportWriter(format)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    query = export_query(start, end, metric_type, instance_id)
+
+    async def body():
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query.execution_options(yield_per=settings.METRICS_EXPORT_CHUNK_SIZE))
+            async for rows in result.partitions():
+                yield await run_in_threadpool(writer.write, rows)
+        yield writer.close()
+        duration = time.perf_counter() - started
+        rate = writer.rows / duration if duration > 0 else 0
+        logger.info(f"📦 Export {format}: {writer.rows} métriques en {duration:.1f}s ({rate:.0f} lignes/s)")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"metrics-{start:%Y%m%dT%H%M%S}-{end:%Y%m%dT%H%M%S}.{extension}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/stream")
+async def stream_metrics(
+    instance_id: Optional[List[int]] = Query(None, description="Instances suivies (paramètre répétable)"),
+    metric_type: Optional[List[str]] = Query(None, description="Types suivis (paramètre répétable)"),
+    interval: float = Query(1.0, ge=0, le=60, description="Un point moyen par série et par intervalle (0 = points bruts)")
+):
+    """
+    Flux Server-Sent Events des métriques au fil de leur ingestion
+
+    Chaque message `data:` contient {"points": [...], "dropped": n}. Avec
+    `interval` > 0, chaque point est la moyenne (avec min, max et count) des
+    échantillons d'une série sur l'intervalle ; avec `interval=0`, les points
+    bruts sont transmis et un client trop lent perd les plus anciens
+    (`dropped` cumule les points perdus).
+    """
+    async def stream():
+        subscription = metric_stream.subscribe(instance_id, metric_type, interval)
+        try:
+            yield ": connected\n\n"
+            last_sent = time.monotonic()
+            while True:
+                await subscription.wait(settings.EVENTS_HEARTBEAT_SECONDS)
+                points = subscription.drain()
+                if points:
+                    yield f"data: {json.dumps({'points': points, 'dropped': subscription.dropped})}\n\n"
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= settings.EVENTS_HEARTBEAT_SECONDS:
+                    yield ": ping\n\n"
+                    last_sent = time.monotonic()
+        finally:
+            metric_stream.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _ingest_json(request: Request, writer: MetricBatchWriter) -> int:
+    """Lire un tableau JSON de métriques et l'envoyer par paquets au writer"""
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Corps JSON invalide"
+        )
+
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le corps doit être un tableau JSON de métriques"
+        )
+
+    if len(items) > settings.METRICS_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lot trop volumineux: {len(items)} lignes (maximum {settings.METRICS_BATCH_MAX_ROWS})"
+        )
+
+    for offset in range(0, len(items), writer.chunk_size):
+        await writer.add(items[offset:offset + writer.chunk_size], offset)
+
+    return len(items)
+
+
+async def _ingest_ndjson(request: Request, writer: MetricBatchWriter) -> int:
+    """Lire un flux NDJSON (une métrique par ligne) sans charger tout le corps"""
+    received = 0
+    offset = 0
+    items = []
+    remainder = b""
+
+    async def handle_line(line: bytes):
+        nonlocal received, offset, items
+        if not line.strip():
+            return
+        index = received
+        received += 1
+        if received > settings.METRICS_BATCH_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Lot trop volumineux (maximum {settings.METRICS_BATCH_MAX_ROWS} lignes)"
+            )
+        try:
+            item = json.loads(line)
+        except ValueError:
+            # Envoyer les lignes déjà lues pour garder des index contigus
+            await writer.add(items, offset)
+            items = []
+            offset = index + 1
+            writer.reject(index, "JSON invalide")
+            return
+        items.append(item)
+        if len(items) >= writer.chunk_size:
+            await writer.add(items, offset)
+            items = []
+            offset = received
+
+    async for chunk in request.stream():
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            await handle_line(line)
+    await handle_line(remainder)
+
+    await writer.add(items, offset)
+    return received
+
+
+@router.post("/batch", response_model=MetricBatchResponse)
+async def ingest_metrics_batch(
+    request: Request,
+    db: AsyncSession = Depends(with_statement_timeout(settings.METRICS_BATCH_STATEMENT_TIMEOUT_MS))
+):
+    """
+    Ingérer un lot de métriques en une seule transaction
+
+    Formats acceptés :
+    - application/json : tableau JSON de métriques
+    - application/x-ndjson : une métrique JSON par ligne (lu en streaming)
+
+    Les lignes invalides (ou dont l'instance n'existe pas) sont rejetées
+    individuellement ; les lignes valides sont écrites avec COPY.
+    """
+    started = time.perf_counter()
+    writer = MetricBatchWriter(db)
+
+    try:
+        content_type = request.headers.get("content-type", "")
+        if "ndjson" in content_type or "jsonl" in content_type:
+            received = await _ingest_ndjson(request, writer)
+        else:
+            received = await _ingest_json(request, writer)
+
+        await writer.flush()
+        await db.commit()
+        metric_stream.publish(writer.written)
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        error_msg = str(e)
+        if "relation" in error_msg.lower() and "does not exist" in error_msg.lower():
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Les tables de la base de données n'existent pas. Veuillez initialiser la base de données avec schema.sql"
+            )
+        elif "could not connect" in error_msg.lower() or "connection refused" in error_msg.lower():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Impossible de se connecter à PostgreSQL. Vérifiez que le serveur est démarré."
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de l'ingestion des métriques: {error_msg}"
+            )
+
+    duration = time.perf_counter() - started
+    rows_per_second = writer.accepted / duration if duration > 0 else 0.0
+    logger.info(
+        f"📥 Lot de métriques ingéré: {writer.accepted}/{received} lignes "
+        f"en {duration * 1000:.1f} ms ({rows_per_second:.0f} lignes/s, {writer.rejected} rejets)"
+    )
+
+    rejections = sorted(writer.rejections)[:settings.METRICS_BATCH_MAX_REJECTIONS]
+    return MetricBatchResponse(
+        received=received,
+        accepted=writer.accepted,
+        rejected=writer.rejected,
+        rejections=[MetricBatchRejection(index=index, error=error) for index, error in rejections],
+        duration_ms=round(duration * 1000, 2),
+        rows_per_second=round(rows_per_second, 1)
+    )
 
 
 @router.get("/simulate")
-async def simulate_metrics(db: Session = Depends(get_db)):
+async def simulate_metrics():
     """
-    Générer des métriques simulées pour la démonstration
+    Enregistrer un échantillon réel de l'hôte (CPU, mémoire, stockage, réseau)
+
+    Les métriques sont déposées dans le tampon d'écriture différée et écrites
+    avec le prochain lot (au plus METRIC_BUFFER_FLUSH_INTERVAL_SECONDS).
     """
-    metric_types = ["cpu", "memory", "network", "storage"]
-    
-    # Générer des métriques pour chaque type
-    for metric_type in metric_types:
-        if metric_type == "cpu":
-            value = random.uniform(20, 80)
-            unit = "percent"
-        elif metric_type == "memory":
-            value = random.uniform(30, 70)
-            unit = "percent"
-        elif metric_type == "network":
-            value = random.uniform(10, 100)
-            unit = "mbps"
-        else:  # storage
-            value = random.uniform(40, 90)
-            unit = "percent"
-        
-        metric = MonitoringMetric(
-            metric_type=metric_type,
-            value=round(value, 2),
-            unit=unit
+    try:
+        sample = await run_in_threadpool(host_metrics.sampler.sample)
+    except HostMetricsUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    rows = sample_rows(sample)
+    if await metric_buffer.submit_async(rows) < len(rows):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tampon d'écriture des métriques plein, réessayez plus tard"
         )
-        db.add(metric)
-    
-    db.commit()
-    return {"message": "Métriques simulées créées avec succès"}
+    return {"message": "Métriques de l'hôte mises en file d'écriture", "queued": len(rows)}
+
+
+async def _latest_host_sample() -> dict:
+    """Dernier échantillon du collecteur, ou mesure à la demande s'il n'a pas encore tourné"""
+    sample = host_metrics.latest()
+    if sample is not None:
+        return sample
+    try:
+        return await run_in_threadpool(host_metrics.collect)
+    except HostMetricsUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
 
 
 @router.get("/system")
 async def get_system_metrics():
     """
-    Récupérer des métriques système simulées (pour démonstration)
+    Métriques système de l'hôte (CPU, RAM, stockage, réseau)
+
+    Dernier échantillon du collecteur d'arrière-plan (toutes les
+    HOST_METRICS_INTERVAL_SECONDS), servi depuis la mémoire.
     """
-    return {
-        "cpu": {
-            "usage_percent": round(random.uniform(20, 80), 2),
-            "cores": 4,
-            "load_average": round(random.uniform(0.5, 2.5), 2)
-        },
-        "memory": {
-            "usage_percent": round(random.uniform(30, 70), 2),
-            "total_gb": 16,
-            "used_gb": round(random.uniform(5, 11), 2),
-            "available_gb": round(random.uniform(5, 11), 2)
-        },
-        "storage": {
-            "usage_percent": round(random.uniform(40, 90), 2),
-            "total_gb": 500,
-            "used_gb": round(random.uniform(200, 450), 2),
-            "available_gb": round(random.uniform(50, 300), 2)
-        },
-        "network": {
-            "inbound_mbps": round(random.uniform(10, 100), 2),
-            "outbound_mbps": round(random.uniform(5, 50), 2),
-            "packets_sent": random.randint(1000, 10000),
-            "packets_received": random.randint(1000, 10000)
-        },
-        "timestamp": datetime.now().isoformat()
-    }
+    return await _latest_host_sample()
 
+
+@router.get("/system/history")
+async def get_system_metrics_history(
+    limit: int = Query(60, ge=1, le=10_000, description="Nombre d'échantillons (les plus récents)")
+):
+    """Échantillons récents de l'hôte gardés en mémoire, du plus ancien au plus récent"""
+    history = host_metrics.history(limit)
+    return history or [await _latest_host_sample()]
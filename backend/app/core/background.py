@@ -0,0 +1,59 @@
+"""
+Tâches périodiques exécutées dans des threads d'arrière-plan
+"""
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Exécute `run_once` à intervalle régulier dans un thread daemon
+
+    Les sous-classes implémentent `run_once` ; si elle retourne True, la passe
+    suivante est enchaînée sans attendre (retard à rattraper).
+    """
+
+    name = "periodic-worker"
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> bool:
+        raise NotImplementedError
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                busy = self.run_once()
+            except Exception as e:
+                logger.warning(f"⚠️ [{self.name}] Erreur dans la tâche périodique: {e}")
+                busy = False
+            if not busy:
+                self._stop_event.wait(self.interval_seconds)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"✅ [{self.name}] Démarré (toutes les {self.interval_seconds}s)")
+
+    def request_stop(self):
+        """Demander l'arrêt sans attendre la fin de la passe en cours"""
+        self._stop_event.set()
+
+    def stop(self, timeout: float = 5.0):
+        self.request_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,258 @@
+"""
+Cache en lecture (read-through) pour les lectures fréquentes de l'API
+
+Backends :
+- "memory" : LRU en mémoire avec TTL, propre à chaque processus
+- "redis"  : client Redis (ou tout objet compatible get/set/incr,
+             ex: un substitut local en développement), partagé entre workers
+
+Invalidation par version de namespace : chaque clé contient la version
+courante de son namespace ("instances", "deployments"...). Une écriture
+incrémente la version, ce qui rend d'un coup obsolètes le détail et toutes
+les listes du namespace ; les anciennes entrées expirent via TTL/LRU. Une
+lecture commencée avant l'écriture stocke son résultat sous l'ancienne
+version et ne peut donc pas réintroduire une valeur périmée.
+
+Le cache ne fait jamais échouer une requête : une erreur du backend est
+journalisée et traitée comme un miss. Les routes async passent par les
+méthodes *_async de la façade : avec un backend bloquant (Redis, appels
+réseau), l'appel est fait dans le threadpool et non dans la boucle
+d'événements.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = registry.counter("cache_hits_total", "Lectures servies par le cache", ["namespace"])
+CACHE_MISSES = registry.counter("cache_misses_total", "Lectures absentes du cache", ["namespace"])
+CACHE_EVICTIONS = registry.counter(
+    "cache_evictions_total", "Entrées retirées du cache (capacity: LRU, expired: TTL)", ["reason"]
+)
+CACHE_INVALIDATIONS = registry.counter(
+    "cache_invalidations_total", "Invalidations de namespace après écriture", ["namespace"]
+)
+CACHE_ERRORS = registry.counter("cache_errors_total", "Erreurs du backend de cache", ["operation"])
+
+
+class MemoryCacheBackend:
+    """LRU thread-safe avec expiration (TTL) par entrée"""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Versions hors LRU : une version évincée ferait revivre d'anciennes entrées
+        self._versions = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                CACHE_EVICTIONS.inc(reason="expired")
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.inc(reason="capacity")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def version(self, namespace: str) -> int:
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def bump_version(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Backend Redis ; les valeurs sont sérialisées en JSON
+
+    `client` est un redis.Redis (ou un substitut exposant get/set/delete/incr/scan_iter).
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client, prefix: str = "cloud-api:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        # En millisecondes : ex=int(ttl) donnerait 0 (refusé par Redis) sous la seconde
+        self.client.set(self.prefix + key, json.dumps(value), px=max(int(ttl * 1000), 1) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def version(self, namespace: str) -> int:
+        return int(self.client.get(f"{self.prefix}{namespace}:__version__") or 0)
+
+    def bump_version(self, namespace: str) -> int:
+        return int(self.client.incr(f"{self.prefix}{namespace}:__version__"))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class ReadThroughCache:
+    """Façade utilisée par les routes : clés versionnées, compteurs, erreurs"""
+
+    def __init__(self, backend, ttl_seconds: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+
+    def _namespace_version(self, namespace: str) -> int:
+        try:
+            return self.backend.version(namespace)
+        except Exception as e:
+            CACHE_ERRORS.inc(operation="version")
+            logger.warning(f"⚠️ [cache] Version du namespace {namespace} illisible: {e}")
+            return -1
+
+    def make_key(self, namespace: str, *parts: Any) -> Optional[str]:
+        """
+        Construire la clé d'une lecture ; à appeler avant la requête SQL
+
+        Retourne None si le cache est désactivé ou indisponible.
+        """
+        if not self.enabled:
+            return None
+        version = self._namespace_version(namespace)
+        if version < 0:
+            return None
+        suffix = ":".join("" if part is None else str(part) for part in parts)
+        return f"{namespace}:v{version}:{suffix}"
+
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        if key is None:
+            return None
+        namespace = key.split(":", 1)[0]
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            CACHE_ERRORS.inc(operation="get")
+            logger.warning(f"⚠️ [cache] Lecture impossible ({key}): {e}")
+            value = None
+        if value is None:
+            CACHE_MISSES.inc(namespace=namespace)
+        else:
+            CACHE_HITS.inc(namespace=namespace)
+        return value
+
+    def set(self, key: Optional[str], value: Any, ttl: Optional[float] = None) -> None:
+        if key is None:
+            return
+        try:
+            self.backend.set(key, value, ttl or self.ttl_seconds)
+        except Exception as e:
+            CACHE_ERRORS.inc(operation="set")
+            logger.warning(f"⚠️ [cache] Écriture impossible ({key}): {e}")
+
+    def invalidate(self, namespace: str) -> None:
+        """Rendre obsolètes toutes les entrées du namespace (après une écriture)"""
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump_version(namespace)
+            CACHE_INVALIDATIONS.inc(namespace=namespace)
+        except Exception as e:
+            CACHE_ERRORS.inc(operation="invalidate")
+            logger.warning(f"⚠️ [cache] Invalidation impossible ({namespace}): {e}")
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    async def _offload(self, method, *args):
+        """Appeler une méthode de la façade sans bloquer la boucle d'événements"""
+        if not self.enabled or not getattr(self.backend, "blocking", True):
+            return method(*args)
+        return await run_in_threadpool(method, *args)
+
+    async def make_key_async(self, namespace: str, *parts: Any) -> Optional[str]:
+        return await self._offload(self.make_key, namespace, *parts)
+
+    async def get_async(self, key: Optional[str]) -> Optional[Any]:
+        if key is None:
+            return None
+        return await self._offload(self.get, key)
+
+    async def set_async(self, key: Optional[str], value: Any, ttl: Optional[float] = None) -> None:
+        if key is None:
+            return
+        await self._offload(self.set, key, value, ttl)
+
+    async def invalidate_async(self, namespace: str) -> None:
+        await self._offload(self.invalidate, namespace)
+
+
+def create_backend():
+    """Backend choisi par CACHE_BACKEND ("memory" ou "redis")"""
+    if settings.CACHE_BACKEND == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.warning("⚠️ [cache] Paquet redis non installé : utilisation du cache mémoire")
+        else:
+            client = redis.Redis.from_url(
+                settings.CACHE_REDIS_URL,
+                socket_timeout=settings.CACHE_REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.CACHE_REDIS_SOCKET_TIMEOUT_SECONDS,
+            )
+            return RedisCacheBackend(client)
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+cache = ReadThroughCache(
+    create_backend(),
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    enabled=settings.CACHE_BACKEND != "none",
+)
+
+# Namespaces utilisés par les routes
+INSTANCES_NAMESPACE = "instances"
+DEPLOYMENTS_NAMESPACE = "deployments"
+# Jamais invalidé : expiration par TTL uniquement (staleness bornée assumée)
+INSTANCE_SUMMARY_NAMESPACE = "instance-summary"
@@ -1,75 +1,248 @@
 """
 Configuration de la connexion à la base de données PostgreSQL
 """
-from sqlalchemy import create_engine
+from uuid import uuid4
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from fastapi import Depends, HTTPException, status
 from app.core.config import settings
+from app.core.db_health import (
+    DatabaseLivenessMonitor,
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    register_pool_gauges,
+)
+from app.core.request_metrics import instrument_engine
+from app.core.slow_queries import SlowQueryLog
 import logging
 
 logger = logging.getLogger(__name__)
 
+def get_async_database_url(url: str) -> str:
+    """Convertir l'URL synchrone (psycopg2) en URL asynchrone (asyncpg)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _connect_args(url: str) -> dict:
+    """
+    Paramètres de connexion propres au driver : timeout de connexion et
+    statement_timeout global, transmis à l'ouverture de la connexion (aucune
+    requête SET supplémentaire)
+
+    Derrière PgBouncer (mode transaction), les paramètres de démarrage ne sont
+    pas transmis : configurer statement_timeout sur le rôle PostgreSQL
+    (ALTER ROLE ... SET statement_timeout) ; le cache de requêtes préparées
+    d'asyncpg est désactivé.
+    """
+    driver = make_url(url).get_driver_name()
+    statement_timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if driver == "asyncpg":
+        args = {"timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+        if settings.DB_PGBOUNCER:
+            args.update({
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            })
+        elif statement_timeout:
+            args["server_settings"] = {"statement_timeout": str(statement_timeout)}
+        return args
+    if driver == "psycopg2":
+        args = {"connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+        if statement_timeout and not settings.DB_PGBOUNCER:
+            args["options"] = f"-c statement_timeout={statement_timeout}"
+        return args
+    return {}
+
+
+def _pool_args() -> dict:
+    """Dimensionnement du pool, commun aux deux moteurs (par processus uvicorn)"""
+    return {
+        # Pas de pool_pre_ping par défaut : la disponibilité est suivie par le
+        # moniteur db_monitor, sans aller-retour supplémentaire à chaque checkout
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
 # Créer le moteur SQLAlchemy avec gestion d'erreurs améliorée
 # Note: create_engine ne se connecte pas immédiatement, donc cela ne devrait pas échouer
 # même si PostgreSQL n'est pas disponible
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,  # Vérifie la connexion avant utilisation
-    pool_size=10,
-    max_overflow=20,
-    echo=False,  # Mettre à True pour voir les requêtes SQL
-    connect_args={
-        "connect_timeout": 10,  # Timeout de connexion de 10 secondes
-    }
+    poolclass=TimedQueuePool,
+    echo=settings.DB_ECHO,
+    connect_args=_connect_args(settings.DATABASE_URL),
+    **_pool_args()
 )
 logger.info(f"✅ Moteur SQLAlchemy créé avec succès")
 
 # Session locale
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# Moteur asynchrone (asyncpg) utilisé par les routes : les requêtes ne bloquent
+# plus la boucle d'événements, la concurrence est bornée par le pool
+_async_url = get_async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    echo=settings.DB_ECHO,
+    connect_args=_connect_args(_async_url),
+    **_pool_args()
+)
+
+register_pool_gauges({"api": async_engine.sync_engine, "background": engine})
+
+# Instructions SQL comptées par requête HTTP (voir app/core/request_metrics.py)
+if settings.REQUEST_METRICS_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+# Journal des requêtes lentes (voir app/core/slow_queries.py)
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_THRESHOLD_MS,
+    settings.SLOW_QUERY_BUFFER_SIZE,
+    settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+)
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_log.instrument(engine)
+    slow_query_log.instrument(async_engine.sync_engine)
+
+# Session asynchrone ; expire_on_commit=False évite un rechargement implicite
+# (impossible hors await) des attributs après un commit
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Base pour les modèles
 Base = declarative_base()
 
+# Moniteur de disponibilité (démarré avec l'application)
+db_monitor = DatabaseLivenessMonitor(
+    engine,
+    settings.DB_LIVENESS_INTERVAL_SECONDS,
+    engines_to_reset=(async_engine.sync_engine,),
+)
+
+
+def _database_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Impossible de se connecter à PostgreSQL. Vérifiez que le serveur est démarré et que la base de données existe."
+    )
+
+
+def _database_http_error(e: Exception) -> HTTPException:
+    """Traduire une erreur de connexion à la base en HTTPException"""
+    if isinstance(e, OSError):
+        # asyncpg remonte les refus de connexion sous forme d'OSError
+        logger.error(f"❌ Erreur de connexion à la base de données: {e}")
+        return _database_unavailable()
+    if not isinstance(e, SQLAlchemyError):
+        logger.error(f"❌ Erreur inattendue: {e}")
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur inattendue: {str(e)}"
+        )
+
+    logger.error(f"❌ Erreur de connexion à la base de données: {e}")
+    error_msg = str(e).lower()
+    if "statement timeout" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="La requête a dépassé le délai maximal d'exécution (statement_timeout)."
+        )
+    if isinstance(e, PoolTimeoutError):
+        # Aucune connexion libérée dans le pool avant pool_timeout
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Toutes les connexions à la base de données sont occupées. Réessayez plus tard."
+        )
+    if "could not connect" in error_msg or "connection refused" in error_msg or "connection timed out" in error_msg:
+        return _database_unavailable()
+    elif "relation" in error_msg and "does not exist" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Les tables de la base de données n'existent pas. Veuillez initialiser la base de données."
+        )
+    else:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Erreur de base de données: {str(e)}"
+        )
+
 
 def get_db():
     """
-    Dépendance pour obtenir une session de base de données
+    Dépendance pour obtenir une session de base de données (synchrone)
+
+    Aucune requête de test n'est envoyée : si le moniteur sait la base
+    indisponible, la requête échoue immédiatement en 503.
     """
-    from sqlalchemy import text
-    from fastapi import HTTPException, status
-    
+    if db_monitor.known_down:
+        raise _database_unavailable()
     db = SessionLocal()
     try:
-        # Tester la connexion avant de retourner la session
-        db.execute(text("SELECT 1"))
         yield db
-    except SQLAlchemyError as e:
-        logger.error(f"❌ Erreur de connexion à la base de données: {e}")
+    except HTTPException:
         db.rollback()
-        error_msg = str(e).lower()
-        if "could not connect" in error_msg or "connection refused" in error_msg or "connection timed out" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Impossible de se connecter à PostgreSQL. Vérifiez que le serveur est démarré et que la base de données existe."
-            )
-        elif "relation" in error_msg and "does not exist" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Les tables de la base de données n'existent pas. Veuillez initialiser la base de données."
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"Erreur de base de données: {str(e)}"
-            )
+        raise
     except Exception as e:
-        logger.error(f"❌ Erreur inattendue: {e}")
         db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur inattendue: {str(e)}"
-        )
+        raise _database_http_error(e)
     finally:
         db.close()
 
+
+async def get_async_db():
+    """
+    Dépendance pour obtenir une session de base de données asynchrone
+
+    Même principe que get_db : pas d'aller-retour de test par requête.
+    """
+    if db_monitor.known_down:
+        raise _database_unavailable()
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise _database_http_error(e)
+    finally:
+        await db.close()
+
+
+def with_statement_timeout(timeout_ms: int):
+    """
+    Dépendance : session asynchrone avec un statement_timeout propre à la route
+
+    `SET LOCAL` ne vaut que pour la transaction en cours (compatible avec
+    PgBouncer en mode transaction) ; il est ignoré hors PostgreSQL.
+    """
+    async def dependency(db: AsyncSession = Depends(get_async_db)) -> AsyncSession:
+        if timeout_ms and db.bind.dialect.name == "postgresql":
+            await db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        return db
+
+    return dependency
@@ -0,0 +1,227 @@
+"""
+Santé des connexions à la base de données
+
+- Pools instrumentés : checkouts, temps d'attente et timeouts du pool,
+  exportés aussi dans le registre de télémétrie (GET /metrics)
+- Moniteur de disponibilité : un thread d'arrière-plan vérifie périodiquement
+  que PostgreSQL répond ; tant que la base est connue comme indisponible, les
+  requêtes échouent immédiatement (503) au lieu d'attendre le timeout de
+  connexion. Les requêtes ne font donc plus de `SELECT 1` elles-mêmes.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.background import PeriodicWorker
+from app.core.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+POOL_CHECKOUTS = registry.counter(
+    "db_pool_checkouts_total", "Connexions obtenues du pool", ["pool"]
+)
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Temps d'attente pour obtenir une connexion du pool", ["pool"]
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total", "Checkouts abandonnés après pool_timeout", ["pool"]
+)
+POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_checked_out", "Connexions actuellement empruntées", ["pool"]
+)
+POOL_OVERFLOW = registry.gauge(
+    "db_pool_overflow", "Connexions ouvertes au-delà de pool_size (négatif: places libres)", ["pool"]
+)
+DATABASE_UP = registry.gauge(
+    "db_up", "Disponibilité de la base selon le moniteur (1, 0, ou absent si inconnue)"
+)
+
+
+class PoolWaitStats:
+    """Temps d'attente cumulés pour obtenir une connexion du pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            average = self.total_seconds / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(average * 1000, 3),
+                "wait_max_ms": round(self.max_seconds * 1000, 3),
+                "wait_total_ms": round(self.total_seconds * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """
+    Mesure le temps passé dans `_do_get` (attente d'une connexion libre,
+    ouverture d'une nouvelle connexion incluse)
+    """
+
+    pool_label = "default"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record_timeout()
+            POOL_TIMEOUTS.inc(pool=self.pool_label)
+            raise
+        waited = time.perf_counter() - started
+        self.wait_stats.record(waited)
+        POOL_CHECKOUTS.inc(pool=self.pool_label)
+        POOL_CHECKOUT_WAIT.observe(waited, pool=self.pool_label)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recrée le pool : conserver les statistiques
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool instrumenté (moteur synchrone : threads et scripts)"""
+
+    pool_label = "background"
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool instrumenté (moteur asyncpg des routes)"""
+
+    pool_label = "api"
+
+
+def pool_statistics(pool: Pool) -> dict:
+    """Statistiques d'un pool : connexions utilisées, overflow, attente"""
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.as_dict())
+    return stats
+
+
+def register_pool_gauges(engines: Dict[str, Engine]) -> None:
+    """Exposer l'occupation des pools ({label: moteur}) lue au moment de la collecte"""
+
+    def _collect(read) -> Dict[tuple, float]:
+        values = {}
+        for label, engine in engines.items():
+            if isinstance(engine.pool, QueuePool):
+                values[(label,)] = read(engine.pool)
+        return values
+
+    POOL_CHECKED_OUT.set_function(lambda: _collect(QueuePool.checkedout))
+    POOL_OVERFLOW.set_function(lambda: _collect(QueuePool.overflow))
+
+
+class DatabaseLivenessMonitor(PeriodicWorker):
+    """
+    Vérifie périodiquement la disponibilité de la base de données
+
+    `available` vaut None tant qu'aucune vérification n'a eu lieu (moniteur
+    arrêté, scripts) : les requêtes ne sont alors jamais bloquées.
+    """
+
+    name = "db-liveness"
+
+    def __init__(self, engine: Engine, interval_seconds: float, engines_to_reset: Sequence[Engine] = ()):
+        super().__init__(interval_seconds)
+        self.engine = engine
+        self.engines_to_reset = engines_to_reset
+        self.available: Optional[bool] = None
+        self.last_check_at: Optional[datetime] = None
+        self.last_change_at: Optional[datetime] = None
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        DATABASE_UP.set_function(
+            lambda: {} if self.available is None else {(): 1.0 if self.available else 0.0}
+        )
+
+    @property
+    def known_down(self) -> bool:
+        return self.available is False
+
+    def check(self) -> bool:
+        """Vérifier une fois la connexion et mettre à jour l'état"""
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            self._set_state(False, str(e))
+        else:
+            self.last_latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            self._set_state(True, None)
+        return self.available
+
+    def _set_state(self, available: bool, error: Optional[str]) -> None:
+        now = datetime.now(timezone.utc)
+        previous = self.available
+        self.last_check_at = now
+        self.last_error = error
+        self.consecutive_failures = 0 if available else self.consecutive_failures + 1
+
+        if previous is available:
+            return
+        self.available = available
+        self.last_change_at = now
+        if available:
+            if previous is False:
+                # Les connexions du pool datent d'avant la coupure : les abandonner
+                for engine in (self.engine, *self.engines_to_reset):
+                    engine.dispose(close=False)
+            logger.info("✅ [db-liveness] Base de données disponible")
+        else:
+            logger.error(f"❌ [db-liveness] Base de données indisponible: {error}")
+
+    def run_once(self) -> bool:
+        self.check()
+        return False
+
+    def as_dict(self) -> dict:
+        return {
+            "monitor_running": self.running,
+            "available": self.available,
+            "last_check_at": self.last_check_at.isoformat() if self.last_check_at else None,
+            "last_change_at": self.last_change_at.isoformat() if self.last_change_at else None,
+            "last_latency_ms": self.last_latency_ms,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
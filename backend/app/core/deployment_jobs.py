@@ -0,0 +1,391 @@
+"""
+File persistante des tâches de déploiement
+
+Chaque déploiement créé ajoute une ligne dans deployment_jobs, dans la même
+transaction. Un nombre borné de workers (threads) réserve les tâches prêtes
+avec `SELECT ... FOR UPDATE SKIP LOCKED`, ce qui permet plusieurs workers et
+plusieurs processus sans double exécution. Aucune session n'est gardée
+pendant l'exécution : la réservation et la finalisation sont deux
+transactions courtes.
+
+- Échec : nouvelle tentative après un backoff exponentiel, jusqu'à
+  max_attempts, puis le déploiement passe en "failed"
+- Battement : pendant l'exécution, un thread rafraîchit locked_at toutes les
+  DEPLOYMENT_JOB_HEARTBEAT_SECONDS, si bien qu'une tâche longue n'est pas
+  prise pour une tâche abandonnée
+- Reprise : les tâches "running" dont le worker a disparu (redémarrage, plus
+  de battement depuis DEPLOYMENT_JOB_STALE_SECONDS) sont remises en file, et
+  les déploiements pending/in_progress sans tâche active (créés avant la
+  file) reçoivent une tâche
+- Un index unique partiel (uq_deployment_jobs_active) garantit au plus une
+  tâche active par déploiement, même si la reprise et POST
+  /api/deployments/{id}/simulate en créent une en même temps
+
+Usage en ligne de commande (workers dans un processus séparé) :
+    python -m app.core.deployment_jobs
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.background import PeriodicWorker
+from app.core.cache import DEPLOYMENTS_NAMESPACE, cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import event_bus
+from app.models.deployment_history import DeploymentHistory, DeploymentStatus
+from app.models.deployment_job import ACTIVE_JOB_STATUSES, DeploymentJob, DeploymentJobStatus
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_deployment(db, deployment_id: int) -> DeploymentJob:
+    """
+    Ajouter une tâche pour un déploiement à la transaction courante
+
+    Fonctionne avec une session synchrone ou asynchrone (simple `add`) ; le
+    commit reste à la charge de l'appelant.
+    """
+    job = DeploymentJob(
+        deployment_id=deployment_id,
+        status=DeploymentJobStatus.QUEUED.value,
+        max_attempts=settings.DEPLOYMENT_JOB_MAX_ATTEMPTS,
+        run_after=datetime.now(timezone.utc),
+    )
+    db.add(job)
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff exponentiel après la tentative numéro `attempts`"""
+    seconds = settings.DEPLOYMENT_JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.DEPLOYMENT_JOB_RETRY_MAX_SECONDS))
+
+
+def claim_job(db: Session, worker_id: str) -> Optional[Tuple[int, int]]:
+    """
+    Réserver la prochaine tâche prête ; retourne (job_id, deployment_id)
+
+    Les tâches déjà verrouillées par un autre worker sont ignorées (SKIP LOCKED).
+    """
+    now = datetime.now(timezone.utc)
+    job = db.execute(
+        select(DeploymentJob)
+        .where(
+            DeploymentJob.status == DeploymentJobStatus.QUEUED.value,
+            DeploymentJob.run_after <= now
+        )
+        .order_by(DeploymentJob.run_after, DeploymentJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = DeploymentJobStatus.RUNNING.value
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = now
+
+    deployment = db.get(DeploymentHistory, job.deployment_id)
+    started = deployment is not None and deployment.status == DeploymentStatus.PENDING.value
+    if started:
+        deployment.status = DeploymentStatus.IN_PROGRESS.value
+
+    claimed = (job.id, job.deployment_id)
+    db.commit()
+    cache.invalidate(DEPLOYMENTS_NAMESPACE)
+    if started:
+        _publish_status(claimed[1], DeploymentStatus.IN_PROGRESS)
+    return claimed
+
+
+def _publish_status(deployment_id: int, status: DeploymentStatus) -> None:
+    event_bus.publish("deployment.status", deployment_id=deployment_id, status=status.value)
+
+
+def _locked_job(db: Session, job_id: int, worker_id: str) -> Optional[DeploymentJob]:
+    """La tâche, si elle est toujours réservée par ce worker (sinon reprise entre-temps)"""
+    job = db.get(DeploymentJob, job_id, with_for_update=True)
+    if job is None or job.status != DeploymentJobStatus.RUNNING.value or job.locked_by != worker_id:
+        logger.warning(f"⚠️ [deployment-jobs] Tâche {job_id} reprise par un autre worker, résultat ignoré")
+        return None
+    return job
+
+
+def _finish_deployment(deployment: DeploymentHistory, status: DeploymentStatus, error: Optional[str]) -> None:
+    deployment.status = status.value
+    deployment.completed_at = datetime.now(timezone.utc)
+    deployment.error_message = error
+    started_at = deployment.started_at
+    if started_at is not None:
+        if started_at.tzinfo is None:
+            started_at = started_at.replace(tzinfo=timezone.utc)
+        deployment.duration_seconds = int((deployment.completed_at - started_at).total_seconds())
+
+
+def complete_job(db: Session, job_id: int, deployment_id: int, worker_id: str) -> None:
+    """Marquer la tâche et le déploiement comme réussis"""
+    job = _locked_job(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return
+    job.status = DeploymentJobStatus.SUCCEEDED.value
+    job.last_error = None
+    deployment = db.get(DeploymentHistory, deployment_id)
+    if deployment is not None:
+        _finish_deployment(deployment, DeploymentStatus.SUCCESS, None)
+    db.commit()
+    cache.invalidate(DEPLOYMENTS_NAMESPACE)
+    if deployment is not None:
+        _publish_status(deployment_id, DeploymentStatus.SUCCESS)
+    logger.info(f"✅ [deployment-jobs] Déploiement {deployment_id} terminé (tâche {job_id})")
+
+
+def fail_job(db: Session, job_id: int, deployment_id: int, worker_id: str, error: str) -> None:
+    """Replanifier la tâche avec backoff, ou l'abandonner après max_attempts"""
+    job = _locked_job(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return
+    failed = _fail(db, job, error)
+    db.commit()
+    cache.invalidate(DEPLOYMENTS_NAMESPACE)
+    if failed:
+        _publish_status(deployment_id, DeploymentStatus.FAILED)
+
+
+def _fail(db: Session, job: DeploymentJob, error: str) -> bool:
+    """Retourne True si le déploiement est définitivement en échec"""
+    job.last_error = error
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        delay = retry_delay(job.attempts)
+        job.status = DeploymentJobStatus.QUEUED.value
+        job.run_after = datetime.now(timezone.utc) + delay
+        logger.warning(
+            f"⚠️ [deployment-jobs] Tâche {job.id} en échec (tentative {job.attempts}/{job.max_attempts}), "
+            f"nouvel essai dans {delay.total_seconds():.0f}s: {error}"
+        )
+        return False
+
+    job.status = DeploymentJobStatus.FAILED.value
+    deployment = db.get(DeploymentHistory, job.deployment_id)
+    if deployment is not None:
+        _finish_deployment(deployment, DeploymentStatus.FAILED, error)
+    logger.error(f"❌ [deployment-jobs] Tâche {job.id} abandonnée après {job.attempts} tentatives: {error}")
+    return deployment is not None
+
+
+def touch_job(db: Session, job_id: int, worker_id: str) -> bool:
+    """Rafraîchir locked_at ; False si la tâche n'est plus réservée par ce worker"""
+    result = db.execute(
+        update(DeploymentJob)
+        .where(
+            DeploymentJob.id == job_id,
+            DeploymentJob.status == DeploymentJobStatus.RUNNING.value,
+            DeploymentJob.locked_by == worker_id
+        )
+        .values(locked_at=datetime.now(timezone.utc))
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+@contextmanager
+def heartbeat(job_id: int, worker_id: str, interval_seconds: Optional[float] = None) -> Iterator[None]:
+    """Rafraîchir locked_at dans un thread tant que le bloc s'exécute"""
+    interval_seconds = interval_seconds or settings.DEPLOYMENT_JOB_HEARTBEAT_SECONDS
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(interval_seconds):
+            db = SessionLocal()
+            try:
+                if not touch_job(db, job_id, worker_id):
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ [deployment-jobs] Battement de la tâche {job_id} impossible: {e}")
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=beat, name=f"deployment-job-{job_id}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def execute_deployment(deployment_id: int) -> None:
+    """
+    Exécuter le déploiement (simulation pour la démonstration)
+
+    Dans un vrai projet, appeler ici l'API du provider. Aucune session de
+    base de données n'est ouverte pendant l'exécution.
+    """
+    time.sleep(settings.DEPLOYMENT_SIMULATION_SECONDS)
+
+
+def process_next_job(worker_id: str) -> bool:
+    """Réserver et exécuter une tâche ; retourne True si une tâche a été traitée"""
+    db = SessionLocal()
+    try:
+        claimed = claim_job(db, worker_id)
+    finally:
+        db.close()
+    if claimed is None:
+        return False
+
+    job_id, deployment_id = claimed
+    logger.info(f"⏳ [deployment-jobs] Déploiement {deployment_id} démarré (tâche {job_id}, {worker_id})")
+    try:
+        with heartbeat(job_id, worker_id):
+            execute_deployment(deployment_id)
+    except Exception as e:
+        db = SessionLocal()
+        try:
+            fail_job(db, job_id, deployment_id, worker_id, str(e))
+        finally:
+            db.close()
+        return True
+
+    db = SessionLocal()
+    try:
+        complete_job(db, job_id, deployment_id, worker_id)
+    finally:
+        db.close()
+    return True
+
+
+def recover_jobs(db: Session, stale_seconds: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Reprendre les tâches interrompues et les déploiements sans tâche
+
+    Retourne (tâches reprises, tâches créées).
+    """
+    stale_seconds = stale_seconds if stale_seconds is not None else settings.DEPLOYMENT_JOB_STALE_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)
+
+    stale_jobs: List[DeploymentJob] = db.execute(
+        select(DeploymentJob)
+        .where(
+            DeploymentJob.status == DeploymentJobStatus.RUNNING.value,
+            DeploymentJob.locked_at < cutoff
+        )
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    failed = [
+        job.deployment_id for job in stale_jobs
+        if _fail(db, job, f"Tâche interrompue (worker {job.locked_by} sans réponse)")
+    ]
+
+    orphans = db.execute(
+        select(DeploymentHistory.id)
+        .where(
+            DeploymentHistory.status.in_([DeploymentStatus.PENDING.value, DeploymentStatus.IN_PROGRESS.value]),
+            ~exists().where(and_(
+                DeploymentJob.deployment_id == DeploymentHistory.id,
+                DeploymentJob.status.in_(ACTIVE_JOB_STATUSES)
+            ))
+        )
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    queued = 0
+    for deployment_id in orphans:
+        # Une tâche active créée entre-temps (ex: /simulate) l'emporte
+        try:
+            with db.begin_nested():
+                enqueue_deployment(db, deployment_id)
+        except IntegrityError:
+            continue
+        queued += 1
+
+    db.commit()
+    for deployment_id in failed:
+        _publish_status(deployment_id, DeploymentStatus.FAILED)
+    if stale_jobs or queued:
+        cache.invalidate(DEPLOYMENTS_NAMESPACE)
+        logger.info(
+            f"🔁 [deployment-jobs] Reprise: {len(stale_jobs)} tâche(s) interrompue(s), "
+            f"{queued} déploiement(s) remis en file"
+        )
+    return len(stale_jobs), queued
+
+
+class DeploymentJobWorker(PeriodicWorker):
+    """Worker de la file : enchaîne les tâches tant qu'il y en a de prêtes"""
+
+    def __init__(self, index: int, interval_seconds: Optional[float] = None):
+        super().__init__(interval_seconds or settings.DEPLOYMENT_JOB_POLL_INTERVAL_SECONDS)
+        self.name = f"deployment-jobs-{index}"
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{self.name}"
+
+    def run_once(self) -> bool:
+        return process_next_job(self.worker_id)
+
+
+class DeploymentJobRecoveryWorker(PeriodicWorker):
+    """Reprise périodique des tâches interrompues"""
+
+    name = "deployment-jobs-recovery"
+
+    def __init__(self, interval_seconds: Optional[int] = None):
+        super().__init__(interval_seconds or settings.DEPLOYMENT_JOB_RECOVERY_INTERVAL_SECONDS)
+
+    def run_once(self) -> bool:
+        db = SessionLocal()
+        try:
+            recover_jobs(db)
+        finally:
+            db.close()
+        return False
+
+
+class DeploymentJobPool:
+    """Pool borné de workers de la file, démarré avec l'application"""
+
+    def __init__(self, size: Optional[int] = None):
+        size = size or settings.DEPLOYMENT_JOB_WORKERS
+        self.workers: List[PeriodicWorker] = [DeploymentJobRecoveryWorker()]
+        self.workers += [DeploymentJobWorker(index) for index in range(1, size + 1)]
+
+    @property
+    def running(self) -> bool:
+        return any(worker.running for worker in self.workers)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        for worker in self.workers:
+            worker.request_stop()
+        for worker in self.workers:
+            worker.stop(timeout)
+
+
+deployment_job_pool = DeploymentJobPool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    deployment_job_pool.start()
+    print(f"✅ {len(deployment_job_pool.workers) - 1} worker(s) de déploiement démarrés (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        deployment_job_pool.stop()
@@ -0,0 +1,97 @@
+"""
+ETags faibles et GET conditionnels (If-None-Match → 304)
+
+L'ETag d'une réponse est dérivé d'une sonde de version peu coûteuse
+(nombre de lignes, id maximal, date de modification maximale) calculée avec
+les mêmes filtres que la liste, et de l'URL demandée (pagination comprise).
+Sous PostgreSQL, la sonde des listes ajoute une somme des xmin des lignes :
+updated_at vaut now(), l'heure de début de la transaction, si bien qu'une
+transaction longue validée après une plus récente ne ferait pas avancer
+max(updated_at) ; le xmin, lui, change à chaque version de ligne validée.
+Si l'ETag correspond à If-None-Match, la route répond 304 sans charger ni
+sérialiser les lignes.
+"""
+import hashlib
+from typing import Any, Optional, Sequence
+
+from fastapi import Request, Response, status
+from sqlalchemy import BigInteger, Text, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Les navigateurs revalident à chaque requête (et envoient If-None-Match)
+CACHE_CONTROL = "no-cache"
+
+
+async def probe_version(db: AsyncSession, model, criteria: Sequence, aggregates: Sequence) -> tuple:
+    """
+    Sonde de version d'un ensemble de lignes, en un seul aller-retour
+
+    `aggregates` sont des agrégats bon marché (ex: count(), max(id),
+    max(updated_at)) évalués sur les lignes satisfaisant `criteria`.
+    """
+    query = select(*aggregates).select_from(model).where(*criteria)
+    return tuple((await db.execute(query)).one())
+
+
+def row_version(model, dialect_name: Optional[str] = None) -> list:
+    """
+    Agrégats standard : nombre de lignes, id maximal, dernière modification
+
+    Avec dialect_name="postgresql", ajoute la somme des xmin (identifiant de la
+    transaction ayant écrit chaque version de ligne) : toute mise à jour validée
+    la modifie, quel que soit l'ordre des commits.
+    """
+    return [func.count(), func.max(model.id), func.max(model.updated_at)] + commit_checksum(model, dialect_name)
+
+
+def commit_checksum(model, dialect_name: Optional[str]) -> list:
+    """
+    Somme des xmin des lignes (PostgreSQL uniquement, sinon aucun agrégat)
+
+    Change avec chaque ligne validée, même si sa transaction a commencé (et
+    reçu ses ids ou son updated_at) avant une transaction validée plus tôt.
+    """
+    if dialect_name != "postgresql":
+        return []
+    xmin = literal_column(f"{model.__table__.name}.xmin")
+    return [func.sum(cast(cast(xmin, Text), BigInteger))]
+
+
+def make_etag(request: Request, *parts: Any) -> str:
+    """ETag faible pour l'URL demandée et la version sondée"""
+    digest = hashlib.sha1(str(request.url.path).encode())
+    digest.update(b"?" + str(request.url.query).encode())
+    for part in parts:
+        value = part.isoformat() if hasattr(part, "isoformat") else part
+        digest.update(b"|" + str(value).encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Comparaison faible avec l'en-tête If-None-Match (liste ou *)"""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = _strip_weak(etag)
+    return any(_strip_weak(tag) == expected for tag in header.split(","))
+
+
+def set_etag(response: Response, etag: Optional[str]) -> None:
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Réponse 304 sans corps"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
@@ -0,0 +1,275 @@
+"""
+Bus d'événements (pub/sub) pour le push temps réel (WebSocket /ws/events, SSE)
+
+Les écritures publient un événement après leur commit (changement de statut
+d'un déploiement, création/arrêt/démarrage/suppression d'une instance) ; les
+clients connectés le reçoivent immédiatement au lieu d'interroger l'API en
+boucle.
+
+Backends :
+- "memory"   : diffusion dans le processus (un seul worker uvicorn)
+- "postgres" : NOTIFY/LISTEN sur un canal PostgreSQL ; chaque processus
+               relaie les notifications à ses propres abonnés, ce qui couvre
+               plusieurs workers et les workers de déploiement séparés
+
+La publication ne bloque jamais : elle est appelée depuis les routes async
+comme depuis les threads des workers. Chaque abonné a une file bornée ; un
+client trop lent perd les événements les plus anciens (compteur
+events_dropped_total) plutôt que de faire grossir la mémoire.
+
+Format d'un événement : {"type": "deployment.status", "deployment_id": 3,
+"status": "success", "at": "2024-01-01T12:00:00+00:00"}.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.background import PeriodicWorker
+from app.core.config import settings
+from app.core.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PUBLISHED = registry.counter("events_published_total", "Événements publiés", ["type"])
+EVENTS_DROPPED = registry.counter(
+    "events_dropped_total", "Événements perdus (abonné trop lent ou NOTIFY impossible)", ["reason"]
+)
+EVENTS_SUBSCRIBERS = registry.gauge("events_subscribers", "Clients abonnés aux événements (WebSocket/SSE)")
+
+# Sujets disponibles pour le filtrage côté client (préfixe du type)
+TOPICS = ("deployments", "instances")
+
+# Taille maximale d'un payload NOTIFY (8000 octets côté PostgreSQL)
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+def topic_of(event_type: str) -> str:
+    """Sujet d'un type d'événement : "deployment.status" -> "deployments" """
+    return event_type.split(".", 1)[0] + "s"
+
+
+class Subscription:
+    """File d'événements d'un client, liée à la boucle asyncio de sa connexion"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, topics: Optional[Iterable[str]], maxsize: int):
+        self.loop = loop
+        self.topics: Set[str] = set(topics or ())
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize)
+
+    def accepts(self, event: Dict[str, Any]) -> bool:
+        return not self.topics or topic_of(event.get("type", "")) in self.topics
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        # Exécuté dans la boucle de l'abonné
+        if self.queue.full():
+            self.queue.get_nowait()
+            EVENTS_DROPPED.inc(reason="slow_subscriber")
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Prochain événement, ou None après `timeout` secondes sans événement"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """Diffusion des événements aux abonnés du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._listener: Optional["PostgresEventListener"] = None
+
+    @property
+    def backend(self) -> str:
+        return "postgres" if self._listener is not None else "memory"
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscription:
+        """Abonner la connexion courante (à appeler depuis la boucle asyncio)"""
+        subscription = Subscription(
+            asyncio.get_running_loop(), topics, settings.EVENTS_SUBSCRIBER_QUEUE_SIZE
+        )
+        with self._lock:
+            self._subscribers.add(subscription)
+            EVENTS_SUBSCRIBERS.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+            EVENTS_SUBSCRIBERS.set(len(self._subscribers))
+
+    def publish(self, event_type: str, **data: Any) -> None:
+        """Publier un événement (après le commit de l'écriture correspondante)"""
+        event = {"type": event_type, **data, "at": datetime.now(timezone.utc).isoformat()}
+        EVENTS_PUBLISHED.inc(type=event_type)
+        if self._listener is not None:
+            self._listener.notify(event)
+        else:
+            self.dispatch(event)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Remettre un événement aux abonnés locaux (thread-safe)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.accepts(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # Boucle fermée : connexion terminée sans désabonnement
+                self.unsubscribe(subscription)
+
+    def start(self) -> None:
+        """Démarrer le relais LISTEN/NOTIFY si EVENTS_BACKEND = "postgres" """
+        if settings.EVENTS_BACKEND != "postgres" or self._listener is not None:
+            return
+        from app.core.database import engine
+
+        if engine.dialect.name != "postgresql":
+            logger.warning("⚠️ [events] LISTEN/NOTIFY indisponible hors PostgreSQL, diffusion en mémoire")
+            return
+        self._listener = PostgresEventListener(self, engine, settings.EVENTS_CHANNEL)
+        self._listener.start()
+
+    def stop(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+
+class PostgresEventListener(PeriodicWorker):
+    """
+    Relais NOTIFY/LISTEN sur une connexion dédiée (hors pool)
+
+    Le thread attend à la fois les notifications de PostgreSQL et les
+    événements à émettre (réveil par un pipe) : un NOTIFY par événement, et
+    chaque notification reçue est remise aux abonnés du processus, y compris
+    pour les événements émis par ce même processus.
+    """
+
+    name = "events-listener"
+
+    def __init__(self, bus: EventBus, engine, channel: str, interval_seconds: float = 1.0):
+        super().__init__(interval_seconds)
+        self.bus = bus
+        self.engine = engine
+        self.channel = channel
+        self._outbox: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=10_000)
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        self._connection = None
+
+    def notify(self, event: Dict[str, Any]) -> None:
+        try:
+            self._outbox.put_nowait(event)
+        except queue.Full:
+            EVENTS_DROPPED.inc(reason="outbox_full")
+            return
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _connect(self):
+        connection = self.engine.raw_connection()
+        # Connexion dédiée : ne pas la rendre au pool ni occuper une place
+        connection.detach()
+        dbapi_connection = connection.driver_connection
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        logger.info(f"✅ [events] LISTEN {self.channel}")
+        return dbapi_connection
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _send_pending(self) -> None:
+        with self._connection.cursor() as cursor:
+            while True:
+                try:
+                    event = self._outbox.get_nowait()
+                except queue.Empty:
+                    return
+                payload = json.dumps(event, default=str)
+                if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+                    EVENTS_DROPPED.inc(reason="payload_too_large")
+                    continue
+                try:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                except Exception:
+                    # Connexion perdue : au moins les abonnés locaux sont prévenus
+                    self.bus.dispatch(event)
+                    raise
+
+    def _receive(self) -> None:
+        self._connection.poll()
+        while self._connection.notifies:
+            notification = self._connection.notifies.pop(0)
+            try:
+                self.bus.dispatch(json.loads(notification.payload))
+            except ValueError:
+                logger.warning(f"⚠️ [events] Notification invalide ignorée: {notification.payload[:200]}")
+
+    def run_once(self) -> bool:
+        if self._connection is None:
+            try:
+                self._connection = self._connect()
+            except Exception:
+                self._flush_locally()
+                raise
+        try:
+            self._send_pending()
+            readable, _, _ = select.select([self._connection, self._wakeup_r], [], [], self.interval_seconds)
+            if self._wakeup_r in readable:
+                try:
+                    while os.read(self._wakeup_r, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+            if self._connection in readable:
+                self._receive()
+        except Exception:
+            self._close()
+            self._flush_locally()
+            raise
+        # select() fait office d'attente : enchaîner immédiatement
+        return not self._stop_event.is_set()
+
+    def _flush_locally(self) -> None:
+        """Base indisponible : diffuser en local les événements en attente"""
+        while True:
+            try:
+                self.bus.dispatch(self._outbox.get_nowait())
+            except queue.Empty:
+                return
+
+    def request_stop(self):
+        super().request_stop()
+        self._wake()
+
+    def stop(self, timeout: float = 5.0):
+        super().stop(timeout)
+        self._close()
+        self._flush_locally()
+
+
+event_bus = EventBus()
@@ -0,0 +1,246 @@
+"""
+Collecte des métriques réelles de l'hôte (CPU, mémoire, disque, réseau)
+
+Un thread d'arrière-plan échantillonne l'hôte toutes les
+HOST_METRICS_INTERVAL_SECONDS :
+- sous Linux, à partir de /proc (stat, meminfo, loadavg, net/dev) et de
+  statvfs pour le disque ; ailleurs avec psutil s'il est installé
+- l'utilisation CPU et les débits réseau sont calculés par différence entre
+  deux lectures des compteurs cumulés
+- les échantillons récents sont gardés en mémoire (tampon circulaire de
+  HOST_METRICS_BUFFER_SIZE), ce qui rend GET /api/metrics/system immédiat
+- les métriques (cpu, memory, storage, network) sont confiées au tampon
+  d'écriture différée (app/core/metric_buffer.py), qui les écrit par lots
+  dans monitoring_metrics, et non une ligne par échantillon
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.background import PeriodicWorker
+from app.core.config import settings
+from app.core.metric_buffer import metric_buffer
+from app.core.metric_ingest import MetricRow
+from app.core.telemetry import registry
+
+try:
+    import psutil
+except ImportError:  # optionnel : /proc suffit sous Linux
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+HOST_SAMPLES = registry.counter("host_metrics_samples_total", "Échantillons de métriques de l'hôte collectés")
+
+GB = 1024 ** 3
+
+# (type de métrique, section de l'échantillon, champ, unité) écrits dans monitoring_metrics
+PERSISTED_FIELDS = (
+    ("cpu", "cpu", "usage_percent", "percent"),
+    ("memory", "memory", "usage_percent", "percent"),
+    ("storage", "storage", "usage_percent", "percent"),
+    ("network", "network", "inbound_mbps", "mbps"),
+)
+
+
+class HostMetricsUnavailable(RuntimeError):
+    """Ni /proc ni psutil : impossible de mesurer l'hôte"""
+
+
+def _read_cpu_times() -> Tuple[float, float]:
+    """Temps CPU cumulés (total, inactif) depuis le démarrage, en ticks"""
+    with open("/proc/stat") as f:
+        values = [float(value) for value in f.readline().split()[1:]]
+    # user nice system idle iowait irq softirq steal (guest inclus dans user)
+    idle = values[3] + (values[4] if len(values) > 4 else 0.0)
+    return sum(values[:8]), idle
+
+
+def _read_memory() -> Tuple[float, float]:
+    """Mémoire (totale, disponible) en octets"""
+    info = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            info[key] = float(value.split()[0]) * 1024
+    available = info.get("MemAvailable", info.get("MemFree", 0.0) + info.get("Cached", 0.0))
+    return info["MemTotal"], available
+
+
+def _read_network() -> Tuple[int, int, int, int]:
+    """Compteurs cumulés (octets reçus, octets émis, paquets reçus, paquets émis), hors loopback"""
+    received = sent = packets_received = packets_sent = 0
+    with open("/proc/net/dev") as f:
+        for line in f.readlines()[2:]:
+            interface, _, data = line.partition(":")
+            if interface.strip() == "lo":
+                continue
+            fields = data.split()
+            received += int(fields[0])
+            packets_received += int(fields[1])
+            sent += int(fields[8])
+            packets_sent += int(fields[9])
+    return received, sent, packets_received, packets_sent
+
+
+class HostSampler:
+    """
+    Lecture des compteurs de l'hôte
+
+    Garde la lecture précédente pour calculer l'utilisation CPU et les débits
+    réseau sur l'intervalle ; la première lecture donne les moyennes depuis le
+    démarrage (CPU) et un débit nul.
+    """
+
+    def __init__(self, disk_path: str = "/"):
+        self.disk_path = disk_path
+        self.use_proc = os.path.exists("/proc/stat")
+        if not self.use_proc and psutil is None:
+            raise HostMetricsUnavailable("Ni /proc ni psutil disponibles pour mesurer l'hôte")
+        self._lock = threading.Lock()
+        self._previous_cpu: Tuple[float, float] = (0.0, 0.0)
+        self._previous_network: Optional[Tuple[float, int, int]] = None
+
+    def _cpu_times(self) -> Tuple[float, float]:
+        if self.use_proc:
+            return _read_cpu_times()
+        times = psutil.cpu_times()
+        idle = times.idle + getattr(times, "iowait", 0.0)
+        return sum(times), idle
+
+    def _memory(self) -> Tuple[float, float]:
+        if self.use_proc:
+            return _read_memory()
+        memory = psutil.virtual_memory()
+        return memory.total, memory.available
+
+    def _network(self) -> Tuple[int, int, int, int]:
+        if self.use_proc:
+            return _read_network()
+        counters = psutil.net_io_counters()
+        return counters.bytes_recv, counters.bytes_sent, counters.packets_recv, counters.packets_sent
+
+    def _load_average(self) -> float:
+        try:
+            return os.getloadavg()[0]
+        except OSError:
+            return 0.0
+
+    def sample(self) -> Dict[str, Any]:
+        """Mesurer l'hôte (même structure que GET /api/metrics/system)"""
+        with self._lock:
+            now = time.monotonic()
+            total, idle = self._cpu_times()
+            previous_total, previous_idle = self._previous_cpu
+            self._previous_cpu = (total, idle)
+            elapsed_ticks = total - previous_total
+            cpu_percent = 100.0 * (1 - (idle - previous_idle) / elapsed_ticks) if elapsed_ticks > 0 else 0.0
+
+            received, sent, packets_received, packets_sent = self._network()
+            inbound_mbps = outbound_mbps = 0.0
+            if self._previous_network is not None:
+                previous_at, previous_received, previous_sent = self._previous_network
+                seconds = now - previous_at
+                if seconds > 0:
+                    # Compteurs remis à zéro (interface recréée) : débit nul
+                    inbound_mbps = max(received - previous_received, 0) * 8 / seconds / 1e6
+                    outbound_mbps = max(sent - previous_sent, 0) * 8 / seconds / 1e6
+            self._previous_network = (now, received, sent)
+
+        memory_total, memory_available = self._memory()
+        disk = os.statvfs(self.disk_path)
+        disk_total = disk.f_blocks * disk.f_frsize
+        disk_available = disk.f_bavail * disk.f_frsize
+        disk_used = (disk.f_blocks - disk.f_bfree) * disk.f_frsize
+
+        return {
+            "cpu": {
+                "usage_percent": round(min(max(cpu_percent, 0.0), 100.0), 2),
+                "cores": os.cpu_count() or 1,
+                "load_average": round(self._load_average(), 2),
+            },
+            "memory": {
+                "usage_percent": round(100.0 * (1 - memory_available / memory_total), 2) if memory_total else 0.0,
+                "total_gb": round(memory_total / GB, 2),
+                "used_gb": round((memory_total - memory_available) / GB, 2),
+                "available_gb": round(memory_available / GB, 2),
+            },
+            "storage": {
+                # Comme df : part de l'espace utilisable par les utilisateurs
+                "usage_percent": round(100.0 * disk_used / (disk_used + disk_available), 2) if disk_total else 0.0,
+                "total_gb": round(disk_total / GB, 2),
+                "used_gb": round(disk_used / GB, 2),
+                "available_gb": round(disk_available / GB, 2),
+            },
+            "network": {
+                "inbound_mbps": round(inbound_mbps, 2),
+                "outbound_mbps": round(outbound_mbps, 2),
+                "packets_sent": packets_sent,
+                "packets_received": packets_received,
+            },
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+def sample_rows(sample: Dict[str, Any]) -> List[MetricRow]:
+    """Lignes monitoring_metrics d'un échantillon (métriques de l'hôte : sans instance_id)"""
+    timestamp = datetime.fromisoformat(sample["timestamp"])
+    return [
+        (None, metric_type, float(sample[section][field]), unit, timestamp)
+        for metric_type, section, field, unit in PERSISTED_FIELDS
+    ]
+
+
+class HostMetricCollector(PeriodicWorker):
+    """Échantillonnage périodique de l'hôte, gardé en mémoire et confié au tampon d'écriture"""
+
+    name = "host-metrics"
+
+    def __init__(
+        self,
+        interval_seconds: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+        persist: Optional[bool] = None,
+    ):
+        super().__init__(interval_seconds or settings.HOST_METRICS_INTERVAL_SECONDS)
+        self.persist = settings.HOST_METRICS_PERSIST if persist is None else persist
+        self._sampler: Optional[HostSampler] = None
+        self._samples: "deque[Dict[str, Any]]" = deque(maxlen=buffer_size or settings.HOST_METRICS_BUFFER_SIZE)
+        self._lock = threading.Lock()
+
+    @property
+    def sampler(self) -> HostSampler:
+        if self._sampler is None:
+            self._sampler = HostSampler(settings.HOST_METRICS_DISK_PATH)
+        return self._sampler
+
+    def collect(self) -> Dict[str, Any]:
+        """Prendre un échantillon, le garder en mémoire et le déposer dans le tampon d'écriture"""
+        sample = self.sampler.sample()
+        with self._lock:
+            self._samples.append(sample)
+        HOST_SAMPLES.inc()
+        if self.persist:
+            metric_buffer.submit(sample_rows(sample))
+        return sample
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Échantillons récents, du plus ancien au plus récent"""
+        with self._lock:
+            samples = list(self._samples)
+        return samples[-limit:] if limit else samples
+
+    def run_once(self) -> bool:
+        self.collect()
+        return False
+
+
+host_metrics = HostMetricCollector()
@@ -1,13 +1,43 @@
 """
 Script pour initialiser la base de données avec les tables
 """
+from sqlalchemy import text
 from app.core.database import engine, Base
-from app.models import CloudInstance, MonitoringMetric, DeploymentHistory
+from app.core.instance_costs import BACKFILL_SQL as INSTANCE_EVENTS_BACKFILL_SQL
+from app.core.metric_partitions import maintain_partitions
+from app.models import CloudInstance, MonitoringMetric, DeploymentHistory, DeploymentJob, InstanceStatusEvent
+
+
+# Colonnes ajoutées après la création initiale des tables (idempotent,
+# voir database/migrations/)
+SCHEMA_UPGRADES = [
+    "ALTER TABLE deployment_history ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_cloud_instances_active_name ON cloud_instances(name) WHERE is_active",
+    "ALTER TABLE metric_rollup_state ADD COLUMN IF NOT EXISTS pending_xmax BIGINT NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS idx_instance_status_events_time ON instance_status_events(occurred_at)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_deployment_jobs_active ON deployment_jobs(deployment_id) "
+    "WHERE status IN ('queued', 'running')",
+    # Clés de la pagination par curseur (voir database/migrations/pagination_sort_not_null.sql)
+    "UPDATE cloud_instances SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL",
+    "ALTER TABLE cloud_instances ALTER COLUMN created_at SET NOT NULL",
+    "UPDATE deployment_history SET started_at = COALESCE(completed_at, updated_at, CURRENT_TIMESTAMP) "
+    "WHERE started_at IS NULL",
+    "ALTER TABLE deployment_history ALTER COLUMN started_at SET NOT NULL",
+]
 
 
 def init_db():
     """Créer toutes les tables dans la base de données"""
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for statement in SCHEMA_UPGRADES:
+            connection.execute(text(statement))
+        # Historique initial des statuts (instances créées avant instance_status_events)
+        backfilled = connection.execute(text(INSTANCE_EVENTS_BACKFILL_SQL)).rowcount
+    print(f"💰 Historique des statuts: {backfilled} instance(s) initialisée(s)")
+    # Partitions de monitoring_metrics (DEFAULT, fenêtre de rétention et jours à venir)
+    created, dropped = maintain_partitions(engine)
+    print(f"🗂️ Partitions des métriques: {len(created)} créées, {len(dropped)} supprimées")
     print("✅ Base de données initialisée avec succès")
 
 
@@ -0,0 +1,205 @@
+"""
+Calcul des coûts des instances à partir de l'historique de leurs statuts
+
+Chaque écriture qui change le statut (ou le tarif) d'une instance ajoute une
+ligne dans instance_status_events, dans la même transaction. Un événement
+ouvre un intervalle qui se termine à l'événement suivant de la même instance
+(LEAD ... OVER (PARTITION BY instance_id ORDER BY occurred_at)) ; seuls les
+intervalles "running" sont facturés, au tarif copié dans l'événement.
+
+Tout le calcul est fait par la base en une requête (fonction fenêtre +
+agrégat, tri et LIMIT) : seuls les groupes renvoyés reviennent à
+l'application, les totaux étant calculés par sum() OVER (). Seuls le dernier
+événement avant la période et ceux de la période sont lus.
+- coût accumulé : intervalles bornés à [start, min(end, maintenant)]
+- coût projeté : les instances en cours d'exécution sont supposées le rester
+  jusqu'à `end`
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import DateTime, and_, case, func, insert, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.timeutils import as_utc
+from app.models.cloud_instance import CloudInstance, InstanceStatus
+from app.models.instance_status_event import InstanceStatusEvent
+
+# Regroupements disponibles -> colonnes de cloud_instances
+GROUP_COLUMNS = {
+    "instance": (CloudInstance.id, CloudInstance.name, CloudInstance.provider, CloudInstance.region),
+    "provider": (CloudInstance.provider,),
+    "region": (CloudInstance.provider, CloudInstance.region),
+}
+
+# Instances existantes sans historique (créées avant la table) : un événement
+# avec leur statut courant à leur date de création. Idempotent.
+BACKFILL_SQL = """
+INSERT INTO instance_status_events (instance_id, status, cost_per_hour, occurred_at)
+SELECT ci.id, ci.status, COALESCE(ci.cost_per_hour, 0), COALESCE(ci.created_at, CURRENT_TIMESTAMP)
+FROM cloud_instances ci
+WHERE NOT EXISTS (SELECT 1 FROM instance_status_events e WHERE e.instance_id = ci.id)
+"""
+
+
+def record_status_event(db, instance: CloudInstance) -> None:
+    """Ajouter le statut courant de l'instance à l'historique (transaction courante)"""
+    db.add(InstanceStatusEvent(
+        instance_id=instance.id,
+        status=instance.status.value if isinstance(instance.status, InstanceStatus) else instance.status,
+        cost_per_hour=instance.cost_per_hour or 0.0
+    ))
+
+
+def status_events_for(instance_ids: Iterable[int]):
+    """INSERT ... SELECT de l'état courant de plusieurs instances (une requête)"""
+    return insert(InstanceStatusEvent).from_select(
+        ["instance_id", "status", "cost_per_hour"],
+        select(
+            CloudInstance.id,
+            CloudInstance.status,
+            func.coalesce(CloudInstance.cost_per_hour, 0.0)
+        ).where(CloudInstance.id.in_(list(instance_ids)))
+    )
+
+
+def _sql_functions(dialect_name: str):
+    """greatest, least et durée en secondes selon la base"""
+    if dialect_name == "postgresql":
+        return func.greatest, func.least, lambda start, end: func.extract("epoch", end - start)
+    # SQLite : min/max scalaires, julianday pour les durées
+    return func.max, func.min, lambda start, end: (func.julianday(end) - func.julianday(start)) * 86400.0
+
+
+async def compute_costs(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    group_by: str = "instance",
+    provider: Optional[str] = None,
+    region: Optional[str] = None,
+    now: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Coût par instance, fournisseur ou région sur [start, end)
+
+    Retourne les `limit` groupes les plus coûteux (coût projeté décroissant),
+    chacun avec running_hours, cost et projected_cost, et les totaux sur tous
+    les groupes (sum() OVER (), calculé avant le LIMIT).
+    """
+    start, end = as_utc(start), as_utc(end)
+    accrual_end = max(start, min(end, as_utc(now or datetime.now(timezone.utc))))
+    greatest, least, seconds_between = _sql_functions(db.get_bind().dialect.name)
+
+    start_param = literal(start, DateTime(timezone=True))
+    end_param = literal(end, DateTime(timezone=True))
+    accrual_param = literal(accrual_end, DateTime(timezone=True))
+
+    instance_filters = []
+    if provider:
+        instance_filters.append(CloudInstance.provider == provider)
+    if region:
+        instance_filters.append(CloudInstance.region == region)
+
+    # Événements utiles : le dernier avant `start` (statut en vigueur au début
+    # de la période, une recherche d'index par instance) et ceux de [start, end)
+    event_columns = (
+        InstanceStatusEvent.id,
+        InstanceStatusEvent.instance_id,
+        InstanceStatusEvent.status,
+        InstanceStatusEvent.cost_per_hour,
+        InstanceStatusEvent.occurred_at,
+    )
+    last_before_start = (
+        select(InstanceStatusEvent.id)
+        .where(InstanceStatusEvent.instance_id == CloudInstance.id, InstanceStatusEvent.occurred_at < start_param)
+        .order_by(InstanceStatusEvent.occurred_at.desc(), InstanceStatusEvent.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    relevant_events = union_all(
+        select(*event_columns).where(
+            InstanceStatusEvent.id.in_(select(last_before_start).select_from(CloudInstance).where(*instance_filters))
+        ),
+        select(*event_columns).where(
+            InstanceStatusEvent.occurred_at >= start_param,
+            InstanceStatusEvent.occurred_at < end_param,
+        ),
+    ).subquery()
+
+    events = (
+        select(
+            relevant_events.c.instance_id,
+            relevant_events.c.status,
+            relevant_events.c.cost_per_hour,
+            relevant_events.c.occurred_at.label("started_at"),
+            func.lead(relevant_events.c.occurred_at).over(
+                partition_by=relevant_events.c.instance_id,
+                order_by=(relevant_events.c.occurred_at, relevant_events.c.id)
+            ).label("ended_at"),
+        )
+        .subquery()
+    )
+
+    interval_start = greatest(events.c.started_at, start_param)
+
+    def running_seconds(horizon):
+        interval_end = least(func.coalesce(events.c.ended_at, horizon), horizon)
+        return case(
+            (
+                and_(events.c.status == InstanceStatus.RUNNING.value, interval_end > interval_start),
+                seconds_between(interval_start, interval_end)
+            ),
+            else_=0.0
+        )
+
+    accrued_seconds = func.sum(running_seconds(accrual_param))
+    cost_seconds = func.sum(running_seconds(accrual_param) * events.c.cost_per_hour)
+    projected_cost_seconds = func.sum(running_seconds(end_param) * events.c.cost_per_hour)
+    group_columns = GROUP_COLUMNS[group_by]
+
+    query = (
+        select(
+            *group_columns,
+            accrued_seconds.label("running_seconds"),
+            cost_seconds.label("cost_seconds"),
+            projected_cost_seconds.label("projected_cost_seconds"),
+            # Totaux sur tous les groupes, avant le LIMIT
+            func.count().over().label("groups"),
+            func.sum(accrued_seconds).over().label("total_running_seconds"),
+            func.sum(cost_seconds).over().label("total_cost_seconds"),
+            func.sum(projected_cost_seconds).over().label("total_projected_cost_seconds"),
+        )
+        .select_from(events)
+        .join(CloudInstance, CloudInstance.id == events.c.instance_id)
+        .where(or_(events.c.ended_at.is_(None), events.c.ended_at > start_param), *instance_filters)
+        .group_by(*group_columns)
+        .order_by(projected_cost_seconds.desc(), *group_columns)
+    )
+    if limit:
+        query = query.limit(limit)
+
+    def hours(seconds) -> float:
+        return round(float(seconds or 0.0) / 3600, 4)
+
+    rows = (await db.execute(query)).mappings().all()
+    first = rows[0] if rows else {}
+    return {
+        "groups": int(first.get("groups") or 0),
+        "running_hours": hours(first.get("total_running_seconds")),
+        "total_cost": hours(first.get("total_cost_seconds")),
+        "projected_total_cost": hours(first.get("total_projected_cost_seconds")),
+        "items": [
+            {
+                "instance_id": row.get("id"),
+                "name": row.get("name"),
+                "provider": row.get("provider"),
+                "region": row.get("region"),
+                "running_hours": hours(row["running_seconds"]),
+                "cost": hours(row["cost_seconds"]),
+                "projected_cost": hours(row["projected_cost_seconds"]),
+            }
+            for row in rows
+        ],
+    }
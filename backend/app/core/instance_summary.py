@@ -0,0 +1,97 @@
+"""
+Synthèse de la flotte d'instances (GET /api/instances/summary)
+
+Tous les niveaux de regroupement sont calculés en une seule requête :
+PostgreSQL évalue `GROUPING SETS (ROLLUP (provider, region, status), (status))`
+et GROUPING() indique le niveau de chaque ligne. Les autres bases (SQLite en
+développement) font un seul GROUP BY au niveau le plus fin, consolidé ensuite
+en Python.
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cloud_instance import CloudInstance
+
+DIMENSIONS = (CloudInstance.provider, CloudInstance.region, CloudInstance.status)
+
+MEASURES = (
+    func.count(CloudInstance.id),
+    func.coalesce(func.sum(CloudInstance.cpu_cores), 0),
+    func.coalesce(func.sum(CloudInstance.memory_gb), 0.0),
+    func.coalesce(func.sum(CloudInstance.storage_gb), 0.0),
+    func.coalesce(func.sum(CloudInstance.cost_per_hour), 0.0),
+)
+
+MEASURE_NAMES = ("instances", "cpu_cores", "memory_gb", "storage_gb", "cost_per_hour")
+
+# Masque GROUPING(provider, region, status) : bit à 1 = dimension agrégée
+LEVELS = {
+    0b000: "by_provider_region_status",
+    0b001: "by_provider_region",
+    0b011: "by_provider",
+    0b110: "by_status",
+    0b111: "total",
+}
+
+SummaryRow = Tuple[int, Any, Any, Any, Tuple]
+
+
+async def _grouping_sets_rows(db: AsyncSession, criteria: List) -> List[SummaryRow]:
+    query = (
+        select(func.grouping(*DIMENSIONS), *DIMENSIONS, *MEASURES)
+        .where(*criteria)
+        .group_by(func.grouping_sets(func.rollup(*DIMENSIONS), tuple_(CloudInstance.status)))
+    )
+    return [
+        (row[0], row[1], row[2], row[3], tuple(row[4:]))
+        for row in (await db.execute(query)).all()
+    ]
+
+
+async def _python_rollup_rows(db: AsyncSession, criteria: List) -> List[SummaryRow]:
+    query = select(*DIMENSIONS, *MEASURES).where(*criteria).group_by(*DIMENSIONS)
+    groups: Dict[Tuple, List] = {}
+    for provider, region, status, *measures in (await db.execute(query)).all():
+        for level, key in (
+            (0b000, (provider, region, status)),
+            (0b001, (provider, region, None)),
+            (0b011, (provider, None, None)),
+            (0b110, (None, None, status)),
+            (0b111, (None, None, None)),
+        ):
+            totals = groups.setdefault((level, *key), [0] * len(MEASURES))
+            for index, value in enumerate(measures):
+                totals[index] += value
+    return [(key[0], key[1], key[2], key[3], tuple(values)) for key, values in groups.items()]
+
+
+def _group(provider, region, status, measures: Iterable) -> Dict[str, Any]:
+    group = {"provider": provider, "region": region, "status": status}
+    for name, value in zip(MEASURE_NAMES, measures):
+        group[name] = round(float(value), 4) if name not in ("instances", "cpu_cores") else int(value)
+    return group
+
+
+async def summarize_instances(db: AsyncSession, include_inactive: bool = False) -> Dict[str, Any]:
+    """Totaux de la flotte par fournisseur, région et statut, en une requête"""
+    criteria = [] if include_inactive else [CloudInstance.is_active == True]
+    if db.get_bind().dialect.name == "postgresql":
+        rows = await _grouping_sets_rows(db, criteria)
+    else:
+        rows = await _python_rollup_rows(db, criteria)
+
+    summary: Dict[str, Any] = {name: [] for name in LEVELS.values() if name != "total"}
+    summary["total"] = _group(None, None, None, (0,) * len(MEASURES))
+    for level, provider, region, status, measures in rows:
+        name = LEVELS.get(level)
+        if name == "total":
+            summary["total"] = _group(None, None, None, measures)
+        elif name is not None:
+            summary[name].append(_group(provider, region, status, measures))
+
+    for name in summary:
+        if name != "total":
+            summary[name].sort(key=lambda group: (group["provider"] or "", group["region"] or "", group["status"] or ""))
+    return summary
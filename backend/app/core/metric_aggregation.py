@@ -0,0 +1,238 @@
+"""
+Agrégation des métriques par intervalles de temps, calculée dans PostgreSQL
+
+Les intervalles déjà couverts par la compaction sont lus dans le rollup le
+plus grossier compatible avec la largeur demandée ; la fin de la plage, pas
+encore compactée, et les intervalles du rollup coupés par les bornes sont
+calculés sur la table brute.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Float, cast, func, literal_column, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.metric_rollup import ROLLUP_MODELS, ROLLUP_STATE_NAME, MetricRollupState
+from app.models.monitoring_metric import MonitoringMetric
+
+# Largeurs d'intervalle supportées
+BUCKET_WIDTHS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# Rollup le plus grossier dont la granularité divise chaque largeur
+ROLLUP_FOR_BUCKET = {
+    "1m": "1m",
+    "5m": "1m",
+    "1h": "1h",
+    "1d": "1d",
+}
+
+# Largeurs alignées sur une unité de date_trunc
+_DATE_TRUNC_UNITS = {
+    "1m": "minute",
+    "1h": "hour",
+    "1d": "day",
+}
+
+
+def bucket_expression(column, bucket_width: str):
+    """
+    Expression SQL qui tronque un timestamp au début de son intervalle (UTC)
+
+    Les arguments constants sont rendus en littéraux SQL (et non en
+    paramètres liés) pour que l'expression du SELECT et celle du GROUP BY
+    soient identiques pour PostgreSQL.
+    """
+    unit = _DATE_TRUNC_UNITS.get(bucket_width)
+    if unit:
+        return func.date_trunc(literal_column(f"'{unit}'"), column, literal_column("'UTC'"))
+    seconds = int(BUCKET_WIDTHS[bucket_width].total_seconds())
+    return func.date_bin(
+        literal_column(f"interval '{seconds} seconds'"),
+        column,
+        literal_column("timestamptz '2000-01-01 00:00:00+00'")
+    )
+
+
+def bucket_count(start: datetime, end: datetime, bucket_width: str) -> int:
+    """Nombre d'intervalles couverts par la plage [start, end)"""
+    return int((end - start) / BUCKET_WIDTHS[bucket_width]) + 1
+
+
+def floor_to_bucket(value: datetime, bucket_width: str) -> datetime:
+    """Début (UTC) de l'intervalle contenant `value`, aligné comme en SQL"""
+    seconds = int(BUCKET_WIDTHS[bucket_width].total_seconds())
+    epoch = int(value.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def ceil_to_bucket(value: datetime, bucket_width: str) -> datetime:
+    """Début (UTC) du premier intervalle commençant à `value` ou après"""
+    floor = floor_to_bucket(value, bucket_width)
+    return floor if floor == value else floor + BUCKET_WIDTHS[bucket_width]
+
+
+class AggregateRow(NamedTuple):
+    """Agrégats d'un intervalle (mêmes colonnes que les requêtes SQL)"""
+    bucket: datetime
+    count: int
+    min: float
+    max: float
+    avg: float
+    p95: Optional[float]
+    p95_upper_bound: Optional[float]
+
+
+async def _aggregate_raw(
+    db: AsyncSession,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    bucket_width: str,
+    instance_id: Optional[int]
+):
+    """Agréger les métriques brutes de la plage [start, end) (p95 exact)"""
+    bucket = bucket_expression(MonitoringMetric.timestamp, bucket_width).label("bucket")
+    p95 = func.percentile_cont(0.95).within_group(MonitoringMetric.value)
+    query = select(
+        bucket,
+        func.count().label("count"),
+        func.min(MonitoringMetric.value).label("min"),
+        func.max(MonitoringMetric.value).label("max"),
+        func.avg(MonitoringMetric.value).label("avg"),
+        p95.label("p95"),
+        p95.label("p95_upper_bound"),
+    ).where(
+        MonitoringMetric.metric_type == metric_type,
+        MonitoringMetric.timestamp >= start,
+        MonitoringMetric.timestamp < end,
+    )
+
+    if instance_id:
+        query = query.where(MonitoringMetric.instance_id == instance_id)
+
+    return (await db.execute(query.group_by(bucket).order_by(bucket))).all()
+
+
+async def _aggregate_rollup(
+    db: AsyncSession,
+    model,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    bucket_width: str,
+    instance_id: Optional[int]
+):
+    """
+    Regrouper les lignes d'un rollup dans des intervalles de `bucket_width`
+
+    Un p95 ne se fusionne pas : seul le maximum des p95 des lots compactés
+    est connu. Il est renvoyé comme majorant (p95_upper_bound), p95 restant
+    vide.
+    """
+    bucket = bucket_expression(model.bucket, bucket_width).label("bucket")
+    query = select(
+        bucket,
+        func.sum(model.count).label("count"),
+        func.min(model.min).label("min"),
+        func.max(model.max).label("max"),
+        (func.sum(model.sum) / cast(func.sum(model.count), Float)).label("avg"),
+        null().label("p95"),
+        func.max(model.p95).label("p95_upper_bound"),
+    ).where(
+        model.metric_type == metric_type,
+        model.bucket >= start,
+        model.bucket < end,
+    )
+
+    if instance_id:
+        query = query.where(model.instance_id == instance_id)
+
+    return (await db.execute(query.group_by(bucket).order_by(bucket))).all()
+
+
+def _merge_rows(rows) -> List[AggregateRow]:
+    """
+    Fusionner les lignes d'un même intervalle issues de sources différentes
+    (bord partiel brut + rollup), triées par intervalle
+    """
+    merged = {}
+    for row in rows:
+        current = merged.get(row.bucket)
+        if current is None:
+            merged[row.bucket] = AggregateRow(*row)
+            continue
+        bounds = [value for value in (current.p95_upper_bound, row.p95_upper_bound) if value is not None]
+        # sum(count) d'un rollup est un numeric (Decimal)
+        count = int(current.count) + int(row.count)
+        merged[row.bucket] = AggregateRow(
+            bucket=row.bucket,
+            count=count,
+            min=min(current.min, row.min),
+            max=max(current.max, row.max),
+            avg=(current.avg * int(current.count) + row.avg * int(row.count)) / count,
+            # Deux p95 ne se fusionnent pas : seul le majorant reste connu
+            p95=None,
+            p95_upper_bound=max(bounds) if bounds else None,
+        )
+    return [merged[bucket] for bucket in sorted(merged)]
+
+
+async def aggregate_metrics(
+    db: AsyncSession,
+    metric_type: str,
+    start: datetime,
+    end: datetime,
+    bucket_width: str,
+    instance_id: Optional[int] = None,
+    source: str = "auto"
+) -> Tuple[List, str]:
+    """
+    Calculer min/max/avg/p95/count par intervalle pour une métrique
+
+    `source` vaut "auto" (rollup + fin de plage brute), "rollup" ou "raw".
+    Retourne les lignes (bucket, count, min, max, avg, p95, p95_upper_bound)
+    triées par intervalle et la source effectivement utilisée ; p95 n'est
+    exact que pour les intervalles calculés sur les données brutes.
+
+    Le rollup n'est lu que pour ses intervalles entièrement compris dans
+    [start, end) : les bords partiels (start ou end au milieu d'un intervalle
+    du rollup) sont calculés sur les données brutes, pour que le résultat ne
+    dépende pas de la source.
+    """
+    if source == "raw":
+        return await _aggregate_raw(db, metric_type, start, end, bucket_width, instance_id), "raw"
+
+    rollup_width = ROLLUP_FOR_BUCKET[bucket_width]
+    covered_until = (await db.execute(
+        select(MetricRollupState.covered_until)
+        .where(MetricRollupState.name == ROLLUP_STATE_NAME)
+    )).scalar()
+
+    if source == "rollup":
+        limit = end
+    elif covered_until is None:
+        return await _aggregate_raw(db, metric_type, start, end, bucket_width, instance_id), "raw"
+    else:
+        # Les horodatages au-delà de la couverture sont lus dans la table brute
+        limit = min(covered_until, end)
+
+    rollup_start = ceil_to_bucket(start, rollup_width)
+    rollup_end = floor_to_bucket(limit, rollup_width)
+    if rollup_end <= rollup_start:
+        return await _aggregate_raw(db, metric_type, start, end, bucket_width, instance_id), "raw"
+
+    rows = list(await _aggregate_rollup(
+        db, ROLLUP_MODELS[rollup_width], metric_type, rollup_start, rollup_end, bucket_width, instance_id
+    ))
+    used_source = f"rollup_{rollup_width}"
+    for raw_start, raw_end in ((start, rollup_start), (rollup_end, end)):
+        if raw_start < raw_end:
+            rows.extend(await _aggregate_raw(db, metric_type, raw_start, raw_end, bucket_width, instance_id))
+            used_source = f"rollup_{rollup_width}+raw"
+
+    return _merge_rows(rows), used_source
@@ -0,0 +1,284 @@
+"""
+Tampon d'écriture différée (write-behind) des métriques de monitoring
+
+Les producteurs (collecteur de l'hôte, /api/metrics/simulate...) déposent des
+lignes en mémoire sans attendre la base ; un thread d'écriture les regroupe
+et les écrit en une transaction (COPY avec psycopg2, sinon INSERT
+multi-lignes) dès que METRIC_BUFFER_FLUSH_ROWS lignes sont en attente ou que
+la plus ancienne attend depuis METRIC_BUFFER_FLUSH_INTERVAL_SECONDS.
+
+La file est bornée à METRIC_BUFFER_MAX_ROWS lignes. Quand elle est pleine :
+- "drop" : les nouvelles lignes sont refusées (comptées dans
+  metric_buffer_dropped_rows_total)
+- "block" : le producteur attend qu'une écriture libère de la place, au plus
+  METRIC_BUFFER_BLOCK_TIMEOUT_SECONDS, puis les lignes restantes sont refusées
+
+Le thread d'écriture est démarré par le lifespan de l'application, ou au
+premier dépôt s'il ne tourne pas (scripts, tests sans lifespan) ; dans ce
+cas les lignes en attente sont écrites à la sortie du processus (atexit).
+À l'arrêt de l'application (lifespan), les lignes en attente sont écrites
+avant la fin du thread. Les lignes écrites sont diffusées au flux en direct
+(metric_stream) après le commit. Télémétrie (GET /metrics) : profondeur de
+la file, durée des écritures, lignes écrites, refusées et perdues.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import List, Literal, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metric_ingest import MetricRow, write_metric_rows
+from app.core.metric_stream import metric_stream
+from app.core.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+BUFFER_DEPTH = registry.gauge("metric_buffer_queue_rows", "Métriques en attente d'écriture dans le tampon")
+BUFFER_FLUSH_SECONDS = registry.histogram(
+    "metric_buffer_flush_seconds", "Durée des écritures groupées du tampon de métriques"
+)
+BUFFER_FLUSHED = registry.counter("metric_buffer_flushed_rows_total", "Métriques écrites par le tampon")
+BUFFER_DROPPED = registry.counter(
+    "metric_buffer_dropped_rows_total", "Métriques refusées ou perdues par le tampon", ["reason"]
+)
+BUFFER_FLUSH_ERRORS = registry.counter("metric_buffer_flush_errors_total", "Écritures du tampon en échec")
+
+OverflowPolicy = Literal["drop", "block"]
+
+
+class MetricWriteBuffer:
+    """File bornée de lignes de métriques, vidée par un thread d'écriture"""
+
+    name = "metric-buffer"
+
+    def __init__(
+        self,
+        max_rows: Optional[int] = None,
+        flush_rows: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        overflow: Optional[OverflowPolicy] = None,
+        block_timeout_seconds: Optional[float] = None,
+    ):
+        self.max_rows = max_rows or settings.METRIC_BUFFER_MAX_ROWS
+        self.flush_rows = min(flush_rows or settings.METRIC_BUFFER_FLUSH_ROWS, self.max_rows)
+        self.flush_interval_seconds = flush_interval_seconds or settings.METRIC_BUFFER_FLUSH_INTERVAL_SECONDS
+        self.overflow = overflow or settings.METRIC_BUFFER_OVERFLOW
+        self.block_timeout_seconds = (
+            settings.METRIC_BUFFER_BLOCK_TIMEOUT_SECONDS if block_timeout_seconds is None else block_timeout_seconds
+        )
+        self._rows: "deque[MetricRow]" = deque()
+        self._condition = threading.Condition()
+        # [instant d'arrivée, lignes restantes] de chaque dépôt, dans l'ordre de la file
+        self._arrivals: "deque[List[float]]" = deque()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._rows)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def _oldest_at(self) -> Optional[float]:
+        """Instant d'arrivée de la plus ancienne ligne en attente"""
+        return self._arrivals[0][0] if self._arrivals else None
+
+    def _ensure_writer(self) -> None:
+        """Démarrer le thread d'écriture au premier dépôt s'il ne tourne pas (hors arrêt)"""
+        if self.running or self._stopping:
+            return
+        self.start()
+        if not self._atexit_registered:
+            self._atexit_registered = True
+            atexit.register(self.stop)
+
+    def _enqueue(self, rows: Sequence[MetricRow]) -> int:
+        """Ajouter ce qui tient dans la file (verrou tenu) ; renvoie le nombre de lignes acceptées"""
+        accepted = min(len(rows), self.max_rows - len(self._rows))
+        if accepted <= 0:
+            return 0
+        self._arrivals.append([time.monotonic(), accepted])
+        self._rows.extend(rows[:accepted])
+        BUFFER_DEPTH.set(len(self._rows))
+        if len(self._rows) >= self.flush_rows:
+            self._condition.notify_all()
+        return accepted
+
+    def offer(self, rows: Sequence[MetricRow]) -> int:
+        """Déposer des lignes sans jamais attendre ; renvoie le nombre de lignes acceptées"""
+        self._ensure_writer()
+        with self._condition:
+            return self._enqueue(rows)
+
+    def submit(self, rows: Sequence[MetricRow]) -> int:
+        """
+        Déposer des lignes selon la politique de débordement
+
+        Avec "block", attend que le thread d'écriture libère de la place (au
+        plus block_timeout_seconds). Renvoie le nombre de lignes acceptées ;
+        les autres sont comptées comme refusées.
+        """
+        rows = list(rows)
+        self._ensure_writer()
+        deadline = time.monotonic() + self.block_timeout_seconds
+        with self._condition:
+            accepted = self._enqueue(rows)
+            while (
+                accepted < len(rows)
+                and self.overflow == "block"
+                and self.running
+                and not self._stopping
+            ):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                accepted += self._enqueue(rows[accepted:])
+        if accepted < len(rows):
+            BUFFER_DROPPED.inc(len(rows) - accepted, reason="full")
+            logger.warning(f"⚠️ Tampon de métriques plein : {len(rows) - accepted} lignes refusées")
+        return accepted
+
+    async def submit_async(self, rows: Sequence[MetricRow]) -> int:
+        """Déposer des lignes depuis la boucle d'événements (l'attente éventuelle se fait dans un thread)"""
+        rows = list(rows)
+        accepted = self.offer(rows)
+        if accepted == len(rows):
+            return accepted
+        if self.overflow == "block":
+            return accepted + await run_in_threadpool(self.submit, rows[accepted:])
+        BUFFER_DROPPED.inc(len(rows) - accepted, reason="full")
+        logger.warning(f"⚠️ Tampon de métriques plein : {len(rows) - accepted} lignes refusées")
+        return accepted
+
+    def _take_batch(self) -> List[MetricRow]:
+        """Retirer au plus flush_rows lignes (verrou tenu)"""
+        count = min(len(self._rows), self.flush_rows)
+        batch = [self._rows.popleft() for _ in range(count)]
+        # Les dépôts restants gardent leur instant d'arrivée
+        while count and self._arrivals:
+            arrival = self._arrivals[0]
+            taken = min(arrival[1], count)
+            arrival[1] -= taken
+            count -= taken
+            if not arrival[1]:
+                self._arrivals.popleft()
+        BUFFER_DEPTH.set(len(self._rows))
+        # Place libérée pour les producteurs en attente (politique "block")
+        self._condition.notify_all()
+        return batch
+
+    def _write(self, rows: List[MetricRow]) -> None:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            write_metric_rows(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            BUFFER_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        BUFFER_FLUSHED.inc(len(rows))
+        metric_stream.publish(rows)
+
+    def _requeue(self, rows: List[MetricRow]) -> None:
+        """Remettre en tête de file un lot en échec, dans la limite de la capacité"""
+        with self._condition:
+            kept = rows[:max(self.max_rows - len(self._rows), 0)]
+            self._rows.extendleft(reversed(kept))
+            if kept:
+                # Pas plus récent que les dépôts qui le suivent dans la file
+                oldest = self._oldest_at
+                self._arrivals.appendleft([time.monotonic() if oldest is None else oldest, len(kept)])
+            BUFFER_DEPTH.set(len(self._rows))
+        if len(kept) < len(rows):
+            BUFFER_DROPPED.inc(len(rows) - len(kept), reason="write_error")
+
+    def flush(self) -> int:
+        """Écrire tout ce qui est en attente dans le thread appelant ; renvoie le nombre de lignes écrites"""
+        written = 0
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return written
+            try:
+                self._write(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+            written += len(batch)
+
+    def _due(self) -> bool:
+        if len(self._rows) >= self.flush_rows:
+            return True
+        return self._oldest_at is not None and time.monotonic() - self._oldest_at >= self.flush_interval_seconds
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and not self._due():
+                    timeout = self.flush_interval_seconds
+                    if self._oldest_at is not None:
+                        timeout = max(self._oldest_at + self.flush_interval_seconds - time.monotonic(), 0.0)
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+                batch = self._take_batch()
+            try:
+                self._write(batch)
+            except Exception as e:
+                BUFFER_FLUSH_ERRORS.inc()
+                logger.warning(f"⚠️ [{self.name}] Écriture de {len(batch)} métriques impossible: {e}")
+                self._requeue(batch)
+                # Laisser la base récupérer avant de réessayer
+                with self._condition:
+                    self._condition.wait_for(lambda: self._stopping, self.flush_interval_seconds)
+
+    def start(self):
+        with self._start_lock:
+            if self.running:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        logger.info(
+            f"✅ [{self.name}] Démarré (lots de {self.flush_rows} lignes ou {self.flush_interval_seconds}s, "
+            f"file de {self.max_rows}, politique {self.overflow})"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """Arrêter le thread puis écrire les lignes encore en attente"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            written = self.flush()
+            if written:
+                logger.info(f"✅ [{self.name}] {written} métriques écrites à l'arrêt")
+        except Exception as e:
+            lost = self.depth
+            with self._condition:
+                self._rows.clear()
+                self._arrivals.clear()
+                BUFFER_DEPTH.set(0)
+            BUFFER_DROPPED.inc(lost, reason="shutdown")
+            logger.warning(f"⚠️ [{self.name}] {lost} métriques perdues à l'arrêt: {e}")
+
+
+metric_buffer = MetricWriteBuffer()
@@ -0,0 +1,225 @@
+"""
+Export des métriques brutes vers des fichiers (Parquet, Arrow IPC, CSV gzip)
+
+Les lignes sont lues par lots de METRICS_EXPORT_CHUNK_SIZE sur un curseur
+côté serveur et encodées lot par lot : la mémoire utilisée ne dépend pas de
+la taille de la plage exportée. Chaque lot devient un row group Parquet ou
+un record batch Arrow ; les octets produits sont rendus au fur et à mesure
+(réponse HTTP en flux ou fichier).
+
+Parquet et Arrow nécessitent le paquet optionnel pyarrow ; le CSV gzip
+n'utilise que la bibliothèque standard.
+
+Usage en ligne de commande (depuis backend/) :
+    python -m app.core.metric_export --start 2024-01-01 --end 2024-01-15 --format parquet -o metrics.parquet
+"""
+import argparse
+import csv
+import gzip
+import io
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.telemetry import registry
+from app.models.monitoring_metric import MonitoringMetric
+
+# Format -> (type MIME, extension)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "csv": ("application/gzip", "csv.gz"),
+}
+
+EXPORT_COLUMNS = ("id", "instance_id", "metric_type", "value", "unit", "timestamp")
+
+EXPORTED_ROWS = registry.counter(
+    "metrics_export_rows_total", "Métriques exportées", ["format"]
+)
+
+
+class ExportUnavailable(Exception):
+    """Format d'export indisponible (dépendance optionnelle absente)"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportUnavailable("Le paquet pyarrow est requis pour les exports Parquet et Arrow")
+    return pyarrow
+
+
+def export_query(
+    start: datetime,
+    end: datetime,
+    metric_type: Optional[str] = None,
+    instance_id: Optional[int] = None,
+):
+    """Métriques de [start, end) dans l'ordre (timestamp, id) : lecture partition par partition"""
+    query = (
+        select(*(getattr(MonitoringMetric, column) for column in EXPORT_COLUMNS))
+        .where(MonitoringMetric.timestamp >= start, MonitoringMetric.timestamp < end)
+        .order_by(MonitoringMetric.timestamp, MonitoringMetric.id)
+    )
+    if metric_type:
+        query = query.where(MonitoringMetric.metric_type == metric_type)
+    if instance_id:
+        query = query.where(MonitoringMetric.instance_id == instance_id)
+    return query
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichier en écriture seule dont on récupère les octets au fil de l'eau"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Position absolue : les offsets du pied de page Parquet en dépendent
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class MetricExportWriter:
+    """
+    Encodeur incrémental d'un export
+
+    `write(rows)` encode un lot de tuples (colonnes EXPORT_COLUMNS) et
+    renvoie les octets disponibles ; `close()` renvoie la fin du fichier.
+    """
+
+    def __init__(self, format: str):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Format d'export inconnu: {format}")
+        self.format = format
+        self.rows = 0
+        self._sink = _ChunkSink()
+        self._writer = None
+        if format == "csv":
+            self._writer = gzip.GzipFile(fileobj=self._sink, mode="wb")
+            self._write_csv([EXPORT_COLUMNS])
+        else:
+            pa = _pyarrow()
+            self._pa = pa
+            self._schema = pa.schema([
+                ("id", pa.int64()),
+                ("instance_id", pa.int64()),
+                ("metric_type", pa.string()),
+                ("value", pa.float64()),
+                ("unit", pa.string()),
+                ("timestamp", pa.timestamp("us", tz="UTC")),
+            ])
+            if format == "parquet":
+                self._writer = pa.parquet.ParquetWriter(self._sink, self._schema, compression="zstd")
+            else:
+                self._writer = pa.ipc.new_stream(self._sink, self._schema)
+
+    def _write_csv(self, rows: Iterable[Sequence]) -> None:
+        text = io.StringIO()
+        writer = csv.writer(text)
+        for row in rows:
+            writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        self._writer.write(text.getvalue().encode("utf-8"))
+
+    def write(self, rows: Sequence[Sequence]) -> bytes:
+        if not rows:
+            return b""
+        if self.format == "csv":
+            self._write_csv(rows)
+        else:
+            pa = self._pa
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*rows), self._schema)
+            ]
+            # Un row group Parquet / un record batch Arrow par lot
+            self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+        self.rows += len(rows)
+        EXPORTED_ROWS.inc(len(rows), format=self.format)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def export_to_file(
+    path: str,
+    start: datetime,
+    end: datetime,
+    format: str = "parquet",
+    metric_type: Optional[str] = None,
+    instance_id: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """Exporter une plage vers un fichier (moteur synchrone) ; renvoie lignes, durée et débit"""
+    from app.core.database import engine
+
+    chunk_size = chunk_size or settings.METRICS_EXPORT_CHUNK_SIZE
+    writer = MetricExportWriter(format)
+    started = time.perf_counter()
+    with open(path, "wb") as output, engine.connect() as connection:
+        result = connection.execution_options(yield_per=chunk_size).execute(
+            export_query(start, end, metric_type, instance_id)
+        )
+        for rows in result.partitions():
+            output.write(writer.write(rows))
+        output.write(writer.close())
+    duration = time.perf_counter() - started
+    return {
+        "rows": writer.rows,
+        "duration_s": round(duration, 3),
+        "rows_per_second": round(writer.rows / duration) if duration > 0 else 0,
+    }
+
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporter les métriques de monitoring")
+    parser.add_argument("--start", required=True, type=_parse_datetime, help="Début de la plage (ISO 8601, UTC par défaut)")
+    parser.add_argument("--end", type=_parse_datetime, help="Fin de la plage, exclue (défaut: maintenant)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--metric-type", help="Type de métrique (cpu, memory, network, storage)")
+    parser.add_argument("--instance-id", type=int, help="ID de l'instance")
+    parser.add_argument("--chunk-size", type=int, help="Lignes par lot (défaut: METRICS_EXPORT_CHUNK_SIZE)")
+    parser.add_argument("-o", "--output", help="Fichier de sortie (défaut: metrics.<extension>)")
+    args = parser.parse_args(argv)
+
+    end = args.end or datetime.now(timezone.utc)
+    output = args.output or f"metrics.{EXPORT_FORMATS[args.format][1]}"
+    try:
+        stats = export_to_file(
+            output, args.start, end, args.format, args.metric_type, args.instance_id, args.chunk_size
+        )
+    except ExportUnavailable as e:
+        parser.exit(1, f"❌ {e}\n")
+    print(f"📦 {stats['rows']} métriques exportées vers {output} en {stats['duration_s']}s ({stats['rows_per_second']} lignes/s)")
+
+
+if __name__ == "__main__":
+    main()
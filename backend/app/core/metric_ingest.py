@@ -0,0 +1,223 @@
+"""
+Ingestion en lot des métriques de monitoring
+
+Les métriques sont validées par lots avec Pydantic, les instance_id inconnus
+sont filtrés avec une seule requête par lot, puis les lignes sont écrites avec
+COPY (psycopg2 ou asyncpg) ou un INSERT multi-lignes, dans la transaction de
+la session.
+"""
+import io
+import logging
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metric_stream import metric_stream
+from app.models.cloud_instance import CloudInstance
+from app.models.monitoring_metric import MonitoringMetric
+from app.schemas.monitoring_metric import MonitoringMetricCreate
+
+logger = logging.getLogger(__name__)
+
+# Colonnes écrites, dans l'ordre des tuples MetricRow
+METRIC_COLUMNS = ("instance_id", "metric_type", "value", "unit", "timestamp")
+
+MetricRow = Tuple[Optional[int], str, float, str, datetime]
+
+_metrics_adapter = TypeAdapter(List[MonitoringMetricCreate])
+
+_COPY_SQL = (
+    f"COPY {MonitoringMetric.__tablename__} ({', '.join(METRIC_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT text)"
+)
+
+
+def _format_error(error: dict) -> str:
+    """Message lisible pour une erreur de validation Pydantic"""
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+def validate_metrics(
+    items: Sequence[Any],
+    offset: int = 0
+) -> Tuple[List[Tuple[int, MetricRow]], List[Tuple[int, str]]]:
+    """
+    Valider un lot de métriques brutes (dicts JSON)
+
+    Retourne les lignes valides avec leur index d'origine et la liste des
+    rejets (index, message). La validation se fait en une passe sur tout le
+    lot ; une seconde passe n'a lieu que si des lignes sont invalides.
+    """
+    rejected = {}
+    try:
+        metrics = _metrics_adapter.validate_python(items)
+        indexes = range(len(items))
+    except ValidationError as e:
+        for error in e.errors():
+            rejected.setdefault(error["loc"][0], _format_error(error))
+        indexes = [i for i in range(len(items)) if i not in rejected]
+        metrics = _metrics_adapter.validate_python([items[i] for i in indexes])
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for index, metric in zip(indexes, metrics):
+        timestamp = metric.timestamp or now
+        if timestamp.tzinfo is None:
+            # Les timestamps sans fuseau sont considérés comme UTC
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        rows.append((
+            offset + index,
+            (metric.instance_id, metric.metric_type, metric.value, metric.unit, timestamp),
+        ))
+
+    rejections = [(offset + index, message) for index, message in sorted(rejected.items())]
+    return rows, rejections
+
+
+def _copy_value(value: Any) -> str:
+    """Encoder une valeur pour le format texte de COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        return (
+            value.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+    return repr(value)
+
+
+def _copy_buffer(rows: Sequence[MetricRow]) -> io.StringIO:
+    """Construire le flux COPY (une ligne tabulée par métrique)"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def write_metric_rows(db: Session, rows: Sequence[MetricRow]) -> None:
+    """
+    Écrire des lignes de métriques dans la transaction courante de la session
+
+    Utilise COPY avec psycopg2, sinon un INSERT multi-lignes (executemany).
+    Le commit reste à la charge de l'appelant.
+    """
+    if not rows:
+        return
+
+    connection = db.connection()
+    if connection.dialect.driver == "psycopg2":
+        dbapi_connection = connection.connection.dbapi_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(_COPY_SQL, _copy_buffer(rows))
+    else:
+        db.execute(
+            insert(MonitoringMetric),
+            [dict(zip(METRIC_COLUMNS, row)) for row in rows]
+        )
+
+
+async def write_metric_rows_async(db: AsyncSession, rows: Sequence[MetricRow]) -> None:
+    """
+    Écrire des lignes de métriques dans la transaction courante (session asynchrone)
+
+    Utilise COPY (copy_records_to_table) avec asyncpg dès que la transaction
+    de la session est ouverte côté serveur ; sinon un INSERT multi-lignes, qui
+    ouvre la transaction. Le commit reste à la charge de l'appelant.
+    """
+    if not rows:
+        return
+
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if driver_connection.is_in_transaction():
+            await driver_connection.copy_records_to_table(
+                MonitoringMetric.__tablename__,
+                records=rows,
+                columns=list(METRIC_COLUMNS)
+            )
+            return
+
+    await db.execute(
+        insert(MonitoringMetric),
+        [dict(zip(METRIC_COLUMNS, row)) for row in rows]
+    )
+
+
+class MetricBatchWriter:
+    """
+    Écrit des métriques par paquets dans une seule transaction
+
+    Les lignes sont validées à l'ajout puis envoyées par paquets de
+    `chunk_size`, ce qui borne la mémoire pour les corps NDJSON volumineux.
+    """
+
+    def __init__(self, db: AsyncSession, chunk_size: int = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.METRICS_BATCH_CHUNK_SIZE
+        self.accepted = 0
+        self.rejections: List[Tuple[int, str]] = []
+        self._pending: List[Tuple[int, MetricRow]] = []
+        # Lignes écrites, à diffuser après le commit (seulement si quelqu'un écoute)
+        self.written: List[MetricRow] = []
+        self._known_instances: Set[int] = set()
+        self._unknown_instances: Set[int] = set()
+
+    @property
+    def rejected(self) -> int:
+        return len(self.rejections)
+
+    def reject(self, index: int, message: str) -> None:
+        """Enregistrer un rejet détecté en amont (ex: JSON invalide)"""
+        self.rejections.append((index, message))
+
+    async def add(self, items: Sequence[Any], offset: int = 0) -> None:
+        """Valider et mettre en attente un lot de métriques brutes"""
+        rows, rejections = validate_metrics(items, offset)
+        self.rejections.extend(rejections)
+        self._pending.extend(rows)
+        if len(self._pending) >= self.chunk_size:
+            await self.flush()
+
+    async def _check_instances(self, rows: List[Tuple[int, MetricRow]]) -> List[MetricRow]:
+        """Filtrer les lignes dont l'instance_id n'existe pas (une requête par paquet)"""
+        ids = {row[0] for _, row in rows if row[0] is not None}
+        unchecked = ids - self._known_instances - self._unknown_instances
+        if unchecked:
+            found = set((await self.db.execute(
+                select(CloudInstance.id).where(CloudInstance.id.in_(unchecked))
+            )).scalars())
+            self._known_instances |= found
+            self._unknown_instances |= unchecked - found
+
+        valid = []
+        for index, row in rows:
+            if row[0] is not None and row[0] in self._unknown_instances:
+                self.rejections.append((index, f"instance_id: instance {row[0]} inconnue"))
+            else:
+                valid.append(row)
+        return valid
+
+    async def flush(self) -> None:
+        """Envoyer les lignes en attente (sans commit)"""
+        if not self._pending:
+            return
+        rows = await self._check_instances(self._pending)
+        self._pending = []
+        await write_metric_rows_async(self.db, rows)
+        self.accepted += len(rows)
+        if metric_stream.has_subscribers:
+            self.written.extend(rows)
@@ -0,0 +1,206 @@
+"""
+Partitionnement par plage de temps de monitoring_metrics et rétention
+
+monitoring_metrics est partitionnée par RANGE (timestamp), par jour ou par
+semaine. Les partitions futures sont créées à l'avance, une partition DEFAULT
+reçoit les lignes hors plage, et la rétention supprime les partitions entières
+plutôt que d'exécuter un DELETE massif.
+
+Usage en ligne de commande (ex: cron) :
+    python -m app.core.metric_partitions
+"""
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.background import PeriodicWorker
+from app.core.config import settings
+from app.core.database import engine
+from app.models.monitoring_metric import MonitoringMetric
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = MonitoringMetric.__tablename__
+DEFAULT_PARTITION = f"{TABLE_NAME}_default"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """Vérifier que monitoring_metrics est une table partitionnée"""
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": TABLE_NAME}
+    ).scalar()
+    return relkind == "p"
+
+
+def id_type(connection: Connection) -> Optional[str]:
+    """Type SQL de monitoring_metrics.id ("bigint", ou "integer" avant la migration)"""
+    return connection.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = :name AND column_name = 'id'"
+        ),
+        {"name": TABLE_NAME}
+    ).scalar()
+
+
+def _partition_start(day: date) -> date:
+    """Début de la partition contenant `day` (lundi pour les partitions hebdomadaires)"""
+    if settings.METRICS_PARTITION_INTERVAL == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _partition_bounds(start: date) -> Tuple[datetime, datetime]:
+    step = timedelta(weeks=1) if settings.METRICS_PARTITION_INTERVAL == "week" else timedelta(days=1)
+    lower = datetime.combine(start, time.min, tzinfo=timezone.utc)
+    return lower, lower + step
+
+
+def partition_name(start: date) -> str:
+    return f"{TABLE_NAME}_p{start:%Y%m%d}"
+
+
+def _create_partition(connection: Connection, start: date) -> bool:
+    """
+    Créer la partition commençant à `start` si elle n'existe pas
+
+    Si la partition DEFAULT contient déjà des lignes de cette plage, elles
+    sont déplacées dans la nouvelle table avant de l'attacher.
+    """
+    name = partition_name(start)
+    if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+
+    lower, upper = _partition_bounds(start)
+    bounds = f"FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    params = {"lower": lower, "upper": upper}
+
+    has_default_rows = connection.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE timestamp >= :lower AND timestamp < :upper)"
+        ),
+        params
+    ).scalar()
+
+    if not has_default_rows:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE_NAME} FOR VALUES {bounds}"))
+    else:
+        connection.execute(text(
+            f"CREATE TABLE {name} (LIKE {TABLE_NAME} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        connection.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE timestamp >= :lower AND timestamp < :upper RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            params
+        )
+        connection.execute(text(f"ALTER TABLE {TABLE_NAME} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+    logger.info(f"🗂️ Partition {name} créée")
+    return True
+
+
+def ensure_partitions(connection: Connection, today: Optional[date] = None) -> List[str]:
+    """
+    Créer la partition DEFAULT et les partitions de la fenêtre de rétention
+    jusqu'à METRICS_PARTITION_PREMAKE_DAYS jours dans le futur
+    """
+    today = today or datetime.now(timezone.utc).date()
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE_NAME} DEFAULT"
+    ))
+
+    # Couvrir aussi le passé conservé, pour que l'ingestion différée ne tombe pas dans DEFAULT
+    first_day = today - timedelta(days=settings.METRICS_RETENTION_DAYS or 0)
+    last_day = today + timedelta(days=settings.METRICS_PARTITION_PREMAKE_DAYS)
+
+    created = []
+    start = _partition_start(first_day)
+    while start <= last_day:
+        if _create_partition(connection, start):
+            created.append(partition_name(start))
+        start = _partition_bounds(start)[1].date()
+    return created
+
+
+def drop_expired_partitions(connection: Connection, now: Optional[datetime] = None) -> List[str]:
+    """
+    Supprimer les partitions entièrement antérieures à la fenêtre de rétention
+
+    Les lignes expirées de la partition DEFAULT sont supprimées par DELETE.
+    """
+    if settings.METRICS_RETENTION_DAYS <= 0:
+        return []
+
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=settings.METRICS_RETENTION_DAYS)
+    expired = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table "
+            "AND pg_get_expr(child.relpartbound, child.oid) <> 'DEFAULT' "
+            "AND (regexp_match(pg_get_expr(child.relpartbound, child.oid), "
+            "'TO \\(''([^'']+)''\\)'))[1]::timestamptz <= :cutoff"
+        ),
+        {"table": TABLE_NAME, "cutoff": cutoff}
+    ).scalars().all()
+
+    for name in expired:
+        connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        logger.info(f"🗑️ Partition expirée {name} supprimée")
+
+    connection.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff"),
+        {"cutoff": cutoff}
+    )
+    return list(expired)
+
+
+def maintain_partitions(bind: Engine = engine) -> Tuple[List[str], List[str]]:
+    """Créer les partitions à venir puis appliquer la rétention"""
+    with bind.begin() as connection:
+        # Sérialiser la maintenance entre workers (verrou libéré au commit)
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": TABLE_NAME})
+        if not is_partitioned(connection):
+            logger.warning(
+                f"⚠️ La table {TABLE_NAME} n'est pas partitionnée : maintenance ignorée "
+                "(voir database/migrations/partition_monitoring_metrics.sql)"
+            )
+            return [], []
+        if id_type(connection) == "integer":
+            logger.warning(
+                f"⚠️ {TABLE_NAME}.id est en int4 (limite de 2^31 ids) "
+                "(voir database/migrations/monitoring_metrics_bigint_id.sql)"
+            )
+        created = ensure_partitions(connection)
+        dropped = drop_expired_partitions(connection)
+    return created, dropped
+
+
+class PartitionMaintenanceWorker(PeriodicWorker):
+    """Maintenance périodique des partitions de monitoring_metrics"""
+
+    name = "metric-partitions"
+
+    def __init__(self, interval_seconds: Optional[int] = None):
+        super().__init__(interval_seconds or settings.METRICS_PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+    def run_once(self) -> bool:
+        maintain_partitions()
+        return False
+
+
+partition_worker = PartitionMaintenanceWorker()
+
+
+if __name__ == "__main__":
+    created, dropped = maintain_partitions()
+    print(f"✅ Partitions créées: {len(created)}, supprimées: {len(dropped)}")
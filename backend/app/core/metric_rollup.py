@@ -0,0 +1,175 @@
+"""
+Compaction incrémentale des métriques dans les tables de rollup (1m, 1h, 1d)
+
+Chaque passe intègre les métriques dont l'id dépasse le filigrane enregistré
+dans metric_rollup_state, par fusion (upsert) dans les trois tables. Le
+max(id) observé à une passe n'est intégré qu'une fois terminées toutes les
+transactions en cours lors de l'observation (xmin de l'instantané courant
+au-delà du xmax de l'instantané d'observation) : une ingestion longue validée
+tardivement ne laisse pas d'ids sous le filigrane. La couverture
+(covered_until, borne sur timestamp des lectures du rollup) ne dépasse pas
+le plus ancien horodatage des métriques pas encore intégrées.
+
+Usage en ligne de commande (ex: cron) :
+    python -m app.core.metric_rollup
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import BigInteger, Text, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.background import PeriodicWorker
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metric_aggregation import bucket_expression
+from app.models.metric_rollup import ROLLUP_MODELS, ROLLUP_STATE_NAME, MetricRollupState
+from app.models.monitoring_metric import MonitoringMetric
+
+logger = logging.getLogger(__name__)
+
+_ROLLUP_COLUMNS = ["metric_type", "instance_id", "bucket", "count", "sum", "min", "max", "p95"]
+
+
+def _merge_into_rollup(db: Session, model, bucket_width: str, low_id: int, high_id: int) -> None:
+    """Agréger les métriques d'ids ]low_id, high_id] et les fusionner dans un rollup"""
+    instance = func.coalesce(MonitoringMetric.instance_id, literal_column("0"))
+    bucket = bucket_expression(MonitoringMetric.timestamp, bucket_width)
+    source = select(
+        MonitoringMetric.metric_type,
+        instance,
+        bucket,
+        func.count(),
+        func.sum(MonitoringMetric.value),
+        func.min(MonitoringMetric.value),
+        func.max(MonitoringMetric.value),
+        func.percentile_cont(0.95).within_group(MonitoringMetric.value),
+    ).where(
+        MonitoringMetric.id > low_id,
+        MonitoringMetric.id <= high_id,
+    ).group_by(MonitoringMetric.metric_type, instance, bucket)
+
+    table = model.__table__
+    stmt = pg_insert(table).from_select(_ROLLUP_COLUMNS, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["metric_type", "instance_id", "bucket"],
+        set_={
+            "count": table.c.count + stmt.excluded.count,
+            "sum": table.c.sum + stmt.excluded.sum,
+            "min": func.least(table.c.min, stmt.excluded.min),
+            "max": func.greatest(table.c.max, stmt.excluded.max),
+            "p95": func.greatest(table.c.p95, stmt.excluded.p95),
+        }
+    )
+    db.execute(stmt)
+
+
+def compact_metrics(db: Session, batch_size: Optional[int] = None) -> int:
+    """
+    Exécuter une passe de compaction dans une transaction
+
+    La ligne de filigrane est verrouillée (FOR UPDATE) : plusieurs workers
+    peuvent tourner en parallèle sans intégrer deux fois les mêmes lignes.
+    Retourne le nombre d'ids de métriques intégrés.
+    """
+    batch_size = batch_size or settings.METRICS_ROLLUP_BATCH_SIZE
+
+    # Observation faite avant toute écriture (la transaction n'a pas encore
+    # d'xid) : max(id) visible et bornes de l'instantané courant
+    snapshot = func.pg_current_snapshot()
+    max_id, now, snapshot_xmin, snapshot_xmax = db.execute(
+        select(
+            func.coalesce(func.max(MonitoringMetric.id), 0),
+            func.now(),
+            cast(cast(func.pg_snapshot_xmin(snapshot), Text), BigInteger),
+            cast(cast(func.pg_snapshot_xmax(snapshot), Text), BigInteger),
+        )
+    ).one()
+
+    db.execute(
+        pg_insert(MetricRollupState)
+        .values(name=ROLLUP_STATE_NAME, last_metric_id=0, pending_metric_id=0, pending_xmax=0)
+        .on_conflict_do_nothing()
+    )
+    state = db.execute(
+        select(MetricRollupState)
+        .where(MetricRollupState.name == ROLLUP_STATE_NAME)
+        .with_for_update()
+    ).scalar_one()
+
+    # Les ids <= pending_metric_id appartiennent à des transactions validées
+    # ou en cours lors de l'observation (toutes d'xid < pending_xmax) : ils ne
+    # sont intégrés qu'une fois ces transactions toutes terminées, quelle que
+    # soit leur durée (ex. gros POST /api/metrics/batch)
+    pending_settled = snapshot_xmin >= (state.pending_xmax or 0)
+
+    low_id = state.last_metric_id
+    high_id = low_id
+    if pending_settled:
+        high_id = min(state.pending_metric_id, low_id + batch_size)
+
+    if high_id > low_id:
+        for bucket_width, model in ROLLUP_MODELS.items():
+            _merge_into_rollup(db, model, bucket_width, low_id, high_id)
+        state.last_metric_id = high_id
+
+    if pending_settled and high_id >= state.pending_metric_id:
+        # Tout ce qui était visible ou en cours lors de l'observation précédente
+        # est intégré. covered_until borne la colonne timestamp : les lignes non
+        # intégrées peuvent porter un horodatage antérieur à l'observation
+        # (tampon d'écriture, lots horodatés par le client, rattrapage)
+        oldest_pending = db.execute(
+            select(func.min(MonitoringMetric.timestamp)).where(MonitoringMetric.id > high_id)
+        ).scalar()
+        covered_until = state.pending_observed_at
+        if oldest_pending is not None and covered_until is not None:
+            covered_until = min(covered_until, oldest_pending)
+        state.covered_until = covered_until
+        state.pending_metric_id = max_id
+        state.pending_observed_at = now
+        state.pending_xmax = snapshot_xmax
+
+    state.updated_at = now
+    db.commit()
+    return high_id - low_id
+
+
+class MetricRollupWorker(PeriodicWorker):
+    """Compaction périodique des métriques dans un thread d'arrière-plan"""
+
+    name = "metric-rollup"
+
+    def __init__(self, interval_seconds: Optional[int] = None):
+        super().__init__(interval_seconds or settings.METRICS_ROLLUP_INTERVAL_SECONDS)
+
+    def run_once(self) -> bool:
+        """Exécuter une passe de compaction ; True s'il reste un retard à rattraper"""
+        db = SessionLocal()
+        try:
+            return compact_metrics(db) >= settings.METRICS_ROLLUP_BATCH_SIZE
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Compaction des métriques impossible: {e}")
+            return False
+        finally:
+            db.close()
+
+
+rollup_worker = MetricRollupWorker()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        total = 0
+        # Deux passes minimum : la première observe max(id), la suivante l'intègre
+        for _ in range(2):
+            while True:
+                processed = compact_metrics(db)
+                total += processed
+                if processed < settings.METRICS_ROLLUP_BATCH_SIZE:
+                    break
+        print(f"✅ Compaction terminée: {total} métriques intégrées aux rollups")
+    finally:
+        db.close()
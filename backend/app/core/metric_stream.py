@@ -0,0 +1,201 @@
+"""
+Diffusion en direct des métriques ingérées (GET /api/metrics/stream)
+
+Après le commit d'une ingestion, les lignes écrites sont remises aux abonnés
+du processus dont les filtres (instance_id, metric_type) correspondent.
+Rien n'est conservé quand personne n'est abonné.
+
+Chaque abonné a un état borné, alimenté sous verrou depuis n'importe quel
+thread et vidé par sa connexion :
+- sans sous-échantillonnage : les derniers points, au plus
+  METRICS_STREAM_MAX_BUFFER ; un client trop lent perd les points
+  intermédiaires les plus anciens (compteur `dropped`)
+- avec sous-échantillonnage (`interval` > 0) : un accumulateur par série
+  (somme, nombre, min, max) émis en un point moyen par intervalle, quelle que
+  soit la fréquence d'ingestion
+
+La diffusion est propre à chaque processus : avec plusieurs workers uvicorn,
+un abonné ne reçoit que les métriques ingérées par son worker.
+"""
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.core.telemetry import registry
+
+METRIC_STREAM_SUBSCRIBERS = registry.gauge(
+    "metric_stream_subscribers", "Clients abonnés au flux de métriques"
+)
+METRIC_STREAM_DROPPED = registry.counter(
+    "metric_stream_dropped_points_total", "Points non transmis à un abonné trop lent"
+)
+
+# (instance_id, metric_type, value, unit, timestamp), cf. metric_ingest.MetricRow
+StreamRow = Tuple[Optional[int], str, float, Optional[str], datetime]
+SeriesKey = Tuple[Optional[int], str]
+
+
+class _SeriesAccumulator:
+    __slots__ = ("unit", "total", "count", "minimum", "maximum", "last_timestamp")
+
+    def __init__(self, unit: Optional[str]):
+        self.unit = unit
+        self.total = 0.0
+        self.count = 0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.last_timestamp: Optional[datetime] = None
+
+    def add(self, value: float, timestamp: datetime) -> None:
+        self.total += value
+        self.count += 1
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+
+class MetricSubscription:
+    """Abonnement d'un client à un ensemble de séries"""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        instance_ids: Optional[Iterable[int]],
+        metric_types: Optional[Iterable[str]],
+        interval_seconds: float,
+        max_buffer: int,
+    ):
+        self.loop = loop
+        self.instance_ids: Set[int] = set(instance_ids or ())
+        self.metric_types: Set[str] = set(metric_types or ())
+        self.interval_seconds = interval_seconds
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._points: "deque[StreamRow]" = deque(maxlen=max_buffer)
+        self._series: Dict[SeriesKey, _SeriesAccumulator] = {}
+        self._ready = asyncio.Event()
+
+    def accepts(self, instance_id: Optional[int], metric_type: str) -> bool:
+        return (
+            (not self.instance_ids or instance_id in self.instance_ids)
+            and (not self.metric_types or metric_type in self.metric_types)
+        )
+
+    def push(self, rows: Sequence[StreamRow]) -> None:
+        """Ajouter des lignes (appelé depuis n'importe quel thread)"""
+        added = 0
+        with self._lock:
+            for row in rows:
+                instance_id, metric_type, value, unit, timestamp = row
+                if not self.accepts(instance_id, metric_type):
+                    continue
+                added += 1
+                if self.interval_seconds > 0:
+                    series = self._series.get((instance_id, metric_type))
+                    if series is None:
+                        series = self._series[(instance_id, metric_type)] = _SeriesAccumulator(unit)
+                    series.add(value, timestamp)
+                else:
+                    if len(self._points) == self._points.maxlen:
+                        self.dropped += 1
+                        METRIC_STREAM_DROPPED.inc()
+                    self._points.append(row)
+        if added and self.interval_seconds <= 0:
+            self.loop.call_soon_threadsafe(self._ready.set)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Points accumulés depuis le dernier appel (moyennés par série si `interval` > 0)"""
+        with self._lock:
+            if self.interval_seconds > 0:
+                series, self._series = self._series, {}
+                return [
+                    {
+                        "instance_id": instance_id,
+                        "metric_type": metric_type,
+                        "value": accumulator.total / accumulator.count,
+                        "min": accumulator.minimum,
+                        "max": accumulator.maximum,
+                        "count": accumulator.count,
+                        "unit": accumulator.unit,
+                        "timestamp": accumulator.last_timestamp.isoformat(),
+                    }
+                    for (instance_id, metric_type), accumulator in series.items()
+                ]
+            points, self._points = list(self._points), deque(maxlen=self._points.maxlen)
+            self._ready.clear()
+        return [
+            {
+                "instance_id": instance_id,
+                "metric_type": metric_type,
+                "value": value,
+                "unit": unit,
+                "timestamp": timestamp.isoformat(),
+            }
+            for instance_id, metric_type, value, unit, timestamp in points
+        ]
+
+    async def wait(self, timeout: float) -> None:
+        """Attendre de nouveaux points (sans sous-échantillonnage) ou un intervalle"""
+        if self.interval_seconds > 0:
+            await asyncio.sleep(min(self.interval_seconds, timeout))
+            return
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class MetricStreamHub:
+    """Abonnés du processus au flux de métriques"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[MetricSubscription] = set()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(
+        self,
+        instance_ids: Optional[Iterable[int]] = None,
+        metric_types: Optional[Iterable[str]] = None,
+        interval_seconds: float = 0.0,
+    ) -> MetricSubscription:
+        """Abonner la connexion courante (à appeler depuis la boucle asyncio)"""
+        subscription = MetricSubscription(
+            asyncio.get_running_loop(),
+            instance_ids,
+            metric_types,
+            interval_seconds,
+            settings.METRICS_STREAM_MAX_BUFFER,
+        )
+        with self._lock:
+            self._subscribers.add(subscription)
+            METRIC_STREAM_SUBSCRIBERS.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: MetricSubscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+            METRIC_STREAM_SUBSCRIBERS.set(len(self._subscribers))
+
+    def publish(self, rows: Sequence[StreamRow]) -> None:
+        """Diffuser des lignes déjà validées (après le commit de leur écriture)"""
+        if not rows:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.push(rows)
+            except RuntimeError:
+                # Boucle fermée : connexion terminée sans désabonnement
+                self.unsubscribe(subscription)
+
+
+metric_stream = MetricStreamHub()
@@ -0,0 +1,70 @@
+"""
+Pagination par curseur (keyset) pour les listes triées par date décroissante
+
+Le curseur est opaque pour le client : il encode (date de tri, id) de la
+dernière ligne renvoyée. La page suivante est lue avec
+`(date, id) < (date_curseur, id_curseur)`, ce qui utilise l'index composite
+(date DESC, id DESC) quelle que soit la profondeur de la page. La colonne de
+tri doit être NOT NULL : une ligne sans date ne serait jamais atteinte par la
+comparaison et ne pourrait pas être encodée dans le curseur.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import desc, tuple_
+
+# En-tête portant le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Décoder un curseur ; 400 s'il est invalide"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur de pagination invalide"
+        )
+
+
+def keyset_paginate(query, sort_column, id_column, cursor: Optional[str], skip: int = 0):
+    """
+    Trier par (sort_column, id_column) décroissants et positionner la page
+
+    Avec un curseur, `skip` est ignoré ; sans curseur, l'ancien paramètre
+    `skip` reste appliqué (OFFSET) pour la compatibilité.
+    """
+    query = query.order_by(desc(sort_column), desc(id_column))
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        return query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    if skip:
+        return query.offset(skip)
+    return query
+
+
+def next_cursor(rows: Sequence, limit: int, sort_attr: str) -> Optional[str]:
+    """Curseur de la page suivante, ou None si la page n'est pas pleine"""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        return encode_cursor(getattr(last, sort_attr), last.id)
+    return None
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, sort_attr: str) -> Optional[str]:
+    """Ajouter l'en-tête X-Next-Cursor si la page est pleine"""
+    cursor = next_cursor(rows, limit, sort_attr)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
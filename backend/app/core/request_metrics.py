@@ -0,0 +1,162 @@
+"""
+Instrumentation des requêtes HTTP et des requêtes SQL qu'elles exécutent
+
+- RequestMetricsMiddleware (middleware ASGI) : durée de chaque requête par
+  route (modèle FastAPI, ex. /api/instances/{instance_id}), méthode et statut.
+  L'état de la requête en cours est porté par une ContextVar.
+- Hooks SQLAlchemy before/after_cursor_execute sur les moteurs : chaque
+  instruction exécutée pendant une requête HTTP y est comptée avec sa durée
+  (nombre d'instructions et temps passé en base par route).
+- En-tête Server-Timing (`app`, `db`) lisible dans les outils du navigateur.
+- N+1 : une même instruction SQL exécutée au moins
+  REQUEST_N_PLUS_ONE_THRESHOLD fois dans une requête est signalée (log et
+  compteur http_n_plus_one_total).
+
+Tout est exporté dans le registre de télémétrie (GET /metrics).
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP", ["method", "route", "status"]
+)
+REQUEST_DB_STATEMENTS = registry.histogram(
+    "http_request_db_statements",
+    "Instructions SQL exécutées par requête HTTP",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds", "Temps passé en base par requête HTTP", ["method", "route"]
+)
+N_PLUS_ONE = registry.counter(
+    "http_n_plus_one_total", "Requêtes HTTP répétant une même instruction SQL (N+1 probable)", ["method", "route"]
+)
+
+
+class RequestStats:
+    """Instructions SQL et temps en base de la requête HTTP en cours"""
+
+    __slots__ = ("scope", "statements", "db_seconds", "_counts")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self._counts: Counter = Counter()
+
+    @property
+    def route(self) -> str:
+        """Modèle de la route (connu une fois le routage effectué)"""
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        self._counts[statement] += 1
+
+    def most_repeated(self) -> Optional[Tuple[str, int]]:
+        """Instruction la plus répétée et son nombre d'exécutions"""
+        if not self._counts:
+            return None
+        return self._counts.most_common(1)[0]
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    """Statistiques de la requête HTTP en cours (None hors requête)"""
+    return _current_request.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Instructions séquentielles sur une connexion : un seul instant de départ
+    conn.info["statement_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("statement_started", None)
+    stats = _current_request.get()
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Compter les instructions SQL du moteur (synchrone, ou `.sync_engine` d'un moteur async)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware ASGI : durée, instructions SQL et temps en base par requête
+
+    Middleware ASGI pur (pas BaseHTTPMiddleware) : les réponses en flux ne
+    sont pas mises en mémoire et la ContextVar est visible des routes.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True, n_plus_one_threshold: int = 10):
+        self.app = app
+        self.server_timing = server_timing
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f"app;dur={elapsed_ms:.1f}, "
+                        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} SQL"'
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            self._observe(scope["method"], stats, status_code, time.perf_counter() - started)
+
+    def _observe(self, method: str, stats: RequestStats, status_code: int, duration: float) -> None:
+        route = stats.route
+        REQUEST_DURATION.observe(duration, method=method, route=route, status=str(status_code))
+        REQUEST_DB_STATEMENTS.observe(stats.statements, method=method, route=route)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, method=method, route=route)
+
+        repeated = stats.most_repeated()
+        if self.n_plus_one_threshold and repeated and repeated[1] >= self.n_plus_one_threshold:
+            statement, count = repeated
+            N_PLUS_ONE.inc(method=method, route=route)
+            logger.warning(
+                f"⚠️ N+1 probable sur {method} {route} : {count} exécutions de "
+                f"« {' '.join(statement.split())[:200]} »"
+            )
@@ -0,0 +1,142 @@
+"""
+Sérialisation rapide des lignes SQL vers les réponses JSON
+
+Les routes de lecture sélectionnent uniquement les colonnes du schéma de
+réponse (tuples Row, sans objets ORM ni suivi par la session) et construisent
+directement les dicts JSON : les valeurs stockées (statuts, types) sont déjà
+les valeurs des enums, seules les dates sont converties. La réponse est
+encodée par orjson et renvoyée telle quelle, sans seconde validation Pydantic
+par `response_model` (qui reste utilisé pour la documentation OpenAPI).
+
+Les listes volumineuses peuvent aussi être envoyées en flux (`stream_rows`) :
+les lignes sont lues par lots sur un curseur côté serveur et encodées au fil
+de l'eau, sans jamais charger tout le résultat en mémoire.
+"""
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Type
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import DateTime
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+try:
+    import orjson
+except ImportError:  # orjson absent : json standard
+    orjson = None
+
+# Formats des listes en flux : une ligne JSON par ligne, ou un tableau JSON
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def _default_response_class() -> Type[JSONResponse]:
+    """Classe de réponse JSON de l'application (JSON_RESPONSE_CLASS)"""
+    if settings.JSON_RESPONSE_CLASS == "orjson" and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+DefaultJSONResponse = _default_response_class()
+
+
+def dumps(content: Any) -> bytes:
+    """Encoder un contenu déjà compatible JSON (dicts, listes, str, nombres)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _isoformat(value: datetime) -> str:
+    # Même format que Pydantic : UTC noté "Z"
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+class RowSerializer:
+    """
+    Conversion des lignes d'un modèle vers le format d'un schéma de réponse
+
+    `columns` est la liste des colonnes à sélectionner, dans l'ordre des
+    champs du schéma ; `many` convertit les tuples Row ainsi obtenus. `one`
+    (une ligne ou un objet ORM, réponses unitaires) passe par la validation
+    du schéma, qui coerce les types sans modifier l'objet.
+    """
+
+    def __init__(self, model, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.columns = tuple(getattr(model, field) for field in self.fields)
+        self._datetime_indexes = tuple(
+            index for index, column in enumerate(self.columns) if isinstance(column.type, DateTime)
+        )
+
+    def many(self, rows: Iterable[Sequence]) -> List[Dict[str, Any]]:
+        """Tuples Row (colonnes `columns`) -> dicts JSON"""
+        fields = self.fields
+        datetime_indexes = self._datetime_indexes
+        items = []
+        for row in rows:
+            values = list(row)
+            for index in datetime_indexes:
+                value = values[index]
+                if value is not None:
+                    values[index] = _isoformat(value)
+            items.append(dict(zip(fields, values)))
+        return items
+
+    def one(self, row: Any) -> Dict[str, Any]:
+        """Objet ORM ou Row -> dict JSON, sans modifier l'objet"""
+        return self.schema.model_validate(row, from_attributes=True).model_dump(mode="json")
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> JSONResponse:
+    """
+    Réponse JSON (classe DefaultJSONResponse), avec les en-têtes déjà posés sur `response`
+
+    FastAPI ignore le paramètre `response` quand la route renvoie elle-même
+    une Response : ses en-têtes (ETag, X-Next-Cursor...) sont donc recopiés.
+    """
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return DefaultJSONResponse(content, status_code=status_code, headers=headers)
+
+
+async def _encoded_rows(query, serializer: RowSerializer, format: str, chunk_size: int) -> AsyncIterator[bytes]:
+    # Session propre au flux : elle vit aussi longtemps que l'envoi de la réponse
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=chunk_size))
+        first = True
+        if format == "json":
+            yield b"["
+        async for rows in result.partitions():
+            items = serializer.many(rows)
+            if format == "ndjson":
+                yield b"".join(dumps(item) + b"\n" for item in items)
+            else:
+                # Tableau encodé d'un bloc, sans ses crochets
+                chunk = dumps(items)[1:-1]
+                yield chunk if first else b"," + chunk
+                first = False
+        if format == "json":
+            yield b"]"
+
+
+def stream_rows(query, serializer: RowSerializer, format: str, chunk_size: Optional[int] = None) -> StreamingResponse:
+    """
+    Réponse en flux de toutes les lignes de `query` (colonnes `serializer.columns`)
+
+    Curseur côté serveur (yield_per) : au plus `chunk_size` lignes en mémoire,
+    quel que soit le nombre de lignes exportées.
+    """
+    return StreamingResponse(
+        _encoded_rows(query, serializer, format, chunk_size or settings.STREAM_CHUNK_SIZE),
+        media_type=STREAM_MEDIA_TYPES[format]
+    )
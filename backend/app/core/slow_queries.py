@@ -0,0 +1,138 @@
+"""
+Journal des requêtes SQL lentes (optionnel, SLOW_QUERY_LOG_ENABLED)
+
+Les hooks before/after_cursor_execute des moteurs mesurent chaque
+instruction ; celles qui dépassent SLOW_QUERY_THRESHOLD_MS sont conservées
+dans un tampon circulaire borné (les plus anciennes sont oubliées), avec la
+route HTTP d'origine (voir app/core/request_metrics.py). Consultation :
+GET /api/admin/slow-queries.
+
+Pour une fraction SLOW_QUERY_EXPLAIN_SAMPLE_RATE des SELECT lents, le plan
+est capturé aussitôt sur la même connexion et dans la même transaction
+(mêmes paramètres, mêmes données visibles) :
+- PostgreSQL : EXPLAIN (ANALYZE, BUFFERS), dans un savepoint ; la requête est
+  donc exécutée une seconde fois, d'où l'échantillonnage
+- SQLite : EXPLAIN QUERY PLAN
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.request_metrics import current_request
+from app.core.telemetry import registry
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total", "Instructions SQL au-delà du seuil du journal des requêtes lentes", ["route"]
+)
+
+# Seules les lectures sont expliquées (EXPLAIN ANALYZE exécute la requête)
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+MAX_PARAMETERS_LENGTH = 500
+
+
+def _is_read_only(statement: str) -> bool:
+    return bool(_READ_ONLY.match(statement)) and not _WRITES.search(statement)
+
+
+class SlowQueryLog:
+    """Tampon circulaire des instructions lentes"""
+
+    def __init__(self, threshold_ms: float, max_entries: int = 200, explain_sample_rate: float = 0.0):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self._lock = threading.Lock()
+        self._entries: "deque[Dict[str, Any]]" = deque(maxlen=max_entries)
+        self._rng = random.Random()
+        self.recorded = 0
+
+    def instrument(self, engine: Engine) -> None:
+        """Mesurer les instructions du moteur (synchrone, ou `.sync_engine` d'un moteur async)"""
+        if not event.contains(engine, "after_cursor_execute", self._after_cursor_execute):
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow_query_started"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("slow_query_started", None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        request = current_request()
+        route = request.route if request else None
+        entry = {
+            "occurred_at": datetime.now(timezone.utc),
+            "duration_ms": round(duration_ms, 2),
+            "statement": statement,
+            "parameters": None if parameters is None else repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            "executemany": executemany,
+            "method": request.scope.get("method") if request else None,
+            "route": route,
+            "plan": None,
+            "plan_error": None,
+        }
+        if (
+            not executemany
+            and self.explain_sample_rate > 0
+            and _is_read_only(statement)
+            and self._rng.random() < self.explain_sample_rate
+        ):
+            try:
+                entry["plan"] = self._explain(conn, statement, parameters)
+            except Exception as e:
+                entry["plan_error"] = str(e)
+
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        SLOW_QUERIES.inc(route=route or "<background>")
+        logger.warning(f"🐢 Requête lente ({duration_ms:.0f} ms) sur {route or 'tâche de fond'}: {' '.join(statement.split())[:200]}")
+
+    def _explain(self, conn, statement: str, parameters) -> str:
+        """Plan de l'instruction, sur la connexion DBAPI (hors événements SQLAlchemy)"""
+        cursor = conn.connection.cursor()
+        try:
+            if conn.dialect.name != "postgresql":
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+
+            # Savepoint : un échec de l'EXPLAIN ne doit pas annuler la transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        finally:
+            cursor.close()
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Instructions lentes, les plus récentes d'abord"""
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
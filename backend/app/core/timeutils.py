@@ -0,0 +1,13 @@
+"""
+Normalisation des dates reçues par l'API
+
+Les paramètres de requête peuvent être sans fuseau (considérés comme UTC) ou
+avec un décalage quelconque ; ils sont ramenés en UTC avant d'être comparés
+entre eux ou envoyés à la base.
+"""
+from datetime import datetime, timezone
+
+
+def as_utc(value: datetime) -> datetime:
+    """Datetime en UTC (sans fuseau : considéré comme déjà en UTC)"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
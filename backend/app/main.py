@@ -1,10 +1,50 @@
 """
 Point d'entrée principal de l'application FastAPI
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core.database import db_monitor
+from app.core.deployment_jobs import deployment_job_pool
+from app.core.events import event_bus
+from app.core.host_metrics import host_metrics
+from app.core.metric_buffer import metric_buffer
+from app.core.metric_partitions import partition_worker
+from app.core.metric_rollup import rollup_worker
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.core.serialization import DefaultJSONResponse
+from app.core.telemetry import CONTENT_TYPE, registry
 from app.api.v1 import api_router
+from app.api.v1.events import websocket_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrer et arrêter les tâches d'arrière-plan avec l'application"""
+    if settings.DB_LIVENESS_ENABLED:
+        db_monitor.start()
+    event_bus.start()
+    if settings.METRICS_PARTITION_MAINTENANCE_ENABLED:
+        partition_worker.start()
+    if settings.METRICS_ROLLUP_ENABLED:
+        rollup_worker.start()
+    if settings.DEPLOYMENT_JOBS_ENABLED:
+        deployment_job_pool.start()
+    metric_buffer.start()
+    if settings.HOST_METRICS_ENABLED:
+        host_metrics.start()
+    yield
+    host_metrics.stop()
+    # Après les producteurs : écrire les métriques encore en attente
+    metric_buffer.stop()
+    deployment_job_pool.stop()
+    rollup_worker.stop()
+    partition_worker.stop()
+    event_bus.stop()
+    db_monitor.stop()
+
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -13,6 +53,9 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    lifespan=lifespan,
+    # orjson par défaut (JSON_RESPONSE_CLASS)
+    default_response_class=DefaultJSONResponse,
 )
 
 # Configuration CORS
@@ -29,8 +72,18 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Durée, instructions SQL et temps en base par route (GET /metrics, Server-Timing)
+if settings.REQUEST_METRICS_ENABLED:
+    app.add_middleware(
+        RequestMetricsMiddleware,
+        server_timing=settings.REQUEST_SERVER_TIMING,
+        n_plus_one_threshold=settings.REQUEST_N_PLUS_ONE_THRESHOLD,
+    )
+
 # Inclure les routes API
 app.include_router(api_router, prefix="/api")
+# WebSocket hors préfixe /api (nginx proxifie /ws)
+app.include_router(websocket_router)
 
 
 # Endpoint racine
@@ -48,3 +101,10 @@ async def root():
 async def health_check():
     """Vérification de santé de l'API"""
     return {"status": "healthy", "service": "cloud-api"}
+
+
+# Endpoint de télémétrie (format texte Prometheus)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Compteurs du processus : pools de connexions, disponibilité de la base..."""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
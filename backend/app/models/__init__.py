@@ -2,5 +2,23 @@
 from app.models.cloud_instance import CloudInstance
 from app.models.monitoring_metric import MonitoringMetric
 from app.models.deployment_history import DeploymentHistory
+from app.models.deployment_job import DeploymentJob
+from app.models.instance_status_event import InstanceStatusEvent
+from app.models.metric_rollup import (
+    MetricRollup1m,
+    MetricRollup1h,
+    MetricRollup1d,
+    MetricRollupState
+)
 
-__all__ = ["CloudInstance", "MonitoringMetric", "DeploymentHistory"]
+__all__ = [
+    "CloudInstance",
+    "MonitoringMetric",
+    "DeploymentHistory",
+    "DeploymentJob",
+    "InstanceStatusEvent",
+    "MetricRollup1m",
+    "MetricRollup1h",
+    "MetricRollup1d",
+    "MetricRollupState",
+]
@@ -1,7 +1,7 @@
 """
 Modèle pour les instances cloud (VM, conteneurs)
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Enum, Index
 from sqlalchemy.sql import func
 import enum
 from app.core.database import Base
@@ -39,10 +39,31 @@ class CloudInstance(Base):
     storage_gb = Column(Float, default=10.0)
     cost_per_hour = Column(Float, default=0.0)
     ip_address = Column(String(50), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Clé de la pagination par curseur : jamais NULL
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     is_active = Column(Boolean, default=True)
     
     def __repr__(self):
         return f"<CloudInstance(id={self.id}, name='{self.name}', type='{self.instance_type}')>"
 
+
+ACTIVE_NAME_INDEX = "uq_cloud_instances_active_name"
+
+# Unicité du nom parmi les instances actives (les instances supprimées libèrent leur nom)
+Index(
+    ACTIVE_NAME_INDEX,
+    CloudInstance.name,
+    unique=True,
+    postgresql_where=CloudInstance.is_active,
+    sqlite_where=CloudInstance.is_active,
+)
+
+
+# Pagination par curseur des instances actives (created_at DESC, id DESC)
+Index(
+    "idx_cloud_instances_active_created",
+    CloudInstance.created_at.desc(),
+    CloudInstance.id.desc(),
+    postgresql_where=CloudInstance.is_active,
+)
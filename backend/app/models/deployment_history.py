@@ -1,7 +1,7 @@
 """
 Modèle pour l'historique des déploiements
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Index
 from sqlalchemy.sql import func
 import enum
 from app.core.database import Base
@@ -30,10 +30,20 @@ class DeploymentHistory(Base):
     instance_count = Column(Integer, default=1)
     configuration = Column(Text, nullable=True)  # JSON string
     error_message = Column(Text, nullable=True)
-    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Clé de la pagination par curseur : jamais NULL
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     duration_seconds = Column(Integer, nullable=True)
+    # Version de la ligne (ETag des réponses)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     def __repr__(self):
         return f"<DeploymentHistory(id={self.id}, name='{self.deployment_name}', status='{self.status}')>"
 
+
+# Pagination par curseur des déploiements (started_at DESC, id DESC)
+Index(
+    "idx_deployment_history_started_id",
+    DeploymentHistory.started_at.desc(),
+    DeploymentHistory.id.desc(),
+)
@@ -0,0 +1,63 @@
+"""
+Modèle pour la file des tâches de déploiement
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from sqlalchemy.sql import func
+import enum
+from app.core.database import Base
+
+
+class DeploymentJobStatus(str, enum.Enum):
+    """Statuts des tâches de déploiement"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class DeploymentJob(Base):
+    """Tâche de déploiement, réservée par un worker avec SELECT ... FOR UPDATE SKIP LOCKED"""
+    __tablename__ = "deployment_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    deployment_id = Column(
+        Integer,
+        ForeignKey("deployment_history.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    status = Column(String(20), nullable=False, default=DeploymentJobStatus.QUEUED.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # Pas exécutée avant cette date (backoff entre deux tentatives)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DeploymentJob(id={self.id}, deployment_id={self.deployment_id}, status='{self.status}')>"
+
+
+# Au plus une tâche active par déploiement
+ACTIVE_JOB_STATUSES = (DeploymentJobStatus.QUEUED.value, DeploymentJobStatus.RUNNING.value)
+ACTIVE_JOB_INDEX = "uq_deployment_jobs_active"
+
+Index(
+    ACTIVE_JOB_INDEX,
+    DeploymentJob.deployment_id,
+    unique=True,
+    postgresql_where=DeploymentJob.status.in_(ACTIVE_JOB_STATUSES),
+    sqlite_where=DeploymentJob.status.in_(ACTIVE_JOB_STATUSES),
+)
+
+
+# Réservation des tâches prêtes (status = 'queued', par run_after)
+Index(
+    "idx_deployment_jobs_queued",
+    DeploymentJob.run_after,
+    DeploymentJob.id,
+    postgresql_where=DeploymentJob.status == DeploymentJobStatus.QUEUED.value,
+)
@@ -0,0 +1,40 @@
+"""
+Modèle pour l'historique des changements de statut des instances (coûts)
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class InstanceStatusEvent(Base):
+    """
+    Transition de statut d'une instance (table en ajout seul)
+
+    Le coût horaire est copié à chaque événement : un changement de tarif est
+    enregistré comme un nouvel événement et ne modifie pas le passé.
+    """
+    __tablename__ = "instance_status_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    instance_id = Column(
+        Integer,
+        ForeignKey("cloud_instances.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    status = Column(String(20), nullable=False)
+    cost_per_hour = Column(Float, nullable=False, default=0.0)
+    occurred_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<InstanceStatusEvent(instance_id={self.instance_id}, status='{self.status}', at={self.occurred_at})>"
+
+
+# Intervalles d'une instance dans l'ordre (LEAD ... PARTITION BY instance_id)
+Index(
+    "idx_instance_status_events_instance_time",
+    InstanceStatusEvent.instance_id,
+    InstanceStatusEvent.occurred_at,
+)
+
+# Événements d'une période [start, end) (rapport de coûts)
+Index("idx_instance_status_events_time", InstanceStatusEvent.occurred_at)
@@ -0,0 +1,66 @@
+"""
+Modèles pour les agrégats pré-calculés des métriques (rollups 1m, 1h, 1d)
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime
+from app.core.database import Base
+
+
+class MetricRollupMixin:
+    """Colonnes communes aux tables de rollup"""
+    metric_type = Column(String(50), primary_key=True)
+    # 0 pour les métriques sans instance (la colonne fait partie de la clé primaire)
+    instance_id = Column(Integer, primary_key=True, default=0)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(BigInteger, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    # Majorant du p95 : max des p95 des lots compactés (exposé comme p95_upper_bound)
+    p95 = Column(Float, nullable=True)
+
+
+class MetricRollup1m(MetricRollupMixin, Base):
+    """Agrégats des métriques par minute"""
+    __tablename__ = "metric_rollups_1m"
+
+
+class MetricRollup1h(MetricRollupMixin, Base):
+    """Agrégats des métriques par heure"""
+    __tablename__ = "metric_rollups_1h"
+
+
+class MetricRollup1d(MetricRollupMixin, Base):
+    """Agrégats des métriques par jour"""
+    __tablename__ = "metric_rollups_1d"
+
+
+class MetricRollupState(Base):
+    """Filigrane de la compaction incrémentale des métriques"""
+    __tablename__ = "metric_rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    # Dernier id de monitoring_metrics intégré aux rollups
+    last_metric_id = Column(BigInteger, nullable=False, default=0)
+    # Max(id) observé à une passe précédente, en attente d'intégration
+    pending_metric_id = Column(BigInteger, nullable=False, default=0)
+    pending_observed_at = Column(DateTime(timezone=True), nullable=True)
+    # xmax de l'instantané d'observation : pending_metric_id est intégré quand
+    # toutes les transactions d'xid inférieur sont terminées
+    pending_xmax = Column(BigInteger, nullable=False, default=0)
+    # Les rollups contiennent toutes les métriques d'horodatage antérieur à cette date
+    covered_until = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<MetricRollupState(name='{self.name}', last_metric_id={self.last_metric_id})>"
+
+
+# Table de rollup par granularité
+ROLLUP_MODELS = {
+    "1m": MetricRollup1m,
+    "1h": MetricRollup1h,
+    "1d": MetricRollup1d,
+}
+
+# Nom de la ligne de filigrane dans metric_rollup_state
+ROLLUP_STATE_NAME = "monitoring_metrics"
@@ -1,7 +1,7 @@
 """
 Modèle pour les métriques de monitoring
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -10,13 +10,18 @@ from app.core.database import Base
 class MonitoringMetric(Base):
     """Modèle SQLAlchemy pour les métriques de monitoring"""
     __tablename__ = "monitoring_metrics"
+    # Table partitionnée par plage de temps (voir app/core/metric_partitions.py) :
+    # la clé primaire doit inclure la clé de partitionnement
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
     
-    id = Column(Integer, primary_key=True, index=True)
+    # BIGINT : au rythme de l'ingestion en lot, int4 (2^31 ids) s'épuiserait,
+    # la rétention ne libérant aucun id
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     instance_id = Column(Integer, ForeignKey("cloud_instances.id"), nullable=True)
     metric_type = Column(String(50), nullable=False)  # cpu, memory, network, storage
     value = Column(Float, nullable=False)
     unit = Column(String(20), default="percent")  # percent, bytes, mbps
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
     
     # Relation optionnelle avec CloudInstance
     instance = relationship("CloudInstance", backref="metrics")
@@ -24,3 +29,10 @@ class MonitoringMetric(Base):
     def __repr__(self):
         return f"<MonitoringMetric(id={self.id}, type='{self.metric_type}', value={self.value})>"
 
+
+# Pagination par curseur des métriques (timestamp DESC, id DESC), créé sur chaque partition
+Index(
+    "idx_monitoring_metrics_timestamp_id",
+    MonitoringMetric.timestamp.desc(),
+    MonitoringMetric.id.desc(),
+)
@@ -2,19 +2,55 @@
 from app.schemas.cloud_instance import (
     CloudInstanceCreate,
     CloudInstanceUpdate,
-    CloudInstanceResponse
+    CloudInstanceResponse,
+    CloudInstanceBatchCreate,
+    CloudInstanceBatchAction,
+    CloudInstanceBatchItem,
+    CloudInstanceBatchResponse,
+    InstanceSummaryGroup,
+    CloudInstanceSummary
+)
+from app.schemas.monitoring_metric import (
+    MonitoringMetricCreate,
+    MonitoringMetricResponse,
+    MetricBatchRejection,
+    MetricBatchResponse,
+    MetricAggregateBucket,
+    MetricAggregateResponse
+)
+from app.schemas.instance_cost import (
+    InstanceCostItem,
+    InstanceCostReport
 )
-from app.schemas.monitoring_metric import MonitoringMetricResponse
 from app.schemas.deployment_history import (
     DeploymentCreate,
     DeploymentResponse
 )
+from app.schemas.slow_query import (
+    SlowQueryEntry,
+    SlowQueryReport
+)
 
 __all__ = [
     "CloudInstanceCreate",
     "CloudInstanceUpdate",
     "CloudInstanceResponse",
+    "CloudInstanceBatchCreate",
+    "CloudInstanceBatchAction",
+    "CloudInstanceBatchItem",
+    "CloudInstanceBatchResponse",
+    "InstanceSummaryGroup",
+    "CloudInstanceSummary",
+    "MonitoringMetricCreate",
     "MonitoringMetricResponse",
+    "MetricBatchRejection",
+    "MetricBatchResponse",
+    "MetricAggregateBucket",
+    "MetricAggregateResponse",
+    "InstanceCostItem",
+    "InstanceCostReport",
     "DeploymentCreate",
     "DeploymentResponse",
+    "SlowQueryEntry",
+    "SlowQueryReport",
 ]
@@ -2,8 +2,9 @@
 Schémas Pydantic pour CloudInstance
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from app.core.config import settings
 from app.models.cloud_instance import InstanceType, InstanceStatus
 
 
@@ -48,3 +49,52 @@ class CloudInstanceResponse(CloudInstanceBase):
     class Config:
         from_attributes = True
 
+
+class CloudInstanceBatchCreate(BaseModel):
+    """Schéma pour créer plusieurs instances en une requête"""
+    instances: List[CloudInstanceCreate] = Field(..., min_length=1, max_length=settings.INSTANCE_BATCH_MAX_ITEMS)
+
+
+class CloudInstanceBatchAction(BaseModel):
+    """Schéma pour démarrer, arrêter ou supprimer plusieurs instances"""
+    ids: List[int] = Field(..., min_length=1, max_length=settings.INSTANCE_BATCH_MAX_ITEMS)
+
+
+class CloudInstanceBatchItem(BaseModel):
+    """Résultat d'une opération groupée pour un élément de la requête"""
+    index: int
+    id: Optional[int] = None
+    name: Optional[str] = None
+    success: bool
+    status: Optional[InstanceStatus] = None
+    error: Optional[str] = None
+
+
+class CloudInstanceBatchResponse(BaseModel):
+    """Réponse d'une opération groupée (résultat par élément, dans l'ordre de la requête)"""
+    requested: int
+    succeeded: int
+    failed: int
+    results: List[CloudInstanceBatchItem]
+
+
+class InstanceSummaryGroup(BaseModel):
+    """Totaux d'un regroupement (dimensions absentes = toutes valeurs confondues)"""
+    provider: Optional[str] = None
+    region: Optional[str] = None
+    status: Optional[str] = None
+    instances: int
+    cpu_cores: int
+    memory_gb: float
+    storage_gb: float
+    cost_per_hour: float
+
+
+class CloudInstanceSummary(BaseModel):
+    """Synthèse de la flotte par fournisseur, région et statut"""
+    total: InstanceSummaryGroup
+    by_provider: List[InstanceSummaryGroup]
+    by_provider_region: List[InstanceSummaryGroup]
+    by_provider_region_status: List[InstanceSummaryGroup]
+    by_status: List[InstanceSummaryGroup]
+    generated_at: datetime
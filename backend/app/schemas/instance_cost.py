@@ -0,0 +1,30 @@
+"""
+Schémas Pydantic pour les rapports de coûts des instances
+"""
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from datetime import datetime
+
+
+class InstanceCostItem(BaseModel):
+    """Coût d'un groupe (instance, fournisseur ou région) sur la période"""
+    instance_id: Optional[int] = None
+    name: Optional[str] = None
+    provider: Optional[str] = None
+    region: Optional[str] = None
+    running_hours: float
+    cost: float
+    projected_cost: float
+
+
+class InstanceCostReport(BaseModel):
+    """Rapport de coûts : accumulé jusqu'à maintenant et projeté jusqu'à `end`"""
+    start: datetime
+    end: datetime
+    group_by: Literal["instance", "provider", "region"]
+    running_hours: float
+    total_cost: float
+    projected_total_cost: float
+    groups: int
+    items: List[InstanceCostItem]
+    generated_at: datetime
@@ -2,10 +2,19 @@
 Schémas Pydantic pour MonitoringMetric
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
+class MonitoringMetricCreate(BaseModel):
+    """Schéma pour ingérer une métrique (ingestion en lot)"""
+    instance_id: Optional[int] = Field(None, ge=1)
+    metric_type: str = Field(..., min_length=1, max_length=50)
+    value: float = Field(..., allow_inf_nan=False)
+    unit: str = Field(default="percent", min_length=1, max_length=20)
+    timestamp: Optional[datetime] = None
+
+
 class MonitoringMetricResponse(BaseModel):
     """Schéma de réponse pour MonitoringMetric"""
     id: int
@@ -14,7 +23,44 @@ class MonitoringMetricResponse(BaseModel):
     value: float
     unit: str
     timestamp: datetime
-    
+
     class Config:
         from_attributes = True
 
+
+class MetricBatchRejection(BaseModel):
+    """Ligne rejetée lors d'une ingestion en lot"""
+    index: int
+    error: str
+
+
+class MetricBatchResponse(BaseModel):
+    """Résultat d'une ingestion en lot"""
+    received: int
+    accepted: int
+    rejected: int
+    rejections: List[MetricBatchRejection] = []
+    duration_ms: float
+    rows_per_second: float
+
+
+class MetricAggregateBucket(BaseModel):
+    """Agrégats d'une métrique sur un intervalle de temps"""
+    bucket: datetime
+    count: int
+    min: float
+    max: float
+    avg: float
+    p95: Optional[float] = None  # Exact (données brutes) ; vide pour les intervalles lus dans un rollup
+    p95_upper_bound: Optional[float] = None  # Majorant du p95 (égal au p95 sur les données brutes)
+
+
+class MetricAggregateResponse(BaseModel):
+    """Série agrégée par intervalles de temps"""
+    metric_type: str
+    instance_id: Optional[int] = None
+    bucket_width: str
+    source: str = "raw"  # raw, rollup_1m, rollup_1h, rollup_1d (+raw pour les bords et la fin de plage)
+    start: datetime
+    end: datetime
+    buckets: List[MetricAggregateBucket] = []
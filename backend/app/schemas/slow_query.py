@@ -0,0 +1,28 @@
+"""
+Schémas Pydantic pour le journal des requêtes SQL lentes
+"""
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+
+class SlowQueryEntry(BaseModel):
+    """Instruction SQL ayant dépassé le seuil, avec sa route d'origine"""
+    occurred_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: Optional[str] = None
+    executemany: bool = False
+    method: Optional[str] = None
+    route: Optional[str] = None  # None : tâche de fond (workers, rollups...)
+    plan: Optional[str] = None  # EXPLAIN (ANALYZE, BUFFERS) si échantillonnée
+    plan_error: Optional[str] = None
+
+
+class SlowQueryReport(BaseModel):
+    """Contenu du tampon des requêtes lentes"""
+    enabled: bool
+    threshold_ms: float
+    explain_sample_rate: float
+    recorded: int  # Depuis le démarrage, y compris les entrées oubliées
+    items: List[SlowQueryEntry]
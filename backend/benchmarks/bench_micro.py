@@ -0,0 +1,95 @@
+"""
+Micro-benchmarks des chemins chauds de l'API (CPU uniquement, sans base)
+
+Validation de l'ingestion, sérialisation des listes, curseurs, cache mémoire,
+sous-échantillonnage du flux de métriques et export CSV. Lancer depuis
+backend/ (voir benchmarks/pytest.ini) :
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks --benchmark-json=benchmarks/results/micro.json
+    pytest benchmarks --benchmark-compare=<run précédent>   # avec --benchmark-autosave
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+from app.api.v1.instances import instance_serializer
+from app.core.cache import MemoryCacheBackend
+from app.core.metric_export import MetricExportWriter
+from app.core.metric_ingest import validate_metrics
+from app.core.metric_stream import MetricSubscription
+from app.core.pagination import decode_cursor, encode_cursor
+from benchmarks.serialization import sample_rows
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def instance_rows():
+    return sample_rows(1_000)
+
+
+@pytest.fixture(scope="module")
+def metric_items():
+    return [
+        {"instance_id": index % 100 + 1, "metric_type": "cpu", "value": index % 100, "timestamp": NOW.isoformat()}
+        for index in range(10_000)
+    ]
+
+
+@pytest.fixture(scope="module")
+def metric_rows():
+    return [
+        (index, index % 100 + 1, "cpu", float(index % 100), "percent", NOW + timedelta(seconds=index))
+        for index in range(10_000)
+    ]
+
+
+def bench_validate_metrics(benchmark, metric_items):
+    rows, rejected = benchmark(validate_metrics, metric_items)
+    assert len(rows) == len(metric_items) and not rejected
+
+
+def bench_serialize_instance_list(benchmark, instance_rows):
+    body = benchmark(lambda: orjson.dumps(instance_serializer.many(instance_rows)))
+    assert body.startswith(b"[{")
+
+
+def bench_cursor_roundtrip(benchmark):
+    assert benchmark(lambda: decode_cursor(encode_cursor(NOW, 42))) == (NOW, 42)
+
+
+def bench_memory_cache(benchmark):
+    cache = MemoryCacheBackend(max_entries=10_000)
+    keys = [f"instances:list:{index}" for index in range(1_000)]
+
+    def get_set():
+        for key in keys:
+            if cache.get(key) is None:
+                cache.set(key, {"items": []}, ttl=60)
+
+    benchmark(get_set)
+
+
+def bench_metric_stream_downsampling(benchmark, metric_rows):
+    loop = asyncio.new_event_loop()
+    subscription = MetricSubscription(loop, None, ["cpu"], interval_seconds=1.0, max_buffer=1_000)
+    points = [row[1:] for row in metric_rows]
+
+    def push_drain():
+        subscription.push(points)
+        return subscription.drain()
+
+    try:
+        assert len(benchmark(push_drain)) == 100
+    finally:
+        loop.close()
+
+
+def bench_export_csv(benchmark, metric_rows):
+    def export():
+        writer = MetricExportWriter("csv")
+        return writer.write(metric_rows) + writer.close()
+
+    assert benchmark(export)
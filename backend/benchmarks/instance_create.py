@@ -0,0 +1,161 @@
+"""
+Test de charge de la création d'instances (POST /api/instances)
+
+Deux phases contre une API démarrée :
+- débit : `--count` créations de noms distincts avec `--concurrency`
+  requêtes simultanées (latences p50/p95/p99, requêtes/s)
+- course : `--race` créations simultanées du même nom ; exactement une doit
+  réussir (201), les autres doivent être refusées (400), sans erreur 5xx
+
+Les instances créées sont ensuite supprimées (POST /api/instances/batch/delete),
+sauf avec --keep. Code de sortie 1 si la phase de course échoue.
+
+Pour mesurer le gain, lancer le script sur la version précédente de l'API puis
+sur la version courante avec les mêmes paramètres, et comparer les résultats.
+
+Usage (depuis backend/) :
+    python -m benchmarks.instance_create --url http://localhost:8000 --count 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+BATCH_DELETE_SIZE = 500
+
+
+def _instance(name: str) -> dict:
+    return {"name": name, "instance_type": "vm", "provider": "aws", "region": "us-east-1"}
+
+
+def percentile(values: List[float], rank: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(rank / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _create(client: httpx.AsyncClient, name: str, latencies: List[float], statuses: Counter, ids: List[int]):
+    started = time.perf_counter()
+    response = await client.post("/api/instances", json=_instance(name))
+    latencies.append((time.perf_counter() - started) * 1000)
+    statuses[response.status_code] += 1
+    if response.status_code == 201:
+        ids.append(response.json()["id"])
+
+
+async def throughput_phase(client: httpx.AsyncClient, prefix: str, count: int, concurrency: int, ids: List[int]) -> Dict:
+    """Créations de noms distincts, `concurrency` requêtes en vol"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def worker(index: int):
+        async with semaphore:
+            await _create(client, f"{prefix}-{index}", latencies, statuses, ids)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(count)))
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "requests_per_second": round(count / duration, 1) if duration > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+        "statuses": dict(statuses),
+    }
+
+
+async def race_phase(client: httpx.AsyncClient, prefix: str, attempts: int, ids: List[int]) -> Dict:
+    """Créations simultanées du même nom : une seule doit aboutir"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    name = f"{prefix}-race"
+    await asyncio.gather(*(_create(client, name, latencies, statuses, ids) for _ in range(attempts)))
+
+    created = statuses.get(201, 0)
+    server_errors = sum(count for status, count in statuses.items() if status >= 500)
+    return {
+        "attempts": attempts,
+        "created": created,
+        "rejected": statuses.get(400, 0),
+        "server_errors": server_errors,
+        "statuses": dict(statuses),
+        "passed": created == 1 and server_errors == 0,
+    }
+
+
+async def cleanup(client: httpx.AsyncClient, ids: List[int]) -> None:
+    for offset in range(0, len(ids), BATCH_DELETE_SIZE):
+        await client.post("/api/instances/batch/delete", json={"ids": ids[offset:offset + BATCH_DELETE_SIZE]})
+
+
+async def run(
+    client: httpx.AsyncClient,
+    count: int = 200,
+    concurrency: int = 20,
+    race: int = 20,
+    keep: bool = False,
+    prefix: Optional[str] = None,
+) -> Dict:
+    """Exécuter les deux phases avec un client httpx déjà configuré"""
+    prefix = prefix or f"bench-{uuid.uuid4().hex[:8]}"
+    ids: List[int] = []
+    try:
+        results = {
+            "throughput": await throughput_phase(client, prefix, count, concurrency, ids),
+            "race": await race_phase(client, prefix, race, ids),
+        }
+    finally:
+        if not keep:
+            await cleanup(client, ids)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge de POST /api/instances")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL de base de l'API")
+    parser.add_argument("--count", type=int, default=200, help="Créations de la phase de débit")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requêtes simultanées (phase de débit)")
+    parser.add_argument("--race", type=int, default=20, help="Créations simultanées du même nom")
+    parser.add_argument("--keep", action="store_true", help="Ne pas supprimer les instances créées")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args(argv)
+
+    async def execute():
+        limits = httpx.Limits(max_connections=max(args.concurrency, args.race))
+        async with httpx.AsyncClient(base_url=args.url, timeout=60.0, limits=limits) as client:
+            return await run(client, args.count, args.concurrency, args.race, args.keep)
+
+    results = asyncio.run(execute())
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            f.write(output)
+
+    race_result = results["race"]
+    if race_result["passed"]:
+        print(f"✅ Course : 1 création sur {race_result['attempts']} tentatives simultanées")
+        return 0
+    print(f"❌ Course : {race_result['created']} créations, {race_result['server_errors']} erreurs 5xx")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Générateur de charge de l'API : latences p50/p95/p99 et débit par endpoint
+
+Chaque scénario (liste, détail, synthèse, coûts, métriques, création...) est
+joué `--requests` fois avec `--concurrency` requêtes simultanées, l'un après
+l'autre. Deux modes :
+- en processus (par défaut) : client httpx sur l'application ASGI, sans
+  réseau ni uvicorn ; la base est celle de `--database-url` (ou DATABASE_URL)
+- `--url` : contre une API déjà démarrée (uvicorn local, conteneur...)
+
+Avec `--seed`, un jeu de données réaliste est inséré d'abord (voir
+benchmarks/seed.py). Les résultats sont écrits en JSON (`--json`) ; avec
+`--baseline`, chaque endpoint est comparé à un résultat précédent et les
+régressions de p95 ou de débit au-delà de `--tolerance` % sont signalées
+(code de sortie 1).
+
+Usage (depuis backend/) :
+    python -m benchmarks.loadgen --database-url sqlite:///bench.sqlite --seed --json results/sqlite.json
+    python -m benchmarks.loadgen --url http://localhost:8000 --baseline results/v1.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.instance_create import percentile
+
+# (nom, méthode, chemin, corps, PostgreSQL uniquement)
+Scenario = Tuple[str, str, Callable[["LoadContext"], str], Optional[Callable[["LoadContext"], dict]], bool]
+
+SCENARIOS: List[Scenario] = [
+    ("instances.list", "GET", lambda ctx: "/api/instances?limit=100", None, False),
+    ("instances.detail", "GET", lambda ctx: f"/api/instances/{ctx.pick(ctx.instance_ids)}", None, False),
+    ("instances.summary", "GET", lambda ctx: "/api/instances/summary", None, False),
+    ("instances.costs", "GET", lambda ctx: "/api/instances/costs?limit=100", None, False),
+    ("deployments.list", "GET", lambda ctx: "/api/deployments?limit=100", None, False),
+    ("deployments.detail", "GET", lambda ctx: f"/api/deployments/{ctx.pick(ctx.deployment_ids)}", None, False),
+    ("metrics.list", "GET", lambda ctx: f"/api/metrics?limit=1000&instance_id={ctx.pick(ctx.instance_ids)}", None, False),
+    ("metrics.aggregate", "GET", lambda ctx: "/api/metrics/aggregate?metric_type=cpu&bucket=1h", None, True),
+    ("instances.create", "POST", lambda ctx: "/api/instances", lambda ctx: ctx.new_instance(), False),
+]
+
+
+class LoadContext:
+    """Ids existants et noms uniques utilisés pour construire les requêtes"""
+
+    def __init__(self, instance_ids: List[int], deployment_ids: List[int], random_seed: int = 42):
+        self.instance_ids = instance_ids or [0]
+        self.deployment_ids = deployment_ids or [0]
+        self.created_ids: List[int] = []
+        self.prefix = f"load-{uuid.uuid4().hex[:8]}"
+        self._rng = random.Random(random_seed)
+        self._counter = 0
+
+    def pick(self, values: List[int]) -> int:
+        return self._rng.choice(values)
+
+    def new_instance(self) -> dict:
+        self._counter += 1
+        return {"name": f"{self.prefix}-{self._counter}", "instance_type": "vm", "provider": "aws", "region": "us-east-1"}
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50": round(percentile(latencies, 50), 2),
+        "p95": round(percentile(latencies, 95), 2),
+        "p99": round(percentile(latencies, 99), 2),
+        "max": round(max(latencies), 2) if latencies else 0.0,
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, ctx: LoadContext, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """Jouer un scénario : `requests` requêtes, `concurrency` en vol"""
+    name, method, path, body, _ = scenario
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one():
+        async with semaphore:
+            kwargs = {"json": body(ctx)} if body else {}
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path(ctx), **kwargs)
+            except httpx.HTTPError:
+                statuses["error"] += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] += 1
+            if method == "POST" and response.status_code == 201:
+                ctx.created_ids.append(response.json()["id"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    duration = time.perf_counter() - started
+    failed = sum(count for status, count in statuses.items() if status == "error" or int(status) >= 400)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "requests_per_second": round(requests / duration, 1) if duration > 0 else 0.0,
+        "latency_ms": latency_summary(latencies),
+        "statuses": dict(statuses),
+        "failed": failed,
+    }
+
+
+async def _existing_ids(client: httpx.AsyncClient, path: str) -> List[int]:
+    response = await client.get(path, params={"limit": 500})
+    return [item["id"] for item in response.json()] if response.status_code == 200 else []
+
+
+async def run(
+    client: httpx.AsyncClient,
+    dialect: str,
+    requests: int = 200,
+    concurrency: int = 20,
+    only: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Jouer tous les scénarios compatibles avec la base ; renvoie les résultats par endpoint"""
+    ctx = LoadContext(await _existing_ids(client, "/api/instances"), await _existing_ids(client, "/api/deployments"))
+    results = {}
+    try:
+        for scenario in SCENARIOS:
+            name, _, _, _, postgres_only = scenario
+            if only and name not in only:
+                continue
+            if postgres_only and dialect != "postgresql":
+                continue
+            results[name] = await run_scenario(client, scenario, ctx, requests, concurrency)
+            latency = results[name]["latency_ms"]
+            print(
+                f"⏱️ {name:<20} {results[name]['requests_per_second']:>8} req/s  "
+                f"p50 {latency['p50']:>8} ms  p95 {latency['p95']:>8} ms  p99 {latency['p99']:>8} ms"
+            )
+    finally:
+        # Instances créées par le scénario de création
+        for offset in range(0, len(ctx.created_ids), 500):
+            await client.post("/api/instances/batch/delete", json={"ids": ctx.created_ids[offset:offset + 500]})
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Régressions (p95 plus lent ou débit plus faible de plus de `tolerance` %)"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        p95_before, p95_after = previous["latency_ms"]["p95"], current["latency_ms"]["p95"]
+        rps_before, rps_after = previous["requests_per_second"], current["requests_per_second"]
+        if p95_before and (p95_after - p95_before) / p95_before * 100 > tolerance:
+            regressions.append(f"{name}: p95 {p95_before} -> {p95_after} ms")
+        if rps_before and (rps_before - rps_after) / rps_before * 100 > tolerance:
+            regressions.append(f"{name}: débit {rps_before} -> {rps_after} req/s")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Charge et latences par endpoint de l'API")
+    parser.add_argument("--url", help="API déjà démarrée (sinon application ASGI en processus)")
+    parser.add_argument("--database-url", help="Base utilisée en processus (défaut: DATABASE_URL)")
+    parser.add_argument("--seed", action="store_true", help="Insérer un jeu de données avant la charge (en processus)")
+    parser.add_argument("--instances", type=int, default=1_000, help="Instances insérées par --seed")
+    parser.add_argument("--deployments", type=int, default=5_000, help="Déploiements insérés par --seed")
+    parser.add_argument("--metrics", type=int, default=200_000, help="Métriques insérées par --seed")
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes par endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requêtes simultanées")
+    parser.add_argument("--only", nargs="*", help="Scénarios à jouer (ex. instances.list metrics.list)")
+    parser.add_argument("--no-cache", action="store_true", help="Désactiver le cache de lecture (en processus)")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans ce fichier JSON")
+    parser.add_argument("--baseline", help="Résultats JSON précédents à comparer")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Écart toléré avant régression (%%)")
+    args = parser.parse_args(argv)
+
+    # Configuration lue à l'import de l'application : à fixer avant
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    if args.no_cache:
+        os.environ["CACHE_BACKEND"] = "none"
+
+    seeded = None
+    async_engine = None
+    if args.url:
+        dialect = "postgresql"
+        transport = None
+    else:
+        from app.core.database import async_engine, engine
+        from app.main import app
+        from benchmarks.seed import prepare_database, seed
+
+        dialect = engine.dialect.name
+        if args.seed:
+            prepare_database(engine)
+            seeded = seed(engine, args.instances, args.deployments, args.metrics)
+            print(f"🌱 Jeu de données inséré en {seeded['duration_s']}s")
+        transport = httpx.ASGITransport(app=app)
+
+    async def execute():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=args.url or "http://benchmark", transport=transport, timeout=60.0, limits=limits
+        ) as client:
+            try:
+                return await run(client, dialect, args.requests, args.concurrency, args.only)
+            finally:
+                # Fermer les connexions du pool avant la boucle (threads aiosqlite)
+                if async_engine is not None:
+                    await async_engine.dispose()
+
+    endpoints = asyncio.run(execute())
+    report = {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "target": args.url or "asgi",
+            "database": dialect,
+            "python": platform.python_version(),
+            "cache": not args.no_cache,
+        },
+        "seed": seeded,
+        "endpoints": endpoints,
+    }
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Résultats écrits dans {args.json_path}")
+
+    failed = {name: result["failed"] for name, result in endpoints.items() if result["failed"]}
+    if failed:
+        print(f"⚠️ Requêtes en erreur: {failed}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(endpoints, json.load(f)["endpoints"], args.tolerance)
+        if regressions:
+            for regression in regressions:
+                print(f"❌ Régression {regression}")
+            return 1
+        print(f"✅ Aucune régression au-delà de {args.tolerance}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Jeu de données réaliste pour les benchmarks
+
+Insère des instances (fournisseurs, régions, types et statuts variés), leur
+historique de statuts, des déploiements sur 30 jours et des métriques
+réparties sur `--days` jours. L'insertion se fait par lots multi-lignes avec
+le moteur synchrone de l'application (DATABASE_URL) : PostgreSQL local (ex.
+conteneur docker-compose) ou fichier SQLite de remplacement.
+
+Les tables sont créées si besoin (init_db sur PostgreSQL, create_all sur
+SQLite). SQLite n'auto-incrémente pas une clé primaire composite :
+monitoring_metrics y est créée avec `id` seul en clé primaire.
+
+Usage (depuis backend/) :
+    DATABASE_URL=sqlite:///bench.sqlite python -m benchmarks.seed --instances 1000 --metrics 200000
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import Engine
+
+REGIONS = {
+    "aws": ["us-east-1", "us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-1"],
+    "azure": ["eastus", "westeurope", "northeurope", "southeastasia"],
+    "gcp": ["us-central1", "europe-west1", "europe-west4", "asia-east1"],
+}
+
+# (cpu, mémoire Go, coût horaire)
+SIZES = [(1, 1.0, 0.0116), (2, 4.0, 0.0416), (2, 8.0, 0.0832), (4, 16.0, 0.1664), (8, 32.0, 0.3328), (16, 64.0, 0.6656)]
+
+INSTANCE_TYPES = ["vm"] * 5 + ["container"] * 3 + ["serverless"]
+INSTANCE_STATUSES = ["running"] * 6 + ["stopped"] * 2 + ["pending", "terminated"]
+DEPLOYMENT_STATUSES = ["success"] * 8 + ["failed", "rolled_back"]
+
+METRIC_UNITS = {"cpu": "percent", "memory": "percent", "network": "mbps", "storage": "percent"}
+
+CHUNK_SIZE = 10_000
+
+SQLITE_METRICS_TABLE = """
+CREATE TABLE IF NOT EXISTS monitoring_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    instance_id INTEGER REFERENCES cloud_instances(id),
+    metric_type VARCHAR(50) NOT NULL,
+    value FLOAT NOT NULL,
+    unit VARCHAR(20),
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def prepare_database(engine: Engine) -> None:
+    """Créer les tables (et partitions sur PostgreSQL) si elles n'existent pas"""
+    if engine.dialect.name == "postgresql":
+        from app.core.init_db import init_db
+        init_db()
+    else:
+        from app.core.database import Base
+        from app.models import MonitoringMetric
+
+        metrics_table = MonitoringMetric.__table__
+        Base.metadata.create_all(
+            bind=engine, tables=[table for table in Base.metadata.sorted_tables if table is not metrics_table]
+        )
+        with engine.begin() as connection:
+            connection.execute(text(SQLITE_METRICS_TABLE))
+            for index in metrics_table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+def _insert_chunks(connection, table, rows: List[Dict]) -> None:
+    for offset in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(insert(table), rows[offset:offset + CHUNK_SIZE])
+
+
+def seed(
+    engine: Engine,
+    instances: int = 1_000,
+    deployments: int = 5_000,
+    metrics: int = 200_000,
+    days: int = 7,
+    random_seed: int = 42,
+) -> Dict:
+    """Insérer le jeu de données ; renvoie les volumes et la durée"""
+    from app.core.instance_costs import BACKFILL_SQL
+    from app.models import CloudInstance, DeploymentHistory, MonitoringMetric
+
+    rng = random.Random(random_seed)
+    now = datetime.now(timezone.utc)
+    run = uuid.uuid4().hex[:6]
+    started = time.perf_counter()
+
+    with engine.begin() as connection:
+        instance_rows = []
+        for index in range(instances):
+            provider = rng.choice(list(REGIONS))
+            cpu, memory, cost = rng.choice(SIZES)
+            status = rng.choice(INSTANCE_STATUSES)
+            instance_rows.append({
+                "name": f"bench-{run}-{index}",
+                "instance_type": rng.choice(INSTANCE_TYPES),
+                "status": status,
+                "provider": provider,
+                "region": rng.choice(REGIONS[provider]),
+                "cpu_cores": cpu,
+                "memory_gb": memory,
+                "storage_gb": float(rng.choice([10, 20, 50, 100, 500])),
+                "cost_per_hour": cost,
+                "ip_address": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+                "created_at": now - timedelta(days=rng.uniform(0, 60)),
+                "is_active": status != "terminated",
+            })
+        _insert_chunks(connection, CloudInstance.__table__, instance_rows)
+        connection.execute(text(BACKFILL_SQL))
+
+        instance_ids = connection.execute(
+            select(CloudInstance.id).where(CloudInstance.name.like(f"bench-{run}-%"))
+        ).scalars().all()
+
+        deployment_rows = []
+        for index in range(deployments):
+            provider = rng.choice(list(REGIONS))
+            status = rng.choice(DEPLOYMENT_STATUSES)
+            started_at = now - timedelta(days=rng.uniform(0, 30))
+            duration = rng.randint(20, 900)
+            deployment_rows.append({
+                "deployment_name": f"bench-{run}-deploy-{index}",
+                "provider": provider,
+                "region": rng.choice(REGIONS[provider]),
+                "status": status,
+                "instance_count": rng.randint(1, 10),
+                "error_message": "Quota dépassé" if status == "failed" else None,
+                "started_at": started_at,
+                "completed_at": started_at + timedelta(seconds=duration),
+                "duration_seconds": duration,
+            })
+        _insert_chunks(connection, DeploymentHistory.__table__, deployment_rows)
+
+        metric_types = list(METRIC_UNITS)
+        span = timedelta(days=days).total_seconds()
+        chunk = []
+        for index in range(metrics):
+            metric_type = metric_types[index % len(metric_types)]
+            chunk.append({
+                "instance_id": rng.choice(instance_ids) if instance_ids else None,
+                "metric_type": metric_type,
+                "value": round(rng.uniform(0, 1000 if metric_type == "network" else 100), 2),
+                "unit": METRIC_UNITS[metric_type],
+                "timestamp": now - timedelta(seconds=span * index / max(metrics, 1)),
+            })
+            if len(chunk) == CHUNK_SIZE:
+                connection.execute(insert(MonitoringMetric.__table__), chunk)
+                chunk = []
+        if chunk:
+            connection.execute(insert(MonitoringMetric.__table__), chunk)
+
+    return {
+        "instances": instances,
+        "deployments": deployments,
+        "metrics": metrics,
+        "metric_days": days,
+        "duration_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Insérer un jeu de données de benchmark")
+    parser.add_argument("--instances", type=int, default=1_000)
+    parser.add_argument("--deployments", type=int, default=5_000)
+    parser.add_argument("--metrics", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=7, help="Période couverte par les métriques")
+    args = parser.parse_args(argv)
+
+    from app.core.database import engine
+
+    prepare_database(engine)
+    stats = seed(engine, args.instances, args.deployments, args.metrics, args.days)
+    print(
+        f"🌱 {stats['instances']} instances, {stats['deployments']} déploiements, "
+        f"{stats['metrics']} métriques insérés en {stats['duration_s']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark de la sérialisation des listes d'instances (CPU uniquement)
+
+Compare, sur `--rows` lignes et sans base de données :
+- avant : objets ORM, conversion des statuts/types en enums sur les objets,
+  model_validate + model_dump par ligne puis revalidation de la liste par
+  `response_model` et encodage json (chemin FastAPI par défaut)
+- après : tuples de colonnes convertis par RowSerializer puis encodés par
+  orjson (ORJSONResponse)
+
+Affiche le débit en lignes/s de chaque chemin et le facteur de gain.
+
+Usage (depuis backend/) :
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.api.v1.instances import instance_serializer
+from app.models.cloud_instance import CloudInstance, InstanceStatus, InstanceType
+from app.schemas.cloud_instance import CloudInstanceResponse
+
+
+def sample_rows(count: int) -> List[tuple]:
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    values = {
+        "instance_type": InstanceType.VM.value,
+        "status": InstanceStatus.RUNNING.value,
+        "provider": "aws",
+        "region": "eu-west-1",
+        "cpu_cores": 2,
+        "memory_gb": 4.0,
+        "storage_gb": 50.0,
+        "cost_per_hour": 0.0832,
+        "ip_address": "10.0.0.1",
+        "is_active": True,
+    }
+    rows = []
+    for index in range(count):
+        values.update(
+            id=index + 1,
+            name=f"bench-{index}",
+            created_at=created + timedelta(seconds=index),
+            updated_at=created + timedelta(seconds=index, minutes=5),
+        )
+        rows.append(tuple(values.get(field) for field in instance_serializer.fields))
+    return rows
+
+
+def _before(rows: List[tuple]) -> bytes:
+    adapter = TypeAdapter(List[CloudInstanceResponse])
+    instances = [CloudInstance(**dict(zip(instance_serializer.fields, row))) for row in rows]
+    for instance in instances:
+        if isinstance(instance.instance_type, str):
+            instance.instance_type = InstanceType(instance.instance_type)
+        if isinstance(instance.status, str):
+            instance.status = InstanceStatus(instance.status)
+    items = [CloudInstanceResponse.model_validate(instance).model_dump(mode="json") for instance in instances]
+    # response_model : revalidation puis encodage par json.dumps
+    return json.dumps(adapter.dump_python(adapter.validate_python(items), mode="json")).encode()
+
+
+def _after(rows: List[tuple]) -> bytes:
+    return orjson.dumps(instance_serializer.many(rows))
+
+
+def _measure(function: Callable[[List[tuple]], bytes], rows: List[tuple], repeat: int) -> float:
+    function(rows)  # échauffement
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(rows)
+    duration = time.perf_counter() - started
+    return len(rows) * repeat / duration if duration > 0 else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Débit de sérialisation des listes d'instances")
+    parser.add_argument("--rows", type=int, default=1000, help="Lignes par réponse")
+    parser.add_argument("--repeat", type=int, default=50, help="Réponses sérialisées par chemin")
+    args = parser.parse_args(argv)
+
+    rows = sample_rows(args.rows)
+    # Les deux chemins doivent produire le même contenu JSON
+    if json.loads(_before(rows)) != json.loads(_after(rows)):
+        print("❌ Les deux chemins ne produisent pas la même réponse")
+        return 1
+
+    before = _measure(_before, rows, args.repeat)
+    after = _measure(_after, rows, args.repeat)
+    print(json.dumps({
+        "rows": args.rows,
+        "repeat": args.repeat,
+        "before_rows_per_second": round(before),
+        "after_rows_per_second": round(after),
+        "speedup": round(after / before, 2) if before else None,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
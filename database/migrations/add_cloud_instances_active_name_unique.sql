@@ -0,0 +1,11 @@
+-- Migration : unicité du nom des instances actives (index unique partiel)
+-- À exécuter une seule fois sur une base créée avant l'ajout de l'index ;
+-- `python -m app.core.init_db` l'applique aussi automatiquement.
+--
+-- La création échoue si des instances actives portent déjà le même nom
+-- (créations concurrentes avant l'index). Pour les lister :
+--   SELECT name, array_agg(id ORDER BY id) FROM cloud_instances
+--   WHERE is_active GROUP BY name HAVING count(*) > 1;
+-- puis renommer ou supprimer (is_active = FALSE) les doublons.
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cloud_instances_active_name ON cloud_instances(name) WHERE is_active;
@@ -0,0 +1,5 @@
+-- Migration : version des lignes de deployment_history (ETag des réponses de l'API)
+-- À exécuter une seule fois sur une base créée avant l'ajout de la colonne ;
+-- `python -m app.core.init_db` l'applique aussi automatiquement.
+
+ALTER TABLE deployment_history ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,11 @@
+-- Migration : au plus une tâche active par déploiement (index unique partiel)
+-- À exécuter une seule fois sur une base créée avant l'ajout de l'index ;
+-- `python -m app.core.init_db` l'applique aussi automatiquement.
+--
+-- La création échoue si un déploiement a déjà plusieurs tâches actives
+-- (reprise et relance concurrentes avant l'index). Pour les lister :
+--   SELECT deployment_id, array_agg(id ORDER BY id) FROM deployment_jobs
+--   WHERE status IN ('queued', 'running') GROUP BY deployment_id HAVING count(*) > 1;
+-- puis passer les doublons les plus récents en 'failed'.
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_deployment_jobs_active ON deployment_jobs(deployment_id) WHERE status IN ('queued', 'running');
@@ -0,0 +1,19 @@
+-- Migration : historique des statuts des instances (calcul des coûts)
+-- À exécuter une seule fois sur une base créée avant l'ajout de la table ;
+-- `python -m app.core.init_db` crée la table et initialise l'historique.
+
+CREATE TABLE IF NOT EXISTS instance_status_events (
+    id SERIAL PRIMARY KEY,
+    instance_id INTEGER NOT NULL REFERENCES cloud_instances(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL,
+    cost_per_hour FLOAT NOT NULL DEFAULT 0.0,
+    occurred_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_instance_status_events_instance_time ON instance_status_events(instance_id, occurred_at);
+
+-- Instances existantes : un événement avec leur statut courant à leur date de création
+INSERT INTO instance_status_events (instance_id, status, cost_per_hour, occurred_at)
+SELECT ci.id, ci.status, COALESCE(ci.cost_per_hour, 0), COALESCE(ci.created_at, CURRENT_TIMESTAMP)
+FROM cloud_instances ci
+WHERE NOT EXISTS (SELECT 1 FROM instance_status_events e WHERE e.instance_id = ci.id);
@@ -0,0 +1,6 @@
+-- Migration : index des événements de statut par date (rapport de coûts,
+-- lecture des seuls événements de la période)
+-- À exécuter une seule fois sur une base créée avant l'ajout de l'index ;
+-- `python -m app.core.init_db` l'applique aussi automatiquement.
+
+CREATE INDEX IF NOT EXISTS idx_instance_status_events_time ON instance_status_events(occurred_at);
@@ -0,0 +1,6 @@
+-- Migration : filigrane des rollups fondé sur les transactions validées
+-- (une ingestion longue validée tardivement n'est plus ignorée par la compaction)
+-- À exécuter une seule fois sur une base créée avant l'ajout de la colonne ;
+-- `python -m app.core.init_db` l'applique aussi automatiquement.
+
+ALTER TABLE metric_rollup_state ADD COLUMN IF NOT EXISTS pending_xmax BIGINT NOT NULL DEFAULT 0;
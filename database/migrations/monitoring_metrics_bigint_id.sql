@@ -0,0 +1,20 @@
+-- Migration : ids BIGINT pour monitoring_metrics (table déjà partitionnée avec id SERIAL)
+-- À exécuter une seule fois sur une base partitionnée avant le passage à BIGSERIAL ;
+-- partition_monitoring_metrics.sql crée déjà la colonne en BIGSERIAL.
+--
+-- Un id SERIAL (int4) s'épuise à 2^31 lignes, et la rétention (suppression de
+-- partitions) ne libère aucun id. ALTER COLUMN ... TYPE réécrit toutes les
+-- partitions sous verrou exclusif : à planifier dans une fenêtre de maintenance.
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'monitoring_metrics' AND column_name = 'id') = 'integer' THEN
+        EXECUTE format('ALTER SEQUENCE %s AS BIGINT', pg_get_serial_sequence('monitoring_metrics', 'id'));
+        ALTER TABLE monitoring_metrics ALTER COLUMN id TYPE BIGINT;
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Migration : colonnes de tri de la pagination par curseur en NOT NULL
+-- À exécuter une seule fois sur une base créée avant la contrainte ;
+-- `python -m app.core.init_db` l'applique aussi automatiquement.
+--
+-- (created_at, id) < curseur ne sélectionne jamais une ligne de date NULL, et
+-- une page terminée par une telle ligne ne peut pas produire de curseur. Les
+-- dates manquantes sont reprises de la dernière modification connue.
+
+BEGIN;
+
+UPDATE cloud_instances SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE cloud_instances ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE deployment_history SET started_at = COALESCE(completed_at, updated_at, CURRENT_TIMESTAMP) WHERE started_at IS NULL;
+ALTER TABLE deployment_history ALTER COLUMN started_at SET NOT NULL;
+
+COMMIT;
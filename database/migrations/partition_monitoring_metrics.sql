@@ -0,0 +1,40 @@
+-- Migration : convertir monitoring_metrics en table partitionnée par plage de temps
+-- À exécuter une seule fois sur une base créée avec l'ancien schéma (table non partitionnée).
+-- Les données existantes sont copiées dans la partition DEFAULT ; au démarrage suivant,
+-- l'application (ou `python -m app.core.metric_partitions`) les redistribue dans les
+-- partitions journalières de la fenêtre de rétention.
+
+BEGIN;
+
+ALTER TABLE monitoring_metrics RENAME TO monitoring_metrics_legacy;
+ALTER INDEX IF EXISTS idx_monitoring_metrics_type RENAME TO idx_monitoring_metrics_legacy_type;
+ALTER INDEX IF EXISTS idx_monitoring_metrics_instance RENAME TO idx_monitoring_metrics_legacy_instance;
+ALTER INDEX IF EXISTS idx_monitoring_metrics_timestamp RENAME TO idx_monitoring_metrics_legacy_timestamp;
+
+CREATE TABLE monitoring_metrics (
+    id BIGSERIAL,  -- int4 s'épuiserait (2^31 ids, jamais réutilisés après rétention)
+    instance_id INTEGER REFERENCES cloud_instances(id) ON DELETE SET NULL,
+    metric_type VARCHAR(50) NOT NULL,
+    value FLOAT NOT NULL,
+    unit VARCHAR(20) NOT NULL DEFAULT 'percent',
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE monitoring_metrics_default PARTITION OF monitoring_metrics DEFAULT;
+
+CREATE INDEX idx_monitoring_metrics_type ON monitoring_metrics(metric_type);
+CREATE INDEX idx_monitoring_metrics_instance ON monitoring_metrics(instance_id);
+CREATE INDEX idx_monitoring_metrics_timestamp ON monitoring_metrics(timestamp);
+
+INSERT INTO monitoring_metrics (id, instance_id, metric_type, value, unit, timestamp)
+SELECT id, instance_id, metric_type, value, unit, COALESCE(timestamp, CURRENT_TIMESTAMP)
+FROM monitoring_metrics_legacy;
+
+-- Reprendre la séquence après le plus grand id copié
+SELECT setval(pg_get_serial_sequence('monitoring_metrics', 'id'), COALESCE(MAX(id), 1))
+FROM monitoring_metrics;
+
+DROP TABLE monitoring_metrics_legacy;
+
+COMMIT;
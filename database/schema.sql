@@ -14,30 +14,69 @@ CREATE TABLE IF NOT EXISTS cloud_instances (
     storage_gb FLOAT NOT NULL DEFAULT 10.0,
     cost_per_hour FLOAT NOT NULL DEFAULT 0.0,
     ip_address VARCHAR(50),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE,
     is_active BOOLEAN NOT NULL DEFAULT TRUE
 );
 
 -- Index pour améliorer les performances
 CREATE INDEX IF NOT EXISTS idx_cloud_instances_name ON cloud_instances(name);
+-- Unicité du nom parmi les instances actives (garantie aussi sous créations concurrentes)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cloud_instances_active_name ON cloud_instances(name) WHERE is_active;
 CREATE INDEX IF NOT EXISTS idx_cloud_instances_provider ON cloud_instances(provider);
 CREATE INDEX IF NOT EXISTS idx_cloud_instances_status ON cloud_instances(status);
+-- Pagination par curseur (keyset) des instances actives
+CREATE INDEX IF NOT EXISTS idx_cloud_instances_active_created ON cloud_instances(created_at DESC, id DESC) WHERE is_active;
 
--- Table des métriques de monitoring
+-- Table des métriques de monitoring, partitionnée par plage de temps
+-- Les partitions journalières (ou hebdomadaires) sont créées par l'application
+-- (app/core/metric_partitions.py) ; la partition DEFAULT reçoit les lignes hors plage
 CREATE TABLE IF NOT EXISTS monitoring_metrics (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,  -- int4 s'épuiserait (2^31 ids, jamais réutilisés après rétention)
     instance_id INTEGER REFERENCES cloud_instances(id) ON DELETE SET NULL,
     metric_type VARCHAR(50) NOT NULL,
     value FLOAT NOT NULL,
     unit VARCHAR(20) NOT NULL DEFAULT 'percent',
-    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS monitoring_metrics_default PARTITION OF monitoring_metrics DEFAULT;
 
 -- Index pour les métriques
 CREATE INDEX IF NOT EXISTS idx_monitoring_metrics_type ON monitoring_metrics(metric_type);
 CREATE INDEX IF NOT EXISTS idx_monitoring_metrics_instance ON monitoring_metrics(instance_id);
 CREATE INDEX IF NOT EXISTS idx_monitoring_metrics_timestamp ON monitoring_metrics(timestamp);
+-- Pagination par curseur (keyset) des métriques
+CREATE INDEX IF NOT EXISTS idx_monitoring_metrics_timestamp_id ON monitoring_metrics(timestamp DESC, id DESC);
+
+-- Tables de rollup des métriques (agrégats par minute, heure et jour)
+-- instance_id vaut 0 pour les métriques sans instance
+CREATE TABLE IF NOT EXISTS metric_rollups_1m (
+    metric_type VARCHAR(50) NOT NULL,
+    instance_id INTEGER NOT NULL DEFAULT 0,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    count BIGINT NOT NULL,
+    sum FLOAT NOT NULL,
+    min FLOAT NOT NULL,
+    max FLOAT NOT NULL,
+    p95 FLOAT,
+    PRIMARY KEY (metric_type, instance_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS metric_rollups_1h (LIKE metric_rollups_1m INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS metric_rollups_1d (LIKE metric_rollups_1m INCLUDING ALL);
+
+-- Filigrane de la compaction incrémentale
+CREATE TABLE IF NOT EXISTS metric_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_metric_id BIGINT NOT NULL DEFAULT 0,
+    pending_metric_id BIGINT NOT NULL DEFAULT 0,
+    pending_observed_at TIMESTAMP WITH TIME ZONE,
+    pending_xmax BIGINT NOT NULL DEFAULT 0,
+    covered_until TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
 
 -- Table de l'historique des déploiements
 CREATE TABLE IF NOT EXISTS deployment_history (
@@ -49,15 +88,51 @@ CREATE TABLE IF NOT EXISTS deployment_history (
     instance_count INTEGER NOT NULL DEFAULT 1,
     configuration TEXT,
     error_message TEXT,
-    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP WITH TIME ZONE,
-    duration_seconds INTEGER
+    duration_seconds INTEGER,
+    updated_at TIMESTAMP WITH TIME ZONE
 );
 
 -- Index pour les déploiements
 CREATE INDEX IF NOT EXISTS idx_deployment_history_name ON deployment_history(deployment_name);
 CREATE INDEX IF NOT EXISTS idx_deployment_history_status ON deployment_history(status);
 CREATE INDEX IF NOT EXISTS idx_deployment_history_started ON deployment_history(started_at);
+-- Pagination par curseur (keyset) des déploiements
+CREATE INDEX IF NOT EXISTS idx_deployment_history_started_id ON deployment_history(started_at DESC, id DESC);
+
+-- File des tâches de déploiement (réservées avec FOR UPDATE SKIP LOCKED)
+CREATE TABLE IF NOT EXISTS deployment_jobs (
+    id SERIAL PRIMARY KEY,
+    deployment_id INTEGER NOT NULL REFERENCES deployment_history(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_deployment_jobs_deployment_id ON deployment_jobs(deployment_id);
+CREATE INDEX IF NOT EXISTS idx_deployment_jobs_queued ON deployment_jobs(run_after, id) WHERE status = 'queued';
+-- Au plus une tâche active par déploiement (reprise et relance concurrentes)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_deployment_jobs_active ON deployment_jobs(deployment_id) WHERE status IN ('queued', 'running');
+
+-- Historique des statuts des instances (ajout seul), base du calcul des coûts
+CREATE TABLE IF NOT EXISTS instance_status_events (
+    id SERIAL PRIMARY KEY,
+    instance_id INTEGER NOT NULL REFERENCES cloud_instances(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL,
+    cost_per_hour FLOAT NOT NULL DEFAULT 0.0,
+    occurred_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_instance_status_events_instance_time ON instance_status_events(instance_id, occurred_at);
+-- Événements d'une période (rapport de coûts)
+CREATE INDEX IF NOT EXISTS idx_instance_status_events_time ON instance_status_events(occurred_at);
 
 -- Insérer des données de démonstration
 INSERT INTO cloud_instances (name, instance_type, status, provider, region, cpu_cores, memory_gb, storage_gb, cost_per_hour, ip_address)
@@ -68,6 +143,12 @@ VALUES
     ('cache-server-01', 'container', 'running', 'gcp', 'us-central1', 2, 4.0, 20.0, 0.08, '10.0.3.10')
 ON CONFLICT DO NOTHING;
 
+-- Historique initial des statuts des instances de démonstration
+INSERT INTO instance_status_events (instance_id, status, cost_per_hour, occurred_at)
+SELECT ci.id, ci.status, COALESCE(ci.cost_per_hour, 0), COALESCE(ci.created_at, CURRENT_TIMESTAMP)
+FROM cloud_instances ci
+WHERE NOT EXISTS (SELECT 1 FROM instance_status_events e WHERE e.instance_id = ci.id);
+
 -- Insérer des métriques de démonstration
 INSERT INTO monitoring_metrics (instance_id, metric_type, value, unit)
 VALUES
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react'
-import { getDeployments, createDeployment, deleteDeployment, Deployment } from '../services/api'
+import { getDeployments, createDeployment, deleteDeployment, subscribeEvents, Deployment } from '../services/api'
 import { CheckCircle, XCircle, Clock, Trash2, Plus, AlertCircle, RefreshCw } from 'lucide-react'
 import { format } from 'date-fns'
 
@@ -27,14 +27,17 @@ const DeploymentHistory = () => {
   useEffect(() => {
     fetchDeployments()
     
-    // Rafraîchir automatiquement la liste toutes les 3 secondes pour voir les changements de statut
-    // Utiliser un rafraîchissement silencieux pour ne pas afficher le loader
-    const interval = setInterval(() => {
-      fetchDeployments(true) // true = rafraîchissement silencieux
-    }, 3000) // Rafraîchir toutes les 3 secondes
+    // Le backend pousse chaque changement de statut : rafraîchissement silencieux
+    // uniquement quand un événement arrive (plus d'interrogation toutes les 3 secondes)
+    const unsubscribe = subscribeEvents(
+      ['deployments'],
+      () => fetchDeployments(true),
+      // Connexion perdue : resynchroniser la liste (EventSource se reconnecte seul)
+      () => fetchDeployments(true),
+    )
     
-    // Nettoyer l'intervalle quand le composant est démonté
-    return () => clearInterval(interval)
+    // Fermer le flux quand le composant est démonté
+    return () => unsubscribe()
   }, [])
 
   const fetchDeployments = async (silent = false) => {
@@ -151,4 +151,30 @@ export const deleteDeployment = async (id: number): Promise<void> => {
   await api.delete(`/api/deployments/${id}`)
 }
 
+// Événements temps réel (SSE, repli du WebSocket /ws/events)
+export interface ServerEvent {
+  type: string
+  deployment_id?: number
+  instance_id?: number
+  status?: string
+  at: string
+}
+
+/**
+ * S'abonner aux événements du backend ; retourne la fonction de désabonnement.
+ * `onError` est appelé si la connexion est perdue (EventSource se reconnecte seul).
+ */
+export const subscribeEvents = (
+  topics: Array<'deployments' | 'instances'>,
+  onEvent: (event: ServerEvent) => void,
+  onError?: () => void,
+): (() => void) => {
+  const source = new EventSource(`${API_URL}/api/events/stream?topics=${topics.join(',')}`)
+  source.onmessage = (message) => onEvent(JSON.parse(message.data))
+  if (onError) {
+    source.onerror = onError
+  }
+  return () => source.close()
+}
+
 export default api
\ No newline at end of file